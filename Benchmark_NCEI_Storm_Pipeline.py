@@ -0,0 +1,243 @@
+#######################
+"""
+Updated Nov, 2025
+
+@author: Joshua Green - University of Southampton
+
+Please cite this script/dataset if used in any research or publications.
+
+Green, J. (2025) NCEI Storm Multihazard Eventset.
+
+Benchmark of the cleaning and eventset pipeline stages on synthetic StormEvents_details files (see NCEI_Synthetic_Storm_Events.py)
+at several data scales, the timings are saved as JSON so that they can be compared across commits
+"""
+#######################
+
+import json
+import os
+import pickle
+import platform
+import shutil
+import subprocess
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from NCEI_County_Hazard_Dicts import COUNTY_HAZARD_DICT_FILES, build_county_hazard_dicts
+from NCEI_Multihazard_Pairing import build_event_id_index, pair_events
+from NCEI_Pipeline import EXCLUSION_STATE_LIST, HAZARD_EVENT_INCLUSION_FILTER
+from NCEI_Prepared_Events import attach_narratives, impact_filter_mask, load_prepared_events
+from NCEI_Run_Report import run_report, stage, start_run_report
+from NCEI_Storm_Details_Cleaning import (
+    build_cz_fips_mapping,
+    clean_filtered_details,
+    cleaning_options,
+    details_files,
+    filter_details,
+    load_files,
+    read_cpi_table,
+    read_nws_zone_table,
+    write_details_parquet,
+)
+from NCEI_Storm_Details_Schema import apply_details_schema
+from NCEI_Synthetic_Storm_Events import synthetic_county_ids, write_synthetic_details
+
+######################################################################################################
+#                        USER DEFINED PARAMETERS
+######################################################################################################
+Benchmark_Output_Path = 'PATH FOR BENCHMARK RESULTS'
+# A previous benchmark JSON file to compare the timings against, None to skip the comparison
+Benchmark_Compare_Path = None
+
+# Data scales to run, as multiples of events_per_year
+# CHANGE THESE VALUES AS DESIRED, the real database has about 60,000-70,000 events per year
+benchmark_scales = [1, 5, 20]
+events_per_year = 5000
+benchmark_years = range(1996, 2006)
+
+# Time lags to pair the events with, each is timed as its own pair stage
+# CHANGE THESE VALUES AS DESIRED
+benchmark_time_lag_days = [30, 90]
+
+# Eventset parameters, as in Generate_NCEI_Storm_Multihazard_Eventset.py
+# The default hazard types and excluded states are defined in NCEI_Pipeline.py
+hazard_event_inclusion_filter = list(HAZARD_EVENT_INCLUSION_FILTER)
+exclusion_state_list = list(EXCLUSION_STATE_LIST)
+inj = 1 # injuries
+dth = 1 # deaths
+c = 10  # crop damage in thousands
+p = 10  # property damage in thousands
+n_workers = 1
+
+# Keep the synthetic files and outputs of each scale in Benchmark_Output_Path, rather than a temporary folder
+keep_benchmark_data = False
+
+######################################################################################################
+#                        MAIN SCRIPT
+######################################################################################################
+Repository_Path = os.path.dirname(os.path.abspath(__file__))
+
+
+# Time one stage (see NCEI_Run_Report.stage), records its wall and cpu time, peak memory and the number of rows it was
+# given and returned
+def timed_stage(stages, name, rows_in, function, *args, **kwargs):
+    with stage(name, rows_in=rows_in) as record:
+        result = function(*args, **kwargs)
+        record["rows_out"] = len(result) if hasattr(result, "__len__") else None
+    stages[name] = {key: record[key] for key in ("wall_seconds", "cpu_seconds", "peak_rss_mb", "rows_in", "rows_out")}
+    print(f"  {name}: {stages[name]['wall_seconds']:.2f}s ({rows_in} -> {stages[name]['rows_out']} rows)")
+    return result
+
+
+# Clean the synthetic files as the cleaning script does (in memory mode), the rows are sorted and de-duplicated as before saving
+# The cleaning options use the repository copies of the zone and CPI tables
+def clean_stage(options, df_details):
+    df_details = filter_details(df_details)
+    mapping = build_cz_fips_mapping(df_details)
+    df_details = apply_details_schema(clean_filtered_details(df_details, mapping, options))
+    df_details = df_details.sort_values(["BEGIN_DATETIME", "CZ_FIPS"], ascending=[True, True])
+    return df_details.drop_duplicates()
+
+
+# Write the cleaned database parquet file, returns the cleaned rows
+def write_cleaned_stage(df_details, parquet_path):
+    write_details_parquet(df_details, parquet_path)
+    return df_details
+
+
+# Prepare and impact filter the events and attach their narratives, as the eventset script does
+def filter_stage(parquet_path, start_year, end_year):
+    dfprepared = load_prepared_events(
+        parquet_path, hazard_event_inclusion_filter, exclusion_state_list, start_year, end_year
+    )
+    return attach_narratives(
+        dfprepared[impact_filter_mask(dfprepared, inj, dth, c, p)],
+        parquet_path, hazard_event_inclusion_filter, exclusion_state_list, start_year, end_year
+    )
+
+
+# Write the eventset outputs, the events and pairs as parquet and the county hazard dictionaries as pickles
+def write_eventset_stage(dfevents, dfmulti, county_hazard_dicts, output_dir):
+    dfevents.to_parquet(os.path.join(output_dir, "dfevents.parquet.gz"), compression="gzip")
+    dfmulti.to_parquet(os.path.join(output_dir, "dfmulti.parquet.gz"), compression="gzip")
+    for name, file_name in COUNTY_HAZARD_DICT_FILES.items():
+        with open(os.path.join(output_dir, file_name), "wb") as file:
+            pickle.dump(county_hazard_dicts[name], file)
+    return dfmulti
+
+
+# Run every stage at one data scale, in work_dir
+def benchmark_scale(scale, work_dir):
+    raw_dir = os.path.join(work_dir, "raw")
+    output_dir = os.path.join(work_dir, "output")
+    os.makedirs(output_dir, exist_ok=True)
+    start_year, end_year = min(benchmark_years), max(benchmark_years)
+    year_range = range(start_year, end_year + 2, 1)
+    stages = {}
+    start_run_report(f"Benchmark_NCEI_Storm_Pipeline.py {scale}x")
+
+    print(f"Scale {scale}x, {events_per_year * scale} events per year, {start_year}-{end_year}")
+    timed_stage(stages, "generate", None, write_synthetic_details, raw_dir, benchmark_years, events_per_year * scale)
+    options = cleaning_options(read_nws_zone_table(), read_cpi_table())
+
+    df_raw = timed_stage(stages, "ingest", None, load_files, details_files(raw_dir))
+    rows_raw = len(df_raw)
+    df_details = timed_stage(stages, "clean", rows_raw, clean_stage, options, df_raw)
+    del df_raw
+    parquet_path = os.path.join(output_dir, "NCEI_Storm_Database_Cleaned_Details.parquet")
+    timed_stage(stages, "write_cleaned", len(df_details), write_cleaned_stage, df_details, parquet_path)
+    rows_cleaned = len(df_details)
+    del df_details
+
+    dfevents = timed_stage(stages, "filter", rows_cleaned, filter_stage, parquet_path, start_year, end_year)
+    event_id_index = build_event_id_index(dfevents)
+    dfmulti_by_lag = {}
+    for lag_days in benchmark_time_lag_days:
+        dfmulti_by_lag[lag_days] = timed_stage(
+            stages, f"pair_lag{lag_days}", len(dfevents), pair_events,
+            dfevents, pd.Timedelta(days=lag_days), n_workers=n_workers, event_id_index=event_id_index,
+        )
+    dfmulti = dfmulti_by_lag[benchmark_time_lag_days[0]]
+
+    county_hazard_dicts = timed_stage(
+        stages, "dict_build", len(dfevents), build_county_hazard_dicts, dfevents, dfmulti, year_range, synthetic_county_ids()
+    )
+    timed_stage(stages, "write_eventset", len(dfmulti), write_eventset_stage, dfevents, dfmulti, county_hazard_dicts, output_dir)
+
+    return {
+        "events_per_year": events_per_year * scale,
+        "raw_events": rows_raw,
+        "cleaned_events": rows_cleaned,
+        "eventset_events": len(dfevents),
+        "pairs": {str(lag_days): int(len(df) / 2) for lag_days, df in dfmulti_by_lag.items()},
+        "stages": stages,
+        # The stages recorded inside the benchmarked ones, e.g. the cz_fips_remap ... cpi_adjust stages of clean
+        "substages": {name: summary for name, summary in run_report()["stages"].items() if name not in stages},
+        "total_wall_seconds": round(sum(stage["wall_seconds"] for name, stage in stages.items() if name != "generate"), 4),
+    }
+
+
+# Commit of the repository being benchmarked, None outside a git checkout
+def current_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=Repository_Path, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Print the stage timings of results against those of a previous benchmark
+def compare_results(results, previous):
+    print(f"Comparison with commit {previous.get('commit')}, new/old wall time:")
+    for scale, scale_results in results["scales"].items():
+        previous_stages = previous.get("scales", {}).get(scale, {}).get("stages", {})
+        for name, stage_result in scale_results["stages"].items():
+            if name not in previous_stages or previous_stages[name]["wall_seconds"] == 0:
+                continue
+            ratio = stage_result["wall_seconds"] / previous_stages[name]["wall_seconds"]
+            print(f"  {scale} {name}: {previous_stages[name]['wall_seconds']:.2f}s -> {stage_result['wall_seconds']:.2f}s ({ratio:.2f}x)")
+
+
+commit = current_commit()
+results = {
+    "commit": commit,
+    "created": datetime.now().isoformat(timespec="seconds"),
+    "python": platform.python_version(),
+    "pandas": pd.__version__,
+    "numpy": np.__version__,
+    "platform": platform.platform(),
+    "parameters": {
+        "events_per_year": events_per_year,
+        "years": [min(benchmark_years), max(benchmark_years)],
+        "time_lag_days": list(benchmark_time_lag_days),
+        "impact_thresholds": [inj, dth, c, p],
+        "n_workers": n_workers,
+    },
+    "scales": {},
+}
+
+os.makedirs(Benchmark_Output_Path, exist_ok=True)
+for scale in benchmark_scales:
+    if keep_benchmark_data:
+        work_dir = os.path.join(Benchmark_Output_Path, f"benchmark_data_{scale}x")
+        results["scales"][f"{scale}x"] = benchmark_scale(scale, work_dir)
+    else:
+        work_dir = tempfile.mkdtemp(prefix=f"ncei_benchmark_{scale}x_")
+        try:
+            results["scales"][f"{scale}x"] = benchmark_scale(scale, work_dir)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+results_path = os.path.join(
+    Benchmark_Output_Path, f"benchmark_{(commit or 'nocommit')[:12]}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+)
+with open(results_path, "w") as f:
+    json.dump(results, f, indent=2)
+print(f"Benchmark results saved to {results_path}")
+
+if Benchmark_Compare_Path is not None:
+    with open(Benchmark_Compare_Path) as f:
+        compare_results(results, json.load(f))
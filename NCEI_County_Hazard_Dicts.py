@@ -0,0 +1,240 @@
+#######################
+"""
+Updated Nov, 2025
+
+@author: Joshua Green - University of Southampton
+
+Please cite this script/dataset if used in any research or publications.
+
+Green, J. (2025) NCEI Storm Multihazard Eventset.
+
+County hazard dictionaries used by Generate_NCEI_Storm_Multihazard_Eventset.py
+"""
+#######################
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+
+# County hazard dictionaries, in a 3x nested structure of year->state->county, and the pickle file each is saved to
+COUNTY_HAZARD_DICT_FILES = {
+    "single_hazard_event_dict": "NCEI_County_SH_only_event_dict.pkl",
+    "multihazard_event_dict": "NCEI_County_MH_event_dict.pkl",
+    "multihazard_count_dict": "NCEI_County_MH_count_dict.pkl",
+    "single_hazard_count_dict": "NCEI_County_SH_count_dict.pkl",
+    "no_hazard_boolean_dict": "NCEI_County_NH_boolean_dict.pkl",
+    "single_hazard_boolean_dict": "NCEI_County_SH_boolean_dict.pkl",
+    "multihazard_boolean_dict": "NCEI_County_MH_boolean_dict.pkl",
+    "no_hazard_or_single_hazard_boolean_dict": "NCEI_County_SH_NH_boolean_dict.pkl",
+    "single_hazard_or_multihazard_boolean_dict": "NCEI_County_SH_MH_boolean_dict.pkl",
+}
+
+
+# Expand events to one row per (year, GEOID), an event counts in its start year and in its end year
+# Rows are sorted by year and GEOID, and keep the original row order within each (year, GEOID)
+def _county_year_rows(df, value_columns):
+    start_year = df["start_year"].to_numpy()
+    end_year = df["end_year"].to_numpy()
+    spans_years = start_year != end_year
+    row = np.arange(len(df))
+    geoid = df["GEOID"].to_numpy(dtype=object)
+
+    county_year_df = pd.DataFrame(
+        {
+            "year": np.concatenate([start_year, end_year[spans_years]]),
+            "GEOID": np.concatenate([geoid, geoid[spans_years]]),
+            "row": np.concatenate([row, row[spans_years]]),
+        }
+    )
+    for column in value_columns:
+        values = df[column].to_numpy()
+        county_year_df[column] = np.concatenate([values, values[spans_years]])
+    return county_year_df.sort_values(["year", "GEOID", "row"], kind="stable").reset_index(drop=True)
+
+
+# Collect the values of a sorted (year, GEOID) frame into a dict of (year, GEOID) -> list, keeping the row order
+def _county_year_lists(county_year_df, value_column):
+    if len(county_year_df) == 0:
+        return {}
+    years = county_year_df["year"].to_numpy()
+    geoids = county_year_df["GEOID"].to_numpy()
+    values = county_year_df[value_column].to_numpy()
+
+    group_starts = np.flatnonzero((years[1:] != years[:-1]) | (geoids[1:] != geoids[:-1])) + 1
+    county_year_lists = {}
+    for start, group_values in zip(np.concatenate([[0], group_starts]), np.split(values, group_starts)):
+        county_year_lists[(int(years[start]), geoids[start])] = group_values.tolist()
+    return county_year_lists
+
+
+# Build the county hazard dictionaries for every year in year_range and every county in us_county_ids
+# (only the GEOID and STATEFP columns are used, so the county polygons or just their IDs, see load_county_ids)
+# Grouped replacement for filtering dfevents/dfmulti by year and GEOID once per county, the dictionaries are identical:
+#   single hazard only events - events in the county that year which are not part of a multihazard pair in the county that year
+#   multihazard events - PAIR_IDs with both pair events in the county that year
+# With split_pairs=True (neighbourhood pairing, where the two events of a pair can be in neighbouring counties)
+# a PAIR_ID with its events in different counties is counted in every county with one of its events that year,
+# pairs within a single county are counted as without split_pairs
+def build_county_hazard_dicts(dfevents, dfmulti, year_range, us_county_ids, split_pairs=False):
+    single_df = _county_year_rows(dfevents, ["EVENT_ID"])
+    if len(dfmulti) > 0:
+        multi_df = _county_year_rows(dfmulti, ["EVENT_ID", "PAIR_ID"])
+    else:
+        multi_df = _county_year_rows(dfevents.iloc[0:0].assign(PAIR_ID=0), ["EVENT_ID", "PAIR_ID"])
+
+    # Remove the single hazards that make up a multihazard for that location and year, so its single hazard only events
+    single_keys = pd.MultiIndex.from_arrays([single_df["year"], single_df["GEOID"], single_df["EVENT_ID"]])
+    multi_keys = pd.MultiIndex.from_arrays([multi_df["year"], multi_df["GEOID"], multi_df["EVENT_ID"]])
+    single_only_df = single_df[~single_keys.isin(multi_keys)]
+    single_only_df = single_only_df.drop_duplicates(["year", "GEOID", "EVENT_ID"])
+
+    # Only pairs with both events in the county that year are counted as a multihazard for the county
+    pair_rows = multi_df.groupby(["year", "GEOID", "PAIR_ID"], sort=False)["row"].transform("size")
+    counted = pair_rows > 1
+    if split_pairs:
+        counted |= multi_df.groupby("PAIR_ID", sort=False)["GEOID"].transform("nunique") > 1
+    multi_filtered_df = multi_df[counted].drop_duplicates(["year", "GEOID", "PAIR_ID"])
+
+    single_only_lists = _county_year_lists(single_only_df, "EVENT_ID")
+    multi_lists = _county_year_lists(multi_filtered_df, "PAIR_ID")
+
+    county_hazard_dicts = {name: {} for name in COUNTY_HAZARD_DICT_FILES}
+    state_list = us_county_ids["STATEFP"].unique().tolist()
+    county_lists = us_county_ids.groupby("STATEFP", sort=False)["GEOID"].agg(list).to_dict()
+
+    for year in year_range:
+        for hazard_dict in county_hazard_dicts.values():
+            hazard_dict[year] = {}
+
+        for state in state_list:
+            single_hazard_event_dict = county_hazard_dicts["single_hazard_event_dict"][year][state] = {}
+            multihazard_event_dict = county_hazard_dicts["multihazard_event_dict"][year][state] = {}
+            single_hazard_count_dict = county_hazard_dicts["single_hazard_count_dict"][year][state] = {}
+            multihazard_count_dict = county_hazard_dicts["multihazard_count_dict"][year][state] = {}
+            no_hazard_boolean_dict = county_hazard_dicts["no_hazard_boolean_dict"][year][state] = {}
+            single_hazard_boolean_dict = county_hazard_dicts["single_hazard_boolean_dict"][year][state] = {}
+            multihazard_boolean_dict = county_hazard_dicts["multihazard_boolean_dict"][year][state] = {}
+            no_hazard_or_single_hazard_boolean_dict = county_hazard_dicts["no_hazard_or_single_hazard_boolean_dict"][year][state] = {}
+            single_hazard_or_multihazard_boolean_dict = county_hazard_dicts["single_hazard_or_multihazard_boolean_dict"][year][state] = {}
+
+            for county in county_lists[state]:
+                single_only_events = single_only_lists.get((year, county)) or []
+                multi_events = multi_lists.get((year, county)) or []
+                has_single = len(single_only_events) > 0
+                has_multi = len(multi_events) > 0
+
+                single_hazard_event_dict[county] = single_only_events
+                single_hazard_count_dict[county] = len(single_only_events)
+                single_hazard_boolean_dict[county] = has_single
+                multihazard_event_dict[county] = multi_events
+                multihazard_count_dict[county] = len(multi_events)
+                multihazard_boolean_dict[county] = has_multi
+                no_hazard_boolean_dict[county] = not has_single and not has_multi
+                no_hazard_or_single_hazard_boolean_dict[county] = not has_multi
+                single_hazard_or_multihazard_boolean_dict[county] = has_single or has_multi
+
+    return county_hazard_dicts
+
+
+# Columns of the long format county hazard table, one row per (year, county), and the county hazard dictionary each holds
+COUNTY_HAZARD_TABLE_COLUMNS = {
+    "single_hazard_count_dict": "sh_count",
+    "multihazard_count_dict": "mh_count",
+    "no_hazard_boolean_dict": "nh_flag",
+    "single_hazard_boolean_dict": "sh_flag",
+    "multihazard_boolean_dict": "mh_flag",
+    "no_hazard_or_single_hazard_boolean_dict": "sh_nh_flag",
+    "single_hazard_or_multihazard_boolean_dict": "sh_mh_flag",
+    "single_hazard_event_dict": "sh_only_event_ids",
+    "multihazard_event_dict": "mh_pair_ids",
+}
+
+COUNTY_HAZARD_TABLE_SCHEMA = pa.schema(
+    [
+        ("year", pa.int32()),
+        ("STATEFP", pa.string()),
+        ("GEOID", pa.string()),
+        ("sh_count", pa.int32()),
+        ("mh_count", pa.int32()),
+        ("nh_flag", pa.bool_()),
+        ("sh_flag", pa.bool_()),
+        ("mh_flag", pa.bool_()),
+        ("sh_nh_flag", pa.bool_()),
+        ("sh_mh_flag", pa.bool_()),
+        ("sh_only_event_ids", pa.list_(pa.int64())),
+        ("mh_pair_ids", pa.list_(pa.int64())),
+    ]
+)
+
+
+# Flatten the nested year->state->county hazard dictionaries into a long format table, one row per (year, county)
+def county_hazard_dicts_to_table(county_hazard_dicts):
+    columns = {field.name: [] for field in COUNTY_HAZARD_TABLE_SCHEMA}
+    for year, states in county_hazard_dicts["single_hazard_event_dict"].items():
+        for state, counties in states.items():
+            for county in counties:
+                columns["year"].append(year)
+                columns["STATEFP"].append(state)
+                columns["GEOID"].append(county)
+                for name, column in COUNTY_HAZARD_TABLE_COLUMNS.items():
+                    columns[column].append(county_hazard_dicts[name][year][state][county])
+    return pa.table(columns, schema=COUNTY_HAZARD_TABLE_SCHEMA)
+
+
+# Save the county hazard dictionaries as a single long format parquet table, partitioned by year
+# A single county or year can then be read without loading everything, see read_county_hazard_table
+def write_county_hazard_table(county_hazard_dicts, path):
+    pq.write_to_dataset(
+        county_hazard_dicts_to_table(county_hazard_dicts),
+        path,
+        partition_cols=["year"],
+        existing_data_behavior="delete_matching",
+    )
+
+
+# Load the long format county hazard table, optionally only some years and/or counties (GEOIDs)
+def read_county_hazard_table(path, years=None, geoids=None):
+    filters = []
+    if years is not None:
+        filters.append(("year", "in", [int(year) for year in years]))
+    if geoids is not None:
+        filters.append(("GEOID", "in", list(geoids)))
+    table = pq.read_table(
+        path,
+        filters=filters or None,
+        partitioning=ds.partitioning(pa.schema([("year", pa.int32())]), flavor="hive"),
+    )
+    county_hazard_df = table.to_pandas()[COUNTY_HAZARD_TABLE_SCHEMA.names]
+    county_hazard_df["year"] = county_hazard_df["year"].astype(int)
+    return county_hazard_df.sort_values("year", kind="stable").reset_index(drop=True)
+
+
+# Rebuild the legacy nested year->state->county dictionaries from the long format table
+# names selects which of the nine dictionaries to build, by default all of them
+def county_hazard_table_to_dicts(county_hazard_df, names=None):
+    if names is None:
+        names = list(COUNTY_HAZARD_DICT_FILES)
+    county_hazard_dicts = {name: {} for name in names}
+
+    years = county_hazard_df["year"].tolist()
+    states = county_hazard_df["STATEFP"].tolist()
+    counties = county_hazard_df["GEOID"].tolist()
+    for name in names:
+        values = county_hazard_df[COUNTY_HAZARD_TABLE_COLUMNS[name]]
+        if values.dtype == object:
+            values = [value.tolist() for value in values]
+        else:
+            values = values.tolist()
+
+        hazard_dict = county_hazard_dicts[name]
+        for year, state, county, value in zip(years, states, counties, values):
+            hazard_dict.setdefault(year, {}).setdefault(state, {})[county] = value
+    return county_hazard_dicts
+
+
+# Load the legacy nested dictionaries from the county hazard table, for backward compatibility with the pickles
+def load_county_hazard_dicts(path, names=None, years=None, geoids=None):
+    return county_hazard_table_to_dicts(read_county_hazard_table(path, years=years, geoids=geoids), names=names)
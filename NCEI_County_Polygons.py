@@ -0,0 +1,162 @@
+#######################
+"""
+Updated Nov, 2025
+
+@author: Joshua Green - University of Southampton
+
+Please cite this script/dataset if used in any research or publications.
+
+Green, J. (2025) NCEI Storm Multihazard Eventset.
+
+Loading of the US Census Bureau county polygons for Generate_NCEI_Storm_Multihazard_Eventset.py, with an optional on-disk cache
+"""
+#######################
+
+import hashlib
+import json
+import os
+
+import geopandas as gpd
+import pandas as pd
+import shapely
+
+
+# Bump this whenever dissolve_county_polygons changes, so that older cache files are no longer used
+COUNTY_POLYGONS_CACHE_VERSION = 1
+
+# County ID columns, all the county hazard dictionaries need (see build_county_hazard_dicts)
+COUNTY_ID_COLUMNS = ["GEOID", "STATEFP", "COUNTYFP"]
+
+# Files that make up a shapefile, the attributes (.dbf), projection (.prj) and encoding (.cpg) change the loaded layer too
+SHAPEFILE_EXTENSIONS = [".shp", ".shx", ".dbf", ".prj", ".cpg"]
+
+
+# Dissolve the counties with multiple polygons into one single polygon per GEOID, with zero padded GEOIDs
+def dissolve_county_polygons(us_county_polygons):
+    us_county_polygons = us_county_polygons.dissolve(by='GEOID')# some of the counties have multiple small polygons, dissolve into one single polygon
+    us_county_polygons = us_county_polygons.reset_index(drop=False)
+    #us_county_polygons['GEOID'] = us_county_polygons['GEOID'].astype(int).astype(str) #remove leading zeros
+    us_county_polygons['GEOID'] = us_county_polygons['GEOID'].astype(str).str.zfill(5) #add leading zeros
+    return us_county_polygons
+
+
+# sha256 of a county shapefile, over the .shp and every sidecar file next to it
+# Remote shapefiles (URLs) are keyed on the URL itself, hashing them would mean downloading them on every run
+def county_shapefile_checksum(path):
+    if "://" in path:
+        return hashlib.sha256(path.encode()).hexdigest()
+    digest = hashlib.sha256()
+    root, extension = os.path.splitext(path)
+    file_paths = [path] if extension.lower() != ".shp" else [root + ext for ext in SHAPEFILE_EXTENSIONS]
+    for file_path in file_paths:
+        if not os.path.exists(file_path):
+            continue
+        digest.update(os.path.splitext(file_path)[1].lower().encode())
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+# Cache file of the dissolved county polygons (or another layer derived from them, e.g. "county_adjacency")
+# of the shapefile at path
+def county_polygons_cache_path(path, cache_dir, layer="county_polygons"):
+    key = {
+        "version": COUNTY_POLYGONS_CACHE_VERSION,
+        "shapefile_sha256": county_shapefile_checksum(path),
+    }
+    key = hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+    return os.path.join(cache_dir, f"{layer}_{key[:16]}.parquet")
+
+
+# Load the dissolved county polygons of the shapefile at path, from the GeoParquet cache in cache_dir if the same
+# shapefile has been dissolved before, otherwise dissolve it and save it to the cache
+# cache_dir=None always reads and dissolves the shapefile, without caching
+def load_county_polygons(path, cache_dir=None):
+    if cache_dir is None:
+        return dissolve_county_polygons(gpd.read_file(path))
+
+    cache_path = county_polygons_cache_path(path, cache_dir)
+    if os.path.exists(cache_path):
+        print(f"Loading county polygons from cache: {cache_path}")
+        return gpd.read_parquet(cache_path)
+
+    us_county_polygons = dissolve_county_polygons(gpd.read_file(path))
+    os.makedirs(cache_dir, exist_ok=True)
+    # Write to a temporary file first, so an interrupted run never leaves a partial cache file behind
+    temporary_path = cache_path + ".tmp"
+    us_county_polygons.to_parquet(temporary_path)
+    os.replace(temporary_path, cache_path)
+    print(f"County polygons saved to cache: {cache_path}")
+    return us_county_polygons
+
+
+# Load only the county ID columns (GEOID, STATEFP, COUNTYFP), one row per GEOID in the same order as load_county_polygons
+# Reads just those columns of the GeoParquet cache if it exists, otherwise just the shapefile attributes (.dbf), so the
+# geometries are never read or dissolved
+def load_county_ids(path, cache_dir=None):
+    if cache_dir is not None:
+        cache_path = county_polygons_cache_path(path, cache_dir)
+        if os.path.exists(cache_path):
+            return pd.read_parquet(cache_path, columns=COUNTY_ID_COLUMNS)
+
+    us_county_ids = pd.DataFrame(gpd.read_file(path, ignore_geometry=True))
+    # Same rows and order as dissolve(by='GEOID'), which keeps the first attributes of each GEOID
+    us_county_ids = us_county_ids.groupby("GEOID").first().reset_index()
+    us_county_ids["GEOID"] = us_county_ids["GEOID"].astype(str).str.zfill(5)
+    return us_county_ids[COUNTY_ID_COLUMNS]
+
+
+# County adjacency graph, every pair of counties whose polygons touch or overlap, with a single STRtree over the
+# county polygons and one bulk query of all the polygons against it ("intersects" rather than "touches", as the
+# generalised boundaries of neighbouring counties can overlap slightly instead of sharing an edge exactly)
+# Returns an edge list dataframe of (GEOID, NEIGHBOR_GEOID), with both directions of every edge, sorted by GEOID then NEIGHBOR_GEOID
+def county_adjacency(us_county_polygons):
+    geometries = us_county_polygons.geometry.values
+    tree = shapely.STRtree(geometries)
+    county_index, neighbor_index = tree.query(geometries, predicate="intersects")
+    not_self = county_index != neighbor_index
+    geoids = us_county_polygons["GEOID"].to_numpy(dtype=object)
+    adjacency = pd.DataFrame(
+        {"GEOID": geoids[county_index[not_self]], "NEIGHBOR_GEOID": geoids[neighbor_index[not_self]]}
+    )
+    adjacency = adjacency.drop_duplicates().sort_values(["GEOID", "NEIGHBOR_GEOID"], kind="stable")
+    return adjacency.reset_index(drop=True)
+
+
+# Load the county adjacency graph of the shapefile at path, from the cache in cache_dir if it has been built before,
+# otherwise build it from the dissolved county polygons (see load_county_polygons) and save it to the cache
+# cache_dir=None always builds the graph, without caching
+def load_county_adjacency(path, cache_dir=None):
+    if cache_dir is None:
+        return county_adjacency(load_county_polygons(path))
+
+    cache_path = county_polygons_cache_path(path, cache_dir, layer="county_adjacency")
+    if os.path.exists(cache_path):
+        print(f"Loading county adjacency graph from cache: {cache_path}")
+        return pd.read_parquet(cache_path)
+
+    adjacency = county_adjacency(load_county_polygons(path, cache_dir))
+    temporary_path = cache_path + ".tmp"
+    adjacency.to_parquet(temporary_path)
+    os.replace(temporary_path, cache_path)
+    print(f"County adjacency graph saved to cache: {cache_path}")
+    return adjacency
+
+
+# k-ring neighbours of every county in the adjacency graph, the counties within k steps of it (excluding itself)
+# k=1 gives the adjacent counties, k=2 adds their neighbours etc. Returns an edge list in the same format as county_adjacency
+def county_neighbor_rings(adjacency, k):
+    rings = adjacency[["GEOID", "NEIGHBOR_GEOID"]]
+    ring = rings
+    for _ in range(1, k):
+        # Step one more county out from the counties reached so far
+        ring = ring.merge(adjacency, left_on="NEIGHBOR_GEOID", right_on="GEOID", suffixes=("", "_next"))
+        ring = ring[["GEOID", "NEIGHBOR_GEOID_next"]].rename(columns={"NEIGHBOR_GEOID_next": "NEIGHBOR_GEOID"})
+        ring = ring[ring["GEOID"] != ring["NEIGHBOR_GEOID"]].drop_duplicates()
+        ring = ring[~pd.MultiIndex.from_frame(ring).isin(pd.MultiIndex.from_frame(rings))]
+        if len(ring) == 0:
+            break
+        rings = pd.concat([rings, ring])
+    rings = rings.sort_values(["GEOID", "NEIGHBOR_GEOID"], kind="stable")
+    return rings.reset_index(drop=True)
@@ -0,0 +1,598 @@
+#######################
+"""
+Updated Nov, 2025
+
+@author: Joshua Green - University of Southampton
+
+Please cite this script/dataset if used in any research or publications.
+
+Green, J. (2025) NCEI Storm Multihazard Eventset.
+
+Multihazard pairing engine used by Generate_NCEI_Storm_Multihazard_Eventset.py
+"""
+#######################
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+
+# Events are only compared with other events that share the same location, i.e. the same county/zone fips and name
+PAIRING_GROUP_COLUMNS = ["STATE_FIPS", "CZ_FIPS", "CZ_NAME"]
+
+# Columns of the multihazard pair dataframe, in output order
+MULTIHAZARD_COLUMNS = [
+    "PAIR_ID",
+    "OVERLAPPING_EVENTS",
+    "EPISODE_ID",
+    "EVENT_ID",
+    "GEOID",
+    "STATE",
+    "STATE_FIPS",
+    "EVENT_TYPE",
+    "HAZARD",
+    "CZ_TYPE",
+    "CZ_FIPS",
+    "CZ_NAME",
+    "BEGIN_DATETIME",
+    "END_DATETIME",
+    "start_year",
+    "end_year",
+    "WFO",
+    "CZ_TIMEZONE",
+    "MULTI_INJURIES_DIRECT",
+    "INJURIES_DIRECT",
+    "MULTI_INJURIES_INDIRECT",
+    "INJURIES_INDIRECT",
+    "MULTI_DEATHS_DIRECT",
+    "DEATHS_DIRECT",
+    "MULTI_DEATHS_INDIRECT",
+    "DEATHS_INDIRECT",
+    "MULTI_ADJ_DAMAGE_PROPERTY",
+    "ADJ_DAMAGE_PROPERTY",
+    "MULTI_ADJ_DAMAGE_CROPS",
+    "ADJ_DAMAGE_CROPS",
+    "SOURCE",
+    "MAGNITUDE",
+    "MAGNITUDE_TYPE",
+    "FLOOD_CAUSE",
+    "CATEGORY",
+    "TOR_F_SCALE",
+    "TOR_LENGTH",
+    "TOR_WIDTH",
+    "TOR_OTHER_WFO",
+    "TOR_OTHER_CZ_STATE",
+    "TOR_OTHER_CZ_FIPS",
+    "TOR_OTHER_CZ_NAME",
+    "BEGIN_RANGE",
+    "BEGIN_AZIMUTH",
+    "BEGIN_LOCATION",
+    "END_RANGE",
+    "END_AZIMUTH",
+    "END_LOCATION",
+    "BEGIN_LAT",
+    "BEGIN_LON",
+    "END_LAT",
+    "END_LON",
+    "DATA_SOURCE",
+    "EPISODE_NARRATIVE",
+    "EVENT_NARRATIVE",
+]
+
+# Columns of the multihazard cluster dataframe, in output order, one row per event of each cluster
+# The MULTI_* columns are the cluster totals, with each event counted once however many pairs it is part of
+MULTIHAZARD_CLUSTER_COLUMNS = ["MULTIHAZARD_ID", "N_EVENTS", "HAZARD_SIGNATURE"] + [
+    column for column in MULTIHAZARD_COLUMNS if column != "PAIR_ID"
+]
+
+# Impact columns summed over the events of a pair or cluster, and the MULTI_* column each total is held in
+MULTIHAZARD_IMPACT_COLUMNS = {
+    "INJURIES_DIRECT": "MULTI_INJURIES_DIRECT",
+    "INJURIES_INDIRECT": "MULTI_INJURIES_INDIRECT",
+    "DEATHS_DIRECT": "MULTI_DEATHS_DIRECT",
+    "DEATHS_INDIRECT": "MULTI_DEATHS_INDIRECT",
+    "ADJ_DAMAGE_PROPERTY": "MULTI_ADJ_DAMAGE_PROPERTY",
+    "ADJ_DAMAGE_CROPS": "MULTI_ADJ_DAMAGE_CROPS",
+}
+
+
+# Check if datetime ranges overlap with a time lag
+def datetime_ranges_overlap_with_lag(start1, end1, start2, end2, lag):
+    return max(start1 - lag, start2 - lag) <= min(end1 + lag, end2 + lag)
+
+
+# Convert datetimes to int64 nanoseconds, timezone aware values are compared in UTC
+def _datetime_to_int64(values):
+    return pd.DatetimeIndex(values).as_unit("ns").asi8
+
+
+# Begin and end times the events are paired on, as int64 nanoseconds. Where the prepared events have the UTC datetimes
+# (see UTC_DATETIME_COLUMNS in NCEI_Prepared_Events.py) events in different timezones are compared on the same clock,
+# rows without them (an unknown timezone) fall back to their local standard time, as do all rows without the UTC columns
+def pairing_datetimes(df):
+    begin = _datetime_to_int64(df["BEGIN_DATETIME"])
+    end = _datetime_to_int64(df["END_DATETIME"])
+    if "BEGIN_DATETIME_UTC" in df.columns and "END_DATETIME_UTC" in df.columns:
+        begin_utc = df["BEGIN_DATETIME_UTC"]
+        end_utc = df["END_DATETIME_UTC"]
+        has_utc = (begin_utc.notna() & end_utc.notna()).to_numpy()
+        begin = np.where(has_utc, _datetime_to_int64(begin_utc), begin)
+        end = np.where(has_utc, _datetime_to_int64(end_utc), end)
+    return begin, end
+
+
+# Label each row with an integer group code, rows with a missing group value get -1 and are never paired
+# (this mirrors the == comparison in the original loop, where a missing CZ_NAME never matches anything)
+def pairing_group_codes(df, group_columns=PAIRING_GROUP_COLUMNS):
+    if len(df) == 0:
+        return np.zeros(0, dtype=np.int64)
+    codes = df.groupby(list(group_columns), sort=False, dropna=True, observed=True).ngroup()
+    return codes.fillna(-1).to_numpy(dtype=np.int64)
+
+
+# Sort-and-sweep interval join over the lag expanded [begin-lag, end+lag] windows
+# Returns the row positions (i, j), with i < j, of every pair of rows in the same group whose windows overlap,
+# ordered the same way a nested loop over the rows would first visit them (by i, then j)
+# Two rows overlap exactly when datetime_ranges_overlap_with_lag is True, i.e. max(begin) - lag <= min(end) + lag
+def sweep_overlapping_positions(begin, end, lag, groups=None):
+    begin = _datetime_to_int64(begin)
+    end = _datetime_to_int64(end)
+    lag = pd.Timedelta(lag).value
+    if groups is None:
+        groups = np.zeros(len(begin), dtype=np.int64)
+    groups = np.asarray(groups, dtype=np.int64)
+
+    window_start = begin - lag
+    window_end = end + lag
+
+    # Rows without a group, or with a window that ends before it starts, can never overlap anything
+    valid = np.flatnonzero((groups >= 0) & (window_start <= window_end))
+    if len(valid) < 2:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+
+    window_start = window_start[valid]
+    window_end = window_end[valid]
+    n = len(valid)
+
+    # Rank the window bounds together, then lay the groups end to end on one sorted axis so that
+    # a single searchsorted call finds the last window that starts before each window ends, within its own group
+    _, ranks = np.unique(np.concatenate([window_start, window_end]), return_inverse=True)
+    width = n * 2 + 1
+    start_key = groups[valid] * width + ranks[:n]
+    end_key = groups[valid] * width + ranks[n:]
+
+    order = np.argsort(start_key, kind="stable")
+    start_key = start_key[order]
+    end_key = end_key[order]
+
+    # Every later window that starts before this window ends is an overlap, the sweep only visits those
+    sorted_pos = np.arange(n)
+    last = np.searchsorted(start_key, end_key, side="right")
+    counts = np.maximum(last - sorted_pos - 1, 0)
+    total = counts.sum()
+    if total == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+
+    first_sorted = np.repeat(sorted_pos, counts)
+    run_offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    second_sorted = first_sorted + 1 + run_offsets
+
+    # Map back to the original row positions and orient/order each pair as the nested loop would
+    pos_a = valid[order[first_sorted]]
+    pos_b = valid[order[second_sorted]]
+    first = np.minimum(pos_a, pos_b)
+    second = np.maximum(pos_a, pos_b)
+    pair_order = np.lexsort((second, first))
+    return first[pair_order], second[pair_order]
+
+
+# Find the temporally overlapping events in a dataframe of events, vectorized replacement for the nested iterrows loop
+# Returns:
+#   overlapping_events - for each row (in df order), the list of the other EVENT_IDs it overlaps with, in df order
+#   event_pairs - (n, 2) array of the unique (EVENT_ID, EVENT_ID) pairs that overlap and have different EVENT_TYPEs,
+#                 in the same order and orientation that unique_pairs() kept from the loop
+def find_overlapping_events(df, lag, group_columns=PAIRING_GROUP_COLUMNS):
+    begin, end = pairing_datetimes(df)
+    first, second = sweep_overlapping_positions(begin, end, lag, pairing_group_codes(df, group_columns))
+    overlapping_events, event_pairs, pair_rows = overlapping_events_from_positions(df, first, second)
+    return overlapping_events, event_pairs
+
+
+# Overlapping events and event pairs from the row positions (i, j) of the overlapping rows, as find_overlapping_events,
+# plus the (n, 2) df row positions the event pairs were found at
+# The positions must be ordered by i, then j, as returned by sweep_overlapping_positions
+def overlapping_events_from_positions(df, first, second):
+    event_ids = df["EVENT_ID"].to_numpy()
+    event_types = df["EVENT_TYPE"].to_numpy(dtype=object)
+
+    # Events are not paired with themselves (same EVENT_ID), events in the same episode are allowed
+    different_event = event_ids[first] != event_ids[second]
+    first = first[different_event]
+    second = second[different_event]
+
+    # Each row lists the events it overlaps with, both earlier and later rows, in df order
+    rows = np.concatenate([first, second])
+    others = np.concatenate([second, first])
+    list_order = np.lexsort((others, rows))
+    rows = rows[list_order]
+    other_ids = event_ids[others[list_order]]
+    splits = np.searchsorted(rows, np.arange(1, len(df)))
+    overlapping_events = np.empty(len(df), dtype=object)
+    for i, ids in zip(range(len(df)), np.split(other_ids, splits)):
+        overlapping_events[i] = ids.tolist()
+
+    # Only events of a different hazard type make a multihazard pair,
+    # some events are recorded in parts despite being the same event, this avoids pairing an event with itself
+    different_type = event_types[first] != event_types[second]
+    pair_rows = np.stack([first[different_type], second[different_type]], axis=1)
+    event_pairs = event_ids[pair_rows].reshape(-1, 2)
+
+    # Keep the first occurrence of each unordered pair of EVENT_IDs
+    if len(event_pairs) > 0:
+        _, first_occurrence = np.unique(np.sort(event_pairs, axis=1), axis=0, return_index=True)
+        event_pairs = event_pairs[np.sort(first_occurrence)]
+        pair_rows = pair_rows[np.sort(first_occurrence)]
+
+    return overlapping_events, event_pairs, pair_rows
+
+
+# Pair the overlapping events of different hazard types in a single county
+# Returns the (n, 2) arrays of unique (EVENT_ID, EVENT_ID) pairs, of the GEOIDs of the pair members and of their
+# OVERLAPPING_EVENTS strings
+def pair_county_events(df, lag):
+    begin, end = pairing_datetimes(df)
+    first, second = sweep_overlapping_positions(begin, end, lag, pairing_group_codes(df))
+    overlapping_events, event_pairs, pair_rows = overlapping_events_from_positions(df, first, second)
+    return county_event_pairs(df, overlapping_events, event_pairs, pair_rows)
+
+
+# Attach the GEOIDs and OVERLAPPING_EVENTS strings to the event pairs of a single county (or of neighbouring counties),
+# pair_rows being the df row positions the pairs were found at (see overlapping_events_from_positions)
+def county_event_pairs(df, overlapping_events, event_pairs, pair_rows):
+    if len(event_pairs) == 0:
+        return event_pairs, np.zeros((0, 2), dtype=object), np.zeros((0, 2), dtype=object)
+
+    # A pair member is the first row in the county with its EVENT_ID, i.e. the first row with the (GEOID, EVENT_ID) of the
+    # row it was found at, its OVERLAPPING_EVENTS converted to a string for easier reading once per distinct row
+    pair_geoids = df["GEOID"].to_numpy(dtype=object)[pair_rows].reshape(-1, 2)
+    member_rows = lookup_event_positions(build_event_id_index(df), pair_geoids, event_pairs)
+    unique_rows, member_inverse = np.unique(member_rows, return_inverse=True)
+    overlapping_strings = np.array(
+        [",".join(map(str, overlapping_events[row])) for row in unique_rows], dtype=object
+    )
+    return event_pairs, pair_geoids, overlapping_strings[member_inverse].reshape(-1, 2)
+
+
+# (GEOID, EVENT_ID) lookup table, the sorted (GEOID, EVENT_ID) keys of dfevents and the position of the first row of each
+# An event can have rows in several counties, e.g. a zone event placed in each of its counties, so each pair member is
+# gathered from the row of the county it was paired in. The keys are int64, the GEOID code times key_base plus the EVENT_ID
+# Built once per run so that pair members can be gathered in bulk instead of scanning the frame for every EVENT_ID
+def build_event_id_index(dfevents):
+    geoid_codes, geoids = pd.factorize(dfevents["GEOID"].to_numpy(dtype=object))
+    event_ids = dfevents["EVENT_ID"].to_numpy(dtype=np.int64)
+    key_base = int(event_ids.max()) + 1 if len(event_ids) > 0 else 1
+    unique_keys, first_positions = np.unique(geoid_codes * key_base + event_ids, return_index=True)
+    return pd.Index(geoids), key_base, unique_keys, first_positions
+
+
+# Look up the dfevents row positions of arrays of GEOIDs and EVENT_IDs (of the same, any shape) in the lookup table
+def lookup_event_positions(event_id_index, geoids, event_ids):
+    geoid_index, key_base, unique_keys, first_positions = event_id_index
+    event_ids = np.asarray(event_ids, dtype=np.int64)
+    geoid_codes = geoid_index.get_indexer(np.asarray(geoids, dtype=object).ravel()).reshape(event_ids.shape)
+    keys = geoid_codes * key_base + event_ids
+    found = np.searchsorted(unique_keys, keys)
+    if (
+        len(unique_keys) == 0
+        or np.any(event_ids >= key_base)
+        or np.any(unique_keys[np.minimum(found, len(unique_keys) - 1)] != keys)
+    ):
+        raise KeyError("(GEOID, EVENT_ID) not found in the EVENT_ID lookup table")
+    return first_positions[found]
+
+
+# Build the multihazard pair dataframe in one pass from the (n, 2) arrays of EVENT_ID pairs, the GEOIDs of the pair members
+# and their OVERLAPPING_EVENTS strings
+# Pair members are gathered in bulk through the (GEOID, EVENT_ID) lookup table, PAIR_IDs are numbered by pair order
+def build_multihazard_df(dfevents, event_pairs, pair_geoids, overlapping_events, event_id_index=None):
+    if event_id_index is None:
+        event_id_index = build_event_id_index(dfevents)
+    pair_positions = lookup_event_positions(
+        event_id_index, np.asarray(pair_geoids, dtype=object).reshape(-1, 2), np.asarray(event_pairs).reshape(-1, 2)
+    )
+    overlapping_events = np.asarray(overlapping_events, dtype=object).reshape(-1, 2).copy()
+
+    # Reorder the two events of each pair by EVENT_TYPE, such that the event_type pairs are later formatted the same
+    event_types = dfevents["EVENT_TYPE"].to_numpy(dtype=object)
+    swap = event_types[pair_positions[:, 0]] > event_types[pair_positions[:, 1]]
+    pair_positions[swap] = pair_positions[swap, ::-1]
+    overlapping_events[swap] = overlapping_events[swap, ::-1]
+
+    dfmulti = dfevents.take(pair_positions.ravel())
+    dfmulti["PAIR_ID"] = np.repeat(np.arange(len(pair_positions), dtype=np.int64), 2)
+    dfmulti["OVERLAPPING_EVENTS"] = overlapping_events.ravel()
+
+    # Round the coordinates once for the whole gathered block
+    dfmulti["BEGIN_LAT"] = dfmulti["BEGIN_LAT"].round(2)
+    dfmulti["BEGIN_LON"] = dfmulti["BEGIN_LON"].round(2)
+    dfmulti["END_LAT"] = dfmulti["END_LAT"].round(2)
+    dfmulti["END_LON"] = dfmulti["END_LON"].round(2)
+
+    multi_sums = dfmulti.groupby("PAIR_ID")[
+        ["INJURIES_DIRECT", "INJURIES_INDIRECT", "DEATHS_DIRECT", "DEATHS_INDIRECT", "ADJ_DAMAGE_PROPERTY", "ADJ_DAMAGE_CROPS"]
+    ].transform("sum")
+    dfmulti["MULTI_INJURIES_DIRECT"] = multi_sums["INJURIES_DIRECT"]
+    dfmulti["MULTI_INJURIES_INDIRECT"] = multi_sums["INJURIES_INDIRECT"]
+    dfmulti["MULTI_DEATHS_DIRECT"] = multi_sums["DEATHS_DIRECT"]
+    dfmulti["MULTI_DEATHS_INDIRECT"] = multi_sums["DEATHS_INDIRECT"]
+    dfmulti["MULTI_ADJ_DAMAGE_PROPERTY"] = multi_sums["ADJ_DAMAGE_PROPERTY"]
+    dfmulti["MULTI_ADJ_DAMAGE_CROPS"] = multi_sums["ADJ_DAMAGE_CROPS"]
+
+    return dfmulti.reindex(columns=MULTIHAZARD_COLUMNS)
+
+
+# Events and county row positions shared with the worker processes, set before the pool is forked
+_worker_events = None
+_worker_county_positions = None
+_worker_lag = None
+
+
+# Worker task, pair the events of one county
+def _pair_county_task(county_key):
+    event_pairs, pair_geoids, overlapping_strings = pair_county_events(
+        _worker_events.iloc[_worker_county_positions[county_key]], _worker_lag
+    )
+    return county_key, event_pairs, pair_geoids, overlapping_strings
+
+
+# Pair the events in every county, optionally spreading the counties over a pool of worker processes
+# Counties are handed out largest first so that the busiest counties (e.g. Harris TX, Cook IL) don't finish last,
+# the pairs are then collected in state/county order, so PAIR_IDs are identical to a serial run for any n_workers
+# The workers inherit the events by forking, where fork is not available (e.g. Windows) the pairing runs serially
+def pair_events(dfevents, lag, n_workers=1, event_id_index=None):
+    global _worker_events, _worker_county_positions, _worker_lag
+
+    county_positions = dfevents.groupby(["STATE_FIPS", "CZ_FIPS"], sort=True, observed=True).indices
+    county_keys = sorted(county_positions.keys())
+
+    if n_workers > 1 and "fork" not in multiprocessing.get_all_start_methods():
+        print("Parallel pairing needs the fork start method, which is not available on this platform, pairing serially")
+        n_workers = 1
+
+    _worker_events, _worker_county_positions, _worker_lag = dfevents, county_positions, lag
+    results = {}
+    try:
+        if n_workers > 1:
+            largest_first = sorted(county_keys, key=lambda key: len(county_positions[key]), reverse=True)
+            with ProcessPoolExecutor(max_workers=n_workers, mp_context=multiprocessing.get_context("fork")) as executor:
+                futures = [executor.submit(_pair_county_task, key) for key in largest_first]
+                for future in tqdm(as_completed(futures), total=len(futures)):
+                    county_key, event_pairs, pair_geoids, overlapping_strings = future.result()
+                    results[county_key] = (event_pairs, pair_geoids, overlapping_strings)
+        else:
+            for county_key in tqdm(county_keys):
+                county_key, event_pairs, pair_geoids, overlapping_strings = _pair_county_task(county_key)
+                results[county_key] = (event_pairs, pair_geoids, overlapping_strings)
+    finally:
+        _worker_events, _worker_county_positions, _worker_lag = None, None, None
+
+    # Collect the pairs in state/county order, as the serial pair_id_count counter did, and build dfmulti once
+    event_pairs = np.concatenate([np.zeros((0, 2), dtype=np.int64)] + [results[key][0] for key in county_keys])
+    pair_geoids = np.concatenate([np.zeros((0, 2), dtype=object)] + [results[key][1] for key in county_keys])
+    overlapping_events = np.concatenate([np.zeros((0, 2), dtype=object)] + [results[key][2] for key in county_keys])
+    return build_multihazard_df(dfevents, event_pairs, pair_geoids, overlapping_events, event_id_index)
+
+
+# Overlapping rows of every county/zone and of neighbouring counties, with a time lag
+# Rows in the same county/zone are compared as in pair_events, county (CZ_TYPE "C") rows are also compared with the rows
+# of the neighbouring counties in county_neighbors, an edge list of (GEOID, NEIGHBOR_GEOID) in both directions (see
+# county_neighbor_rings). Rather than sweeping every county together with all its neighbours, each row is laid out once
+# for its own county and once for each neighbouring county that sorts before it, and a single sweep over that layout
+# finds every cross county overlap exactly once, in the group of the first of the two counties
+# Returns the row positions (i, j), with i < j, ordered by county (in state/county order), with the rows of the county itself
+# before those with its neighbours, then by i and j
+def neighborhood_overlapping_positions(dfevents, lag, county_neighbors):
+    begin, end = pairing_datetimes(dfevents)
+    county_codes = dfevents.groupby(["STATE_FIPS", "CZ_FIPS"], sort=True, observed=True).ngroup().to_numpy(dtype=np.int64)
+
+    # Rows in the same county/zone, in one sweep grouped by county/zone and name
+    within_first, within_second = sweep_overlapping_positions(begin, end, lag, pairing_group_codes(dfevents))
+
+    # County code of every county GEOID with events, and the neighbouring counties (with events) that sort before each
+    county_rows = np.flatnonzero((dfevents["CZ_TYPE"] == "C").to_numpy() & dfevents["GEOID"].notna().to_numpy())
+    row_geoids = dfevents["GEOID"].to_numpy(dtype=object)[county_rows]
+    row_codes = county_codes[county_rows]
+    geoid_codes = pd.Series(row_codes, index=row_geoids)
+    geoid_codes = geoid_codes[~geoid_codes.index.duplicated()]
+    edge_codes = geoid_codes.reindex(county_neighbors["GEOID"].to_numpy()).to_numpy()
+    neighbor_codes = geoid_codes.reindex(county_neighbors["NEIGHBOR_GEOID"].to_numpy()).to_numpy()
+    has_events = ~(np.isnan(edge_codes) | np.isnan(neighbor_codes))
+    edge_codes = edge_codes[has_events].astype(np.int64)
+    neighbor_codes = neighbor_codes[has_events].astype(np.int64)
+    earlier = neighbor_codes < edge_codes
+    edge_codes, neighbor_codes = edge_codes[earlier], neighbor_codes[earlier]
+    edge_order = np.lexsort((neighbor_codes, edge_codes))
+    edge_codes, neighbor_codes = edge_codes[edge_order], neighbor_codes[edge_order]
+
+    # Lay each row out once in its own county group, and once in the group of each earlier neighbouring county
+    edge_first = np.searchsorted(edge_codes, row_codes, side="left")
+    edge_counts = np.searchsorted(edge_codes, row_codes, side="right") - edge_first
+    neighbor_rows = np.repeat(np.arange(len(county_rows)), edge_counts)
+    neighbor_offsets = np.arange(len(neighbor_rows)) - np.repeat(np.cumsum(edge_counts) - edge_counts, edge_counts)
+    layout_rows = np.concatenate([np.arange(len(county_rows)), neighbor_rows])
+    layout_groups = np.concatenate([row_codes, neighbor_codes[edge_first[neighbor_rows] + neighbor_offsets]])
+    layout_own_county = np.concatenate([np.ones(len(county_rows), dtype=bool), np.zeros(len(neighbor_rows), dtype=bool)])
+    layout_order = np.lexsort((layout_rows, layout_groups))
+    layout_rows = county_rows[layout_rows[layout_order]]
+    layout_groups = layout_groups[layout_order]
+    layout_own_county = layout_own_county[layout_order]
+
+    # Only overlaps between a row of the group's own county and a row of a neighbouring county are kept,
+    # overlaps within the county are found above, and those between two neighbours belong to another group
+    first, second = sweep_overlapping_positions(begin[layout_rows], end[layout_rows], lag, layout_groups)
+    cross = layout_own_county[first] != layout_own_county[second]
+    cross_groups = layout_groups[first[cross]]
+    cross_first = np.minimum(layout_rows[first[cross]], layout_rows[second[cross]])
+    cross_second = np.maximum(layout_rows[first[cross]], layout_rows[second[cross]])
+
+    first = np.concatenate([within_first, cross_first])
+    second = np.concatenate([within_second, cross_second])
+    groups = np.concatenate([county_codes[within_first], cross_groups])
+    is_cross = np.concatenate([np.zeros(len(within_first), dtype=bool), np.ones(len(cross_first), dtype=bool)])
+    pair_order = np.lexsort((second, first, is_cross, groups))
+    return first[pair_order], second[pair_order]
+
+
+# Pair the events of every county/zone with each other and with the events of the neighbouring counties in county_neighbors
+# (see neighborhood_overlapping_positions), PAIR_IDs are numbered in state/county order as in pair_events
+# Events with the same EVENT_ID in several counties are compared once per county, their pairs are only kept once,
+# with each member taken from the county it was first paired in
+def pair_neighborhood_events(dfevents, lag, county_neighbors, event_id_index=None):
+    first, second = neighborhood_overlapping_positions(dfevents, lag, county_neighbors)
+    overlapping_events, event_pairs, pair_rows = overlapping_events_from_positions(dfevents, first, second)
+    event_pairs, pair_geoids, overlapping_strings = county_event_pairs(dfevents, overlapping_events, event_pairs, pair_rows)
+    return build_multihazard_df(dfevents, event_pairs, pair_geoids, overlapping_strings, event_id_index)
+
+
+# Candidate pairs for a parameter sweep, the overlapping rows of every county at the largest time lag of the sweep
+# Two events overlap with a time lag exactly when their gap, max(begin) - min(end), is at most twice the lag,
+# so the gap (in nanoseconds, negative when the events themselves overlap) is kept for every candidate pair and the
+# pairs of any smaller lag are a filter on it, see pair_events_from_candidates
+# Returns a dict of (STATE_FIPS, CZ_FIPS) -> (county row positions in dfevents, i, j, gap), i and j being county row positions
+# With county_neighbors (see pair_neighborhood_events) the pairs span counties, so the dict holds a single entry
+# for all of dfevents, keyed None
+def sweep_candidate_pairs(dfevents, max_lag, county_neighbors=None):
+    begin, end = pairing_datetimes(dfevents)
+
+    if county_neighbors is not None:
+        first, second = neighborhood_overlapping_positions(dfevents, max_lag, county_neighbors)
+        gap = np.maximum(begin[first], begin[second]) - np.minimum(end[first], end[second])
+        return {None: (np.arange(len(dfevents)), first, second, gap)}
+
+    county_positions = dfevents.groupby(["STATE_FIPS", "CZ_FIPS"], sort=True, observed=True).indices
+    candidates = {}
+    for county_key in tqdm(sorted(county_positions.keys())):
+        positions = county_positions[county_key]
+        county_begin = begin[positions]
+        county_end = end[positions]
+        first, second = sweep_overlapping_positions(
+            county_begin, county_end, max_lag, pairing_group_codes(dfevents.iloc[positions])
+        )
+        gap = np.maximum(county_begin[first], county_begin[second]) - np.minimum(county_end[first], county_end[second])
+        candidates[county_key] = (positions, first, second, gap)
+    return candidates
+
+
+# Pair the events of dfevents[event_mask] with a time lag from the candidate pairs of sweep_candidate_pairs
+# The lag must not be larger than the lag of the candidates, and event_mask (e.g. stricter impact thresholds) selects a
+# subset of the events the candidates were found for. The result is identical to pair_events(dfevents[event_mask], lag)
+def pair_events_from_candidates(dfevents, candidates, lag, event_mask=None, event_id_index=None):
+    if event_mask is None:
+        event_mask = np.ones(len(dfevents), dtype=bool)
+    event_mask = np.asarray(event_mask, dtype=bool)
+    max_gap = 2 * pd.Timedelta(lag).value
+
+    event_pairs = [np.zeros((0, 2), dtype=np.int64)]
+    pair_geoids = [np.zeros((0, 2), dtype=object)]
+    overlapping_events = [np.zeros((0, 2), dtype=object)]
+    for positions, first, second, gap in candidates.values():
+        county_mask = event_mask[positions]
+        if np.count_nonzero(county_mask) < 2:
+            continue
+        keep = county_mask[first] & county_mask[second] & (gap <= max_gap)
+
+        # Positions of the kept rows within the filtered county, row order is unchanged by the filter
+        filtered_positions = np.cumsum(county_mask) - 1
+        county_df = dfevents.iloc[positions[county_mask]]
+        county_overlapping_events, county_pairs, county_pair_rows = overlapping_events_from_positions(
+            county_df, filtered_positions[first[keep]], filtered_positions[second[keep]]
+        )
+        county_pairs, county_geoids, county_strings = county_event_pairs(
+            county_df, county_overlapping_events, county_pairs, county_pair_rows
+        )
+        event_pairs.append(county_pairs)
+        pair_geoids.append(county_geoids)
+        overlapping_events.append(county_strings)
+
+    return build_multihazard_df(
+        dfevents[event_mask],
+        np.concatenate(event_pairs),
+        np.concatenate(pair_geoids),
+        np.concatenate(overlapping_events),
+        event_id_index,
+    )
+
+
+# Array based union-find over the nodes 0..n_nodes-1 joined by the edges (a, b), returns the root node of each node
+# Every round hooks the root of each unmerged edge onto the smaller of the two roots, then compresses the paths by
+# pointer jumping, all as whole array operations. Roots only ever point to smaller nodes so no cycles can form, and
+# the edges left to merge shrink each round, giving near linear time over the full pair list
+def union_find_roots(n_nodes, a, b):
+    parent = np.arange(n_nodes)
+    a = np.asarray(a, dtype=np.int64)
+    b = np.asarray(b, dtype=np.int64)
+    while True:
+        # Path compression, until every node points directly to its root
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+
+        root_a = parent[a]
+        root_b = parent[b]
+        unmerged = root_a != root_b
+        if not unmerged.any():
+            return parent
+        a, b = a[unmerged], b[unmerged]
+        root_a, root_b = root_a[unmerged], root_b[unmerged]
+        np.minimum.at(parent, np.maximum(root_a, root_b), np.minimum(root_a, root_b))
+
+
+# Group the multihazard pairs of dfmulti into N-ary clusters, the connected components of the overlap graph with the events
+# as nodes and the pairs as edges, e.g. a hail + tornado + flash flood sequence is one cluster rather than three pairs
+# Returns one row per event of each cluster (taken from its first row in dfmulti), with:
+#   MULTIHAZARD_ID - numbered in order of the first PAIR_ID of each cluster
+#   N_EVENTS - number of events in the cluster
+#   HAZARD_SIGNATURE - the sorted, distinct HAZARD codes of the cluster joined by "+", e.g. "ff+hl+tn"
+#   MULTI_* - the cluster impact totals, each event counted once
+def build_multihazard_clusters(dfmulti):
+    if len(dfmulti) == 0:
+        return pd.DataFrame(columns=MULTIHAZARD_CLUSTER_COLUMNS)
+
+    # Nodes are the distinct EVENT_IDs, dfmulti holds the two events of each pair in consecutive rows
+    event_ids, nodes = np.unique(dfmulti["EVENT_ID"].to_numpy(), return_inverse=True)
+    nodes = nodes.reshape(-1, 2)
+    roots = union_find_roots(len(event_ids), nodes[:, 0], nodes[:, 1])
+
+    # One row per event, in dfmulti order, numbered by the first appearance of their cluster
+    _, event_rows = np.unique(nodes.ravel(), return_index=True)
+    event_rows = np.sort(event_rows)
+    event_roots = roots[nodes.ravel()[event_rows]]
+    _, first_appearance, cluster_codes = np.unique(event_roots, return_index=True, return_inverse=True)
+    multihazard_ids = np.argsort(np.argsort(first_appearance))[cluster_codes]
+
+    dfclusters = dfmulti.take(event_rows)
+    dfclusters["MULTIHAZARD_ID"] = multihazard_ids.astype(np.int64)
+    dfclusters = dfclusters.iloc[np.argsort(multihazard_ids, kind="stable")]
+
+    cluster_groups = dfclusters.groupby("MULTIHAZARD_ID", sort=False)
+    dfclusters["N_EVENTS"] = cluster_groups["EVENT_ID"].transform("size")
+    cluster_sums = cluster_groups[list(MULTIHAZARD_IMPACT_COLUMNS)].transform("sum")
+    for column, multi_column in MULTIHAZARD_IMPACT_COLUMNS.items():
+        dfclusters[multi_column] = cluster_sums[column]
+
+    # Hazard combination signature, from the distinct (cluster, hazard) rows
+    cluster_hazards = pd.DataFrame(
+        {"MULTIHAZARD_ID": dfclusters["MULTIHAZARD_ID"].to_numpy(), "HAZARD": dfclusters["HAZARD"].astype(str).to_numpy()}
+    ).drop_duplicates().sort_values(["MULTIHAZARD_ID", "HAZARD"])
+    signatures = cluster_hazards.groupby("MULTIHAZARD_ID", sort=True)["HAZARD"].agg("+".join)
+    dfclusters["HAZARD_SIGNATURE"] = signatures.reindex(dfclusters["MULTIHAZARD_ID"]).to_numpy()
+
+    return dfclusters.reindex(columns=MULTIHAZARD_CLUSTER_COLUMNS)
+
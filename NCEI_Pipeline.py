@@ -0,0 +1,760 @@
+#######################
+"""
+Updated Nov, 2025
+
+@author: Joshua Green - University of Southampton
+
+Please cite this script/dataset if used in any research or publications.
+
+Green, J. (2025) NCEI Storm Multihazard Eventset.
+
+Importable pipeline, the stages of Clean_NCEI_Storm_Database.py and Generate_NCEI_Storm_Multihazard_Eventset.py as functions
+that pass their intermediates (cleaned details, prepared events, pairs, county dicts) in memory, with a command line entry point
+
+    python NCEI_Pipeline.py clean DETAILS_DIR OUTPUT_DIR
+    python NCEI_Pipeline.py eventset CLEANED_PARQUET OUTPUT_DIR --time-lag-days 30
+    python NCEI_Pipeline.py eventset CLEANED_PARQUET OUTPUT_DIR --sweep-time-lag-days 7 30 --sweep-impact-thresholds 1,1,10,10 5,5,100,100
+    python NCEI_Pipeline.py run DETAILS_DIR OUTPUT_DIR    (clean in memory, then generate the eventset from the cleaned details)
+
+or from python, e.g. to generate several eventsets from one set of prepared events
+
+    dfprepared, zone_counties = split_zone_counties(prepare_events(clean_details(details_dir)))
+    dfevents = dfprepared[impact_filter_mask(dfprepared, 1, 1, 10, 10)]
+    dfmulti = find_pairs(dfevents, 30, zone_counties=zone_counties)
+"""
+#######################
+
+import argparse
+import os
+import pickle
+from datetime import datetime
+
+import pandas as pd
+
+from NCEI_County_Hazard_Dicts import COUNTY_HAZARD_DICT_FILES, build_county_hazard_dicts, write_county_hazard_table
+from NCEI_County_Polygons import county_neighbor_rings, load_county_adjacency, load_county_ids, load_county_polygons
+from NCEI_Multihazard_Pairing import (
+    build_event_id_index,
+    build_multihazard_clusters,
+    pair_events,
+    pair_events_from_candidates,
+    pair_neighborhood_events,
+    sweep_candidate_pairs,
+)
+from NCEI_Prepared_Events import (
+    ZONE_GEOIDS_COLUMN,
+    attach_narratives,
+    expand_zone_events,
+    impact_filter_mask,
+    join_narratives,
+    load_prepared_events,
+    prepare_events as prepare_cleaned_events,
+    read_narratives,
+    zone_event_counties,
+)
+from NCEI_Run_Report import save_run_report, stage, start_run_report
+from NCEI_Spatial_Assignment import assign_event_counties, expand_to_event_counties
+from NCEI_Storm_Details_Cleaning import (
+    CPI_TABLE_PATH,
+    NWS_ZONE_TABLE_PATH,
+    build_cz_fips_mapping,
+    clean_filtered_details,
+    cleaning_options,
+    details_files,
+    filter_details,
+    incremental_clean_details,
+    latest_details_files,
+    load_files,
+    location_info_counts,
+    print_location_info,
+    read_cpi_table,
+    read_nws_zone_table,
+    stream_clean_details,
+    write_details_from_dataset,
+    write_details_parquet,
+    write_narratives_parquet,
+)
+from NCEI_Storm_Details_Schema import apply_details_schema
+
+
+US_COUNTY_SHAPEFILE_URL = 'https://github.com/jagreen1/NCEI_Storm_Multihazard_Eventset/raw/refs/heads/main/cb_2018_us_county_500k.shp'
+
+# Default hazard types (see the lookup table in Generate_NCEI_Storm_Multihazard_Eventset.py) and excluded states (US territories
+# and water bodies), used by Generate_NCEI_Storm_Multihazard_Eventset.py and the command line
+HAZARD_EVENT_INCLUSION_FILTER = ["av","bz","cfl","cw","df","dr","ds","ew","ff","fl","hl","ht","hw","is","les","ls","lt","ltn","p","pfl","se","sm","sn","sst","tc","tn","ts","tw","vo","wf","ws","ww"]
+EXCLUSION_STATE_LIST = [
+    "ALASKA",
+    "AMERICAN SAMOA",
+    "ATLANTIC NORTH",
+    "ATLANTIC SOUTH",
+    "E PACIFIC",
+    "GUAM WATERS",
+    "GUAM",
+    "GULF OF ALASKA",
+    "GULF OF MEXICO",
+    "HAWAII WATERS",
+    "HAWAII",
+    "LAKE ERIE",
+    "LAKE HURON",
+    "LAKE MICHIGAN",
+    "LAKE ONTARIO",
+    "LAKE ST CLAIR",
+    "LAKE SUPERIOR",
+    "PUERTO RICO",
+    "ST LAWRENCE R",
+    "VIRGIN ISLANDS",
+]
+
+# The cleaned outputs cover every year, and 1996 onwards (when NCEI started recording all the event types)
+CLEANED_START_DATETIME_1996 = datetime.strptime("1996-01-01 00:00:00", "%Y-%m-%d %H:%M:%S")
+
+
+def create_folder_if_not_exists(folder_path):
+    if not os.path.exists(folder_path):
+        os.makedirs(folder_path)
+        print(f"Folder created at: {folder_path}")
+    else:
+        print(f"Folder already exists at: {folder_path}")
+
+
+# Cleaned database outputs in output_path, for the years they cover (e.g. "1996-2024")
+def cleaned_details_path(output_path, years, extension):
+    return os.path.join(output_path, f"NCEI_Storm_Database_Cleaned_Details_{years}.{extension}")
+
+
+def cleaned_narratives_path(output_path):
+    return os.path.join(output_path, "NCEI_Storm_Database_Cleaned_Narratives_1950-2024.parquet")
+
+
+def cleaned_dataset_path(output_path):
+    return os.path.join(output_path, "NCEI_Storm_Database_Cleaned_Details_Dataset")
+
+
+# Clean the annual details files in memory: load, filter, remap the zone CZ_FIPS and clean (see NCEI_Storm_Details_Cleaning.py),
+# sorted by BEGIN_DATETIME and CZ_FIPS without duplicates, as save_cleaned_details saves it
+# details is a directory of the NCEI bulk download or a list of details files, only the latest revision of each year is
+# used (see latest_details_files), as by stream_cleaned_details. options are the cleaning options (see cleaning_options),
+# None uses the default options with the repository copies of the NWS zone and CPI tables
+def clean_details(details, options=None):
+    csv_files = latest_details_files(details_files(details) if isinstance(details, str) else list(details))
+    if options is None:
+        options = cleaning_options(read_nws_zone_table(), read_cpi_table())
+
+    with stage("load_files") as record:
+        df_details = load_files(csv_files)
+        record["rows_out"] = len(df_details)
+    with stage("filter_details", rows_in=len(df_details)) as record:
+        df_details = filter_details(df_details)
+        record["rows_out"] = len(df_details)
+
+    with stage("cz_fips_mapping", rows_in=len(df_details)):
+        mapping = build_cz_fips_mapping(df_details)
+    with stage("clean_details", rows_in=len(df_details)) as record:
+        df_details = apply_details_schema(clean_filtered_details(df_details, mapping, options))
+        record["rows_out"] = len(df_details)
+
+    print_location_info(location_info_counts(df_details))
+
+    with stage("sort_deduplicate", rows_in=len(df_details)) as record:
+        df_details = df_details.sort_values(
+            ["BEGIN_DATETIME", "CZ_FIPS"], ascending=[True, True]
+        )
+        df_details = df_details.drop_duplicates()
+        record["rows_out"] = len(df_details)
+    return df_details
+
+
+# Save the cleaned details from clean_details as csv and parquet, for every year and for 1996 onwards only
+# With the narrative_side_file option the narratives are saved to their own parquet file, see write_details_parquet
+def save_cleaned_details(df_details, output_path, options):
+    with stage("write_csv", rows_in=len(df_details)) as record:
+        df_details.to_csv(cleaned_details_path(output_path, "1950-2024", "csv"), header=True, encoding="utf-8")
+        record["rows_out"] = len(df_details)
+    with stage("write_parquet", rows_in=len(df_details)) as record:
+        write_details_parquet(df_details, cleaned_details_path(output_path, "1950-2024", "parquet"), options["narrative_side_file"])
+        record["rows_out"] = len(df_details)
+    if options["narrative_side_file"]:
+        with stage("write_narratives", rows_in=len(df_details)):
+            write_narratives_parquet(df_details, cleaned_narratives_path(output_path))
+
+    # Save version with just 1996 to 2024 data, as csv and parquet
+    df_details_1996_2024 = df_details[df_details["BEGIN_DATETIME"] >= CLEANED_START_DATETIME_1996]
+    df_details_1996_2024 = df_details_1996_2024.sort_values(
+        ["BEGIN_DATETIME", "CZ_FIPS"], ascending=[True, True]
+    )
+    df_details_1996_2024 = df_details_1996_2024.drop_duplicates()
+
+    with stage("write_csv", rows_in=len(df_details_1996_2024)) as record:
+        df_details_1996_2024.to_csv(cleaned_details_path(output_path, "1996-2024", "csv"), header=True, encoding="utf-8")
+        record["rows_out"] = len(df_details_1996_2024)
+    with stage("write_parquet", rows_in=len(df_details_1996_2024)) as record:
+        write_details_parquet(
+            df_details_1996_2024, cleaned_details_path(output_path, "1996-2024", "parquet"), options["narrative_side_file"]
+        )
+        record["rows_out"] = len(df_details_1996_2024)
+
+
+# Clean the annual details files with bounded memory, one file (or block of chunksize rows) at a time into a year partitioned
+# parquet dataset in output_path, then save the same outputs as save_cleaned_details from the dataset one year at a time
+# incremental=True keeps the dataset between runs and only re-cleans the new or changed files, see incremental_clean_details
+def stream_cleaned_details(details, output_path, options=None, chunksize=None, incremental=False):
+    csv_files = details_files(details) if isinstance(details, str) else list(details)
+    if options is None:
+        options = cleaning_options(read_nws_zone_table(), read_cpi_table())
+    dataset_path = cleaned_dataset_path(output_path)
+
+    if incremental:
+        location_counts = incremental_clean_details(csv_files, dataset_path, options, chunksize=chunksize)
+    else:
+        location_counts = stream_clean_details(latest_details_files(csv_files), dataset_path, options, chunksize=chunksize)
+    if location_counts.get("total_events", 0) > 0:
+        print_location_info(location_counts)
+
+    write_details_from_dataset(
+        dataset_path,
+        cleaned_details_path(output_path, "1950-2024", "csv"),
+        cleaned_details_path(output_path, "1950-2024", "parquet"),
+        options,
+        narratives_path=cleaned_narratives_path(output_path) if options["narrative_side_file"] else None,
+    )
+    write_details_from_dataset(
+        dataset_path,
+        cleaned_details_path(output_path, "1996-2024", "csv"),
+        cleaned_details_path(output_path, "1996-2024", "parquet"),
+        options,
+        start_datetime=CLEANED_START_DATETIME_1996,
+    )
+    return dataset_path
+
+
+# Prepare the cleaned database for pairing: GEOIDs, qa/qc, hazard type, temporal and state filters, see NCEI_Prepared_Events.py
+# cleaned is either the cleaned details dataframe from clean_details, prepared directly (with its narratives), or the path of
+# a cleaned database parquet file, read with the filters pushed into the reader and without the narratives (see
+# load_event_narratives), from the prepared events cache in cache_dir if given
+def prepare_events(
+    cleaned,
+    hazard_event_inclusion_filter=HAZARD_EVENT_INCLUSION_FILTER,
+    exclusion_state_list=EXCLUSION_STATE_LIST,
+    start_year=1996,
+    end_year=2024,
+    cache_dir=None,
+):
+    with stage("prepare_events") as record:
+        if isinstance(cleaned, pd.DataFrame):
+            record["rows_in"] = len(cleaned)
+            # prepare_events assigns to the dataframe it is given, leave the cleaned details as they are
+            dfprepared = prepare_cleaned_events(
+                cleaned.copy(), hazard_event_inclusion_filter, exclusion_state_list, start_year, end_year
+            )
+        else:
+            dfprepared = load_prepared_events(
+                cleaned, hazard_event_inclusion_filter, exclusion_state_list, start_year, end_year, cache_dir=cache_dir
+            )
+        record["rows_out"] = len(dfprepared)
+    return dfprepared
+
+
+# Split the counties of the zone events (see zone_event_counties) off the prepared events from prepare_events, which keep a
+# single row per event. Returns the events and the zone counties, None without the NWS zone to county table, which
+# find_pairs and build_county_dicts use to count the zone events in every county of their zone
+def split_zone_counties(dfprepared):
+    zone_counties = zone_event_counties(dfprepared)
+    return dfprepared.drop(columns=[ZONE_GEOIDS_COLUMN], errors="ignore"), zone_counties
+
+
+# Narratives of the final (impact filtered) events, from the cleaned database the events were prepared from (with the same
+# filters) or with narratives_path from the narratives side file. Returns the events and the side file narratives, if any,
+# which save_eventset joins to the outputs. Events prepared from a cleaned details dataframe already have their narratives,
+# events read from a cleaned database file have their duplicates dropped here, once the narratives are attached
+def load_event_narratives(
+    dfevents,
+    cleaned,
+    narratives_path=None,
+    hazard_event_inclusion_filter=HAZARD_EVENT_INCLUSION_FILTER,
+    exclusion_state_list=EXCLUSION_STATE_LIST,
+    start_year=1996,
+    end_year=2024,
+):
+    with stage("load_narratives", rows_in=len(dfevents)) as record:
+        narratives_df = None
+        if not isinstance(cleaned, pd.DataFrame):
+            dfevents = attach_narratives(
+                dfevents, cleaned, hazard_event_inclusion_filter, exclusion_state_list, start_year, end_year
+            )
+        if narratives_path is not None:
+            narratives_df = read_narratives(narratives_path, dfevents["EVENT_ID"].to_numpy())
+        record["rows_out"] = len(dfevents)
+    return dfevents, narratives_df
+
+
+# Join the narratives from the side file, if any, to an output dataframe
+def with_narratives(df, narratives_df):
+    if narratives_df is None:
+        return df
+    return join_narratives(df, narratives_df)
+
+
+# County IDs for the county hazard dictionaries, plus the dissolved county polygons for the "spatial" county_assignment_mode
+# and the k-ring county neighbours for neighbourhood pairing (pairing_neighbor_rings > 0), otherwise None
+# cache_dir caches the dissolved polygons and adjacency graph, see NCEI_County_Polygons.py
+def load_counties(shapefile_path, county_assignment_mode="cz_fips", pairing_neighbor_rings=0, cache_dir=None):
+    us_county_polygons = None
+    with stage("load_counties") as record:
+        if county_assignment_mode == "spatial":
+            us_county_polygons = load_county_polygons(shapefile_path, cache_dir=cache_dir)
+            print(f'US County Polygon CRS: {us_county_polygons.geometry.crs}')
+        us_county_ids = load_county_ids(shapefile_path, cache_dir=cache_dir)
+        record["rows_out"] = len(us_county_ids)
+
+    county_neighbors = None
+    if pairing_neighbor_rings > 0:
+        with stage("county_adjacency") as record:
+            county_adjacency_graph = load_county_adjacency(shapefile_path, cache_dir=cache_dir)
+            county_neighbors = county_neighbor_rings(county_adjacency_graph, pairing_neighbor_rings)
+            record["rows_out"] = len(county_neighbors)
+    return us_county_ids, us_county_polygons, county_neighbors
+
+
+# Counties each event's geometries intersect, for the "spatial" county_assignment_mode, see NCEI_Spatial_Assignment.py
+def assign_counties(dfevents, us_county_polygons):
+    with stage("spatial_assignment", rows_in=len(dfevents)) as record:
+        event_counties = assign_event_counties(dfevents, us_county_polygons)
+        record["rows_out"] = len(event_counties)
+    return event_counties
+
+
+# Pair the overlapping events of different hazard types in each county/zone, within time_lag_days of each other
+# PAIR_IDs are numbered in state/county order, with n_workers > 1 the counties are spread over several processes and the
+# result is identical to a serial run. With county_neighbors (see load_counties) events are also paired with the events
+# of the neighbouring counties, as a single vectorized sweep over all the counties (n_workers is not used)
+# With zone_counties (see split_zone_counties) the zone events are paired in every county of their zone, event_id_index
+# is then that of the expanded events (see expand_zone_events)
+# The cpu time of the pairing stage includes the worker processes
+def find_pairs(dfevents, time_lag_days, n_workers=1, county_neighbors=None, event_id_index=None, zone_counties=None):
+    time_lag = pd.Timedelta(days=time_lag_days)
+    with stage("pairing", rows_in=len(dfevents)) as record:
+        dfevents = expand_zone_events(dfevents, zone_counties)
+        if event_id_index is None:
+            event_id_index = build_event_id_index(dfevents)
+        if county_neighbors is None:
+            dfmulti = pair_events(dfevents, time_lag, n_workers=n_workers, event_id_index=event_id_index)
+        else:
+            dfmulti = pair_neighborhood_events(dfevents, time_lag, county_neighbors, event_id_index=event_id_index)
+        record["rows_out"] = len(dfmulti)
+    return dfmulti
+
+
+# County hazard dictionaries of an eventset, in a 3x nested structure of year->state->county, for every year in year_range
+# and every county in us_county_ids. Counties are matched to events via the county GEOID, or with event_counties (see
+# assign_counties) via the county polygons each event intersects. split_pairs counts a pair with its events in two
+# neighbouring counties in both counties, for neighbourhood pairing. With zone_counties (see split_zone_counties) the zone
+# events are counted in every county of their zone, dfmulti already has a row per county the pairs were found in
+def build_county_dicts(dfevents, dfmulti, year_range, us_county_ids, event_counties=None, split_pairs=False, zone_counties=None):
+    with stage("dict_build", rows_in=len(dfevents) + len(dfmulti)):
+        dfevents = expand_zone_events(dfevents, zone_counties)
+        if event_counties is None:
+            return build_county_hazard_dicts(dfevents, dfmulti, year_range, us_county_ids, split_pairs=split_pairs)
+        return build_county_hazard_dicts(
+            expand_to_event_counties(dfevents, event_counties),
+            expand_to_event_counties(dfmulti, event_counties),
+            year_range,
+            us_county_ids,
+            split_pairs=split_pairs,
+        )
+
+
+# Function to access the values from the x3 nested dictionaries
+def get_values(data):
+    values = []
+    for value in data.values():
+        if isinstance(value, dict):  # Check if the value is another dictionary
+            values.extend(get_values(value))  # Recursively collect values
+        else:
+            values.extend(value)  # Add the list of values directly
+    return values
+
+
+# Eventset outputs in output_path, named by the impact thresholds, time lag and years of the eventset
+def eventset_file_path(output_path, name, inj, dth, c, p, time_lag_days, start_year, end_year):
+    return os.path.join(output_path, f"{name}_{inj}inj_{dth}dth_{c}c_{p}p_lag{time_lag_days}_{start_year}-{end_year}.parquet.gz")
+
+
+def eventset_dicts_path(output_path, inj, dth, c, p, time_lag_days, start_year, end_year):
+    return os.path.join(output_path, f"Eventset_Dicts_{inj}inj_{dth}dth_{c}c_{p}p_lag{time_lag_days}_{start_year}-{end_year}")
+
+
+# Save an eventset: the impact filtered events, the county hazard dictionaries and the single-only/multihazard events,
+# plus the event counties (spatial county assignment) and the multihazard clusters (cluster_mode) if used
+# dict_output_format is "pickle", "parquet" (a single long format table, see write_county_hazard_table) or "both"
+# Returns the single-only hazard events
+def save_eventset(
+    output_path,
+    dfevents,
+    dfmulti,
+    county_hazard_dicts,
+    inj,
+    dth,
+    c,
+    p,
+    time_lag_days,
+    start_year,
+    end_year,
+    narratives_df=None,
+    event_counties=None,
+    dict_output_format="pickle",
+    cluster_mode=False,
+):
+    eventset_name = (inj, dth, c, p, time_lag_days, start_year, end_year)
+    Hazard_Dict_Output_Path = eventset_dicts_path(output_path, *eventset_name)
+    create_folder_if_not_exists(Hazard_Dict_Output_Path)
+
+    with stage("write_events", rows_in=len(dfevents)) as record:
+        with_narratives(dfevents, narratives_df).to_parquet(
+            eventset_file_path(output_path, "dfevents", *eventset_name), compression="gzip"
+        )
+        record["rows_out"] = len(dfevents)
+    if event_counties is not None:
+        with stage("write_event_counties"):
+            event_counties[event_counties["EVENT_ID"].isin(dfevents["EVENT_ID"])].to_parquet(
+                eventset_file_path(output_path, "event_counties", *eventset_name), compression="gzip"
+            )
+
+    #Save final dictionaries as pickle and/or as a single long format parquet table
+    with stage("write_dicts"):
+        if dict_output_format in ("pickle", "both"):
+            for name, file_name in COUNTY_HAZARD_DICT_FILES.items():
+                with open(os.path.join(Hazard_Dict_Output_Path, file_name), 'wb') as file:
+                    pickle.dump(county_hazard_dicts[name], file)
+            print("All hazard dicts saved as pickle")
+
+        if dict_output_format in ("parquet", "both"):
+            # Load back with NCEI_County_Hazard_Dicts.load_county_hazard_dicts(), which rebuilds the nested dicts
+            write_county_hazard_table(county_hazard_dicts, os.path.join(Hazard_Dict_Output_Path, 'NCEI_County_Hazard_Table.parquet'))
+            print("All hazard dicts saved as parquet table")
+
+    # Subset single hazard events to single-only hazard (single hazards that do not make up a multi-hazard pair)
+    with stage("write_single_multi", rows_in=len(dfevents) + len(dfmulti)) as record:
+        single_only_hazard_events = get_values(county_hazard_dicts["single_hazard_event_dict"])
+        dfsingle = with_narratives(dfevents[dfevents['EVENT_ID'].isin(single_only_hazard_events)], narratives_df)
+
+        dfsingle.to_parquet(eventset_file_path(output_path, "dfsingle", *eventset_name), compression="gzip")
+        with_narratives(dfmulti, narratives_df).to_parquet(
+            eventset_file_path(output_path, "dfmulti", *eventset_name), compression="gzip"
+        )
+        record["rows_out"] = len(dfsingle) + len(dfmulti)
+    if cluster_mode:
+        with stage("multihazard_clusters", rows_in=len(dfmulti)) as record:
+            dfclusters = build_multihazard_clusters(dfmulti)
+            with_narratives(dfclusters, narratives_df).to_parquet(
+                eventset_file_path(output_path, "dfclusters", *eventset_name), compression="gzip"
+            )
+            record["rows_out"] = len(dfclusters)
+
+    print(f'Total Number of Hazard Events: {dfevents["EVENT_ID"].nunique()}')
+    print(f'Number of Single Hazard Only Events:{dfsingle["EVENT_ID"].nunique()}')
+    print(f'Number of Multi-Hazard Events:{int(len(dfmulti)/2)}')
+    if cluster_mode:
+        print(f'Number of Multi-Hazard Clusters:{dfclusters["MULTIHAZARD_ID"].nunique()}')
+    return dfsingle
+
+
+# Prepared, impact filtered events of an eventset (or, for a sweep, the events passing the lowest thresholds) with their
+# narratives, event counties, zone counties and the county IDs and neighbours, see generate_eventset
+def eventset_events(
+    cleaned,
+    output_path,
+    shapefile_path,
+    start_year,
+    end_year,
+    impact_thresholds,
+    county_assignment_mode,
+    pairing_neighbor_rings,
+    narratives_path,
+    use_caches,
+    hazard_event_inclusion_filter,
+    exclusion_state_list,
+):
+    create_folder_if_not_exists(output_path)
+    filters = (hazard_event_inclusion_filter, exclusion_state_list, start_year, end_year)
+    dfprepared, zone_counties = split_zone_counties(
+        prepare_events(cleaned, *filters, cache_dir=os.path.join(output_path, "Prepared_Events_Cache") if use_caches else None)
+    )
+    us_county_ids, us_county_polygons, county_neighbors = load_counties(
+        shapefile_path,
+        county_assignment_mode,
+        pairing_neighbor_rings,
+        cache_dir=os.path.join(output_path, "County_Polygons_Cache") if use_caches else None,
+    )
+
+    with stage("impact_filter", rows_in=len(dfprepared)) as record:
+        dfevents = dfprepared[impact_filter_mask(dfprepared, *impact_thresholds)]
+        record["rows_out"] = len(dfevents)
+    dfevents, narratives_df = load_event_narratives(dfevents, cleaned, narratives_path, *filters)
+    event_counties = assign_counties(dfevents, us_county_polygons) if county_assignment_mode == "spatial" else None
+    return dfevents, narratives_df, event_counties, zone_counties, us_county_ids, county_neighbors
+
+
+# Generate and save a single eventset from the cleaned details (a dataframe from clean_details or a cleaned parquet path),
+# the parameters are those of Generate_NCEI_Storm_Multihazard_Eventset.py. Returns the events, pairs and county hazard dicts
+def generate_eventset(
+    cleaned,
+    output_path,
+    shapefile_path=US_COUNTY_SHAPEFILE_URL,
+    start_year=1996,
+    end_year=2024,
+    time_lag_days=30,
+    inj=1,
+    dth=1,
+    c=10,
+    p=10,
+    n_workers=1,
+    county_assignment_mode="cz_fips",
+    pairing_neighbor_rings=0,
+    cluster_mode=False,
+    dict_output_format="pickle",
+    narratives_path=None,
+    use_caches=False,
+    hazard_event_inclusion_filter=HAZARD_EVENT_INCLUSION_FILTER,
+    exclusion_state_list=EXCLUSION_STATE_LIST,
+):
+    dfevents, narratives_df, event_counties, zone_counties, us_county_ids, county_neighbors = eventset_events(
+        cleaned, output_path, shapefile_path, start_year, end_year, (inj, dth, c, p), county_assignment_mode,
+        pairing_neighbor_rings, narratives_path, use_caches, hazard_event_inclusion_filter, exclusion_state_list,
+    )
+    dfmulti = find_pairs(
+        dfevents, time_lag_days, n_workers=n_workers, county_neighbors=county_neighbors, zone_counties=zone_counties
+    )
+    county_hazard_dicts = build_county_dicts(
+        dfevents, dfmulti, range(start_year, end_year + 2, 1), us_county_ids, event_counties,
+        split_pairs=county_neighbors is not None,
+        zone_counties=zone_counties,
+    )
+    save_eventset(
+        output_path, dfevents, dfmulti, county_hazard_dicts, inj, dth, c, p, time_lag_days, start_year, end_year,
+        narratives_df=narratives_df,
+        event_counties=event_counties,
+        dict_output_format=dict_output_format,
+        cluster_mode=cluster_mode,
+    )
+    return dfevents, dfmulti, county_hazard_dicts
+
+
+# Lowest of each impact threshold (inj, dth, c, p) of a sweep, every eventset of the sweep is a subset of the events passing them
+def lowest_impact_thresholds(sweep_impact_thresholds):
+    return tuple(min(values) for values in zip(*sweep_impact_thresholds))
+
+
+# Pairs of every eventset of a parameter sweep, over time lags (in days) and impact thresholds (inj, dth, c, p)
+# dfbase holds the events passing the lowest thresholds (see lowest_impact_thresholds), candidate pairs are found once for
+# these events at the largest time lag and the pairs of every eventset are filtered from them, see sweep_candidate_pairs
+# With zone_counties (see split_zone_counties) the zone events are paired in every county of their zone, as by find_pairs
+# Yields (inj, dth, c, p, time_lag_days, dfevents, dfmulti) for each eventset, by thresholds then time lag
+def sweep_pairs(dfbase, sweep_time_lag_days, sweep_impact_thresholds, county_neighbors=None, zone_counties=None):
+    dfbase_counties = expand_zone_events(dfbase, zone_counties)
+    print(f'Finding candidate pairs at the largest time lag of the sweep, {max(sweep_time_lag_days)} days')
+    with stage("candidate_pairs", rows_in=len(dfbase_counties)) as record:
+        candidate_pairs = sweep_candidate_pairs(dfbase_counties, pd.Timedelta(days=max(sweep_time_lag_days)), county_neighbors)
+        record["rows_out"] = sum(len(first) for positions, first, second, gap in candidate_pairs.values())
+
+    for inj, dth, c, p in sweep_impact_thresholds:
+        dfevents = dfbase[impact_filter_mask(dfbase, inj, dth, c, p)]
+        event_mask = impact_filter_mask(dfbase_counties, inj, dth, c, p)
+        event_id_index = build_event_id_index(dfbase_counties[event_mask])
+        for time_lag_days in sweep_time_lag_days:
+            print(f'Eventset {inj}inj_{dth}dth_{c}c_{p}p_lag{time_lag_days}')
+            with stage("pairing", rows_in=len(dfevents)) as record:
+                dfmulti = pair_events_from_candidates(
+                    dfbase_counties, candidate_pairs, pd.Timedelta(days=time_lag_days), event_mask, event_id_index
+                )
+                record["rows_out"] = len(dfmulti)
+            yield inj, dth, c, p, time_lag_days, dfevents, dfmulti
+
+
+# Generate and save an eventset for every combination of time lag and impact thresholds, see sweep_pairs
+# The other parameters are those of generate_eventset. Returns the (inj, dth, c, p, time_lag_days) of the saved eventsets
+def generate_eventset_sweep(
+    cleaned,
+    output_path,
+    sweep_time_lag_days,
+    sweep_impact_thresholds,
+    shapefile_path=US_COUNTY_SHAPEFILE_URL,
+    start_year=1996,
+    end_year=2024,
+    county_assignment_mode="cz_fips",
+    pairing_neighbor_rings=0,
+    cluster_mode=False,
+    dict_output_format="pickle",
+    narratives_path=None,
+    use_caches=False,
+    hazard_event_inclusion_filter=HAZARD_EVENT_INCLUSION_FILTER,
+    exclusion_state_list=EXCLUSION_STATE_LIST,
+):
+    dfbase, narratives_df, event_counties, zone_counties, us_county_ids, county_neighbors = eventset_events(
+        cleaned, output_path, shapefile_path, start_year, end_year, lowest_impact_thresholds(sweep_impact_thresholds),
+        county_assignment_mode, pairing_neighbor_rings, narratives_path, use_caches, hazard_event_inclusion_filter,
+        exclusion_state_list,
+    )
+    eventsets = []
+    for inj, dth, c, p, time_lag_days, dfevents, dfmulti in sweep_pairs(
+        dfbase, sweep_time_lag_days, sweep_impact_thresholds, county_neighbors, zone_counties
+    ):
+        county_hazard_dicts = build_county_dicts(
+            dfevents, dfmulti, range(start_year, end_year + 2, 1), us_county_ids, event_counties,
+            split_pairs=county_neighbors is not None,
+            zone_counties=zone_counties,
+        )
+        save_eventset(
+            output_path, dfevents, dfmulti, county_hazard_dicts, inj, dth, c, p, time_lag_days, start_year, end_year,
+            narratives_df=narratives_df,
+            event_counties=event_counties,
+            dict_output_format=dict_output_format,
+            cluster_mode=cluster_mode,
+        )
+        eventsets.append((inj, dth, c, p, time_lag_days))
+    return eventsets
+
+
+# Cleaning options from the command line arguments
+def options_from_args(args):
+    return cleaning_options(
+        read_nws_zone_table(args.nws_zone_table),
+        read_cpi_table(args.cpi_table),
+        inflation_target_year=args.inflation_target_year,
+        inflation_cpi_mode=args.inflation_cpi_mode,
+        utc_datetimes=args.utc_datetimes,
+        use_nws_zone_crosswalk=args.use_nws_zone_crosswalk,
+        narrative_side_file=args.narrative_side_file,
+    )
+
+
+def add_cleaning_arguments(parser):
+    parser.add_argument("details_dir", help="directory of the annual StormEvents_details csv.gz files")
+    parser.add_argument("output_dir")
+    parser.add_argument("--nws-zone-table", default=NWS_ZONE_TABLE_PATH)
+    parser.add_argument("--cpi-table", default=CPI_TABLE_PATH)
+    parser.add_argument("--inflation-target-year", type=int, default=2024)
+    parser.add_argument("--inflation-cpi-mode", choices=["annual", "monthly"], default="annual")
+    parser.add_argument("--utc-datetimes", action="store_true")
+    parser.add_argument("--use-nws-zone-crosswalk", action="store_true")
+    parser.add_argument("--narrative-side-file", action="store_true")
+
+
+def add_eventset_arguments(parser):
+    parser.add_argument("--shapefile", default=US_COUNTY_SHAPEFILE_URL, help="US Census Bureau county shapefile")
+    parser.add_argument("--start-year", type=int, default=1996)
+    parser.add_argument("--end-year", type=int, default=2024)
+    parser.add_argument("--time-lag-days", type=int, default=30)
+    parser.add_argument("--inj", type=int, default=1, help="injuries")
+    parser.add_argument("--dth", type=int, default=1, help="deaths")
+    parser.add_argument("--c", type=int, default=10, help="crop damage in thousands")
+    parser.add_argument("--p", type=int, default=10, help="property damage in thousands")
+    parser.add_argument("--n-workers", type=int, default=1)
+    parser.add_argument("--county-assignment-mode", choices=["cz_fips", "spatial"], default="cz_fips")
+    parser.add_argument("--pairing-neighbor-rings", type=int, default=0)
+    parser.add_argument("--cluster-mode", action="store_true")
+    parser.add_argument("--dict-output-format", choices=["pickle", "parquet", "both"], default="pickle")
+    parser.add_argument("--use-caches", action="store_true", help="cache the prepared events and county polygons in the output dir")
+    parser.add_argument(
+        "--sweep-time-lag-days", type=int, nargs="+", default=None, help="generate an eventset for each of these time lags"
+    )
+    parser.add_argument(
+        "--sweep-impact-thresholds", type=impact_thresholds_argument, nargs="+", default=None,
+        help='generate an eventset for each of these "inj,dth,c,p" impact thresholds, e.g. 1,1,10,10 5,5,100,100',
+    )
+
+
+# Impact thresholds from a command line argument, "inj,dth,c,p"
+def impact_thresholds_argument(value):
+    thresholds = tuple(int(threshold) for threshold in value.split(","))
+    if len(thresholds) != 4:
+        raise argparse.ArgumentTypeError(f'impact thresholds must be "inj,dth,c,p", got {value!r}')
+    return thresholds
+
+
+# Eventset from the command line arguments, or a sweep of eventsets with --sweep-time-lag-days/--sweep-impact-thresholds
+# (a sweep not given one of them uses the single value of --time-lag-days or --inj/--dth/--c/--p)
+def eventset_from_args(args, cleaned, narratives_path=None):
+    if args.sweep_time_lag_days is not None or args.sweep_impact_thresholds is not None:
+        return generate_eventset_sweep(
+            cleaned,
+            args.output_dir,
+            args.sweep_time_lag_days or [args.time_lag_days],
+            args.sweep_impact_thresholds or [(args.inj, args.dth, args.c, args.p)],
+            shapefile_path=args.shapefile,
+            start_year=args.start_year,
+            end_year=args.end_year,
+            county_assignment_mode=args.county_assignment_mode,
+            pairing_neighbor_rings=args.pairing_neighbor_rings,
+            cluster_mode=args.cluster_mode,
+            dict_output_format=args.dict_output_format,
+            narratives_path=narratives_path,
+            use_caches=args.use_caches,
+        )
+    return generate_eventset(
+        cleaned,
+        args.output_dir,
+        shapefile_path=args.shapefile,
+        start_year=args.start_year,
+        end_year=args.end_year,
+        time_lag_days=args.time_lag_days,
+        inj=args.inj,
+        dth=args.dth,
+        c=args.c,
+        p=args.p,
+        n_workers=args.n_workers,
+        county_assignment_mode=args.county_assignment_mode,
+        pairing_neighbor_rings=args.pairing_neighbor_rings,
+        cluster_mode=args.cluster_mode,
+        dict_output_format=args.dict_output_format,
+        narratives_path=narratives_path,
+        use_caches=args.use_caches,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="NCEI storm multihazard eventset pipeline")
+    parser.add_argument("--run-report", action="store_true", help="save a stage timing report in the output dir")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    clean_parser = commands.add_parser("clean", help="clean the details files into the cleaned database")
+    add_cleaning_arguments(clean_parser)
+    clean_parser.add_argument("--streaming", action="store_true", help="clean one annual file at a time, with bounded memory")
+    clean_parser.add_argument("--incremental", action="store_true", help="only re-clean new or changed files, implies --streaming")
+    clean_parser.add_argument("--chunksize", type=int, default=None)
+
+    eventset_parser = commands.add_parser("eventset", help="generate an eventset from a cleaned database parquet file")
+    eventset_parser.add_argument("cleaned_parquet")
+    eventset_parser.add_argument("output_dir")
+    eventset_parser.add_argument("--narratives", default=None, help="narratives side file of the cleaned database")
+    add_eventset_arguments(eventset_parser)
+
+    run_parser = commands.add_parser("run", help="clean the details files and generate an eventset, in memory")
+    add_cleaning_arguments(run_parser)
+    add_eventset_arguments(run_parser)
+    run_parser.add_argument("--save-cleaned", action="store_true", help="also save the cleaned database outputs")
+
+    args = parser.parse_args(argv)
+    start_run_report(f"NCEI_Pipeline.py {args.command}", vars(args))
+    create_folder_if_not_exists(args.output_dir)
+
+    if args.command == "clean":
+        options = options_from_args(args)
+        if args.streaming or args.incremental:
+            stream_cleaned_details(args.details_dir, args.output_dir, options, args.chunksize, incremental=args.incremental)
+        else:
+            save_cleaned_details(clean_details(args.details_dir, options), args.output_dir, options)
+    elif args.command == "eventset":
+        eventset_from_args(args, args.cleaned_parquet, narratives_path=args.narratives)
+    else:
+        options = options_from_args(args)
+        df_details = clean_details(args.details_dir, options)
+        if args.save_cleaned:
+            save_cleaned_details(df_details, args.output_dir, options)
+        eventset_from_args(args, df_details)
+
+    if args.run_report:
+        save_run_report(os.path.join(args.output_dir, "NCEI_Pipeline_Run_Report.json"))
+
+
+if __name__ == "__main__":
+    main()
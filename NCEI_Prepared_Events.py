@@ -0,0 +1,421 @@
+#######################
+"""
+Updated Nov, 2025
+
+@author: Joshua Green - University of Southampton
+
+Please cite this script/dataset if used in any research or publications.
+
+Green, J. (2025) NCEI Storm Multihazard Eventset.
+
+Preparation of the cleaned NCEI storm database for Generate_NCEI_Storm_Multihazard_Eventset.py, with an optional on-disk cache
+"""
+#######################
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from NCEI_Storm_Details_Schema import NARRATIVE_COLUMNS, apply_details_schema
+
+
+# Bump this whenever prepare_events changes, so that older cache files are no longer used
+PREPARED_EVENTS_CACHE_VERSION = 6
+
+# Row position of each event among all rows of the cleaned database (in file and row group order, see cleaned_row_groups),
+# kept while the narratives are not loaded so that they can be attached to the final events, see attach_narratives
+NARRATIVE_ROW_COLUMN = "NARRATIVE_ROW"
+
+# Columns of the prepared events table, in order
+PREPARED_EVENT_COLUMNS = [
+    "EPISODE_ID",
+    "EVENT_ID",
+    "GEOID",
+    "STATE",
+    "STATE_FIPS",
+    "EVENT_TYPE",
+    "HAZARD",
+    "CZ_TYPE",
+    "CZ_FIPS",
+    "CZ_NAME",
+    "BEGIN_DATETIME",
+    "END_DATETIME",
+    "start_year",
+    "end_year",
+    "WFO",
+    "CZ_TIMEZONE",
+    "INJURIES_DIRECT",
+    "INJURIES_INDIRECT",
+    "DEATHS_DIRECT",
+    "DEATHS_INDIRECT",
+    "DAMAGE_PROPERTY",
+    "DAMAGE_CROPS",
+    "ADJ_DAMAGE_PROPERTY",
+    "ADJ_DAMAGE_CROPS",
+    'TOTAL_INJURIES',
+    'TOTAL_DEATHS',
+    'TOTAL_ADJ_DAMAGE',
+    "SOURCE",
+    "MAGNITUDE",
+    "MAGNITUDE_TYPE",
+    "FLOOD_CAUSE",
+    "CATEGORY",
+    "TOR_F_SCALE",
+    "TOR_LENGTH",
+    "TOR_WIDTH",
+    "TOR_OTHER_WFO",
+    "TOR_OTHER_CZ_STATE",
+    "TOR_OTHER_CZ_FIPS",
+    "TOR_OTHER_CZ_NAME",
+    "BEGIN_RANGE",
+    "BEGIN_AZIMUTH",
+    "BEGIN_LOCATION",
+    "END_RANGE",
+    "END_AZIMUTH",
+    "END_LOCATION",
+    "BEGIN_LAT",
+    "BEGIN_LON",
+    "END_LAT",
+    "END_LON",
+    "DATA_SOURCE",
+    "EPISODE_NARRATIVE",
+    "EVENT_NARRATIVE",
+]
+
+# UTC begin/end datetimes, only in a cleaned database saved with utc_datetimes (see Clean_NCEI_Storm_Database.py)
+# They are kept, after END_DATETIME, when the cleaned database has them, and the events are then paired on them
+UTC_DATETIME_COLUMNS = ["BEGIN_DATETIME_UTC", "END_DATETIME_UTC"]
+
+
+# Counties of the zone events placed with the NWS zone to county table (see use_nws_zone_crosswalk in Clean_NCEI_Storm_Database.py),
+# kept last in the prepared events when the cleaned database has them, until they are split off, see zone_event_counties
+ZONE_GEOIDS_COLUMN = "ZONE_GEOIDS"
+
+
+# Columns of the prepared events table for a cleaned database with the given columns, PREPARED_EVENT_COLUMNS
+# with the UTC_DATETIME_COLUMNS and ZONE_GEOIDS_COLUMN it has
+def prepared_event_columns(columns):
+    position = PREPARED_EVENT_COLUMNS.index("END_DATETIME") + 1
+    utc_columns = [column for column in UTC_DATETIME_COLUMNS if column in columns]
+    zone_columns = [ZONE_GEOIDS_COLUMN] if ZONE_GEOIDS_COLUMN in columns else []
+    return PREPARED_EVENT_COLUMNS[:position] + utc_columns + PREPARED_EVENT_COLUMNS[position:] + zone_columns
+
+
+# Filter by event impact, the events of an eventset with the given impact filter thresholds
+# A missing INJURIES_INDIRECT never passes its threshold
+# Modify below to filter by 'ALL_INJURIES','ALL_DEATHS','TOTAL_ADJ_DAMAGE' if desired
+def impact_filter_mask(dfevents, inj, dth, c, p):
+    return (
+        (dfevents["INJURIES_DIRECT"] >= inj)
+        | (dfevents["INJURIES_INDIRECT"] >= inj)
+        | (dfevents["DEATHS_DIRECT"] >= dth)
+        | (dfevents["DEATHS_INDIRECT"] >= dth)
+        | (dfevents["ADJ_DAMAGE_CROPS"] >= c * 1000)
+        | (dfevents["ADJ_DAMAGE_PROPERTY"] >= p * 1000)
+    ).to_numpy(dtype=bool, na_value=False)
+
+
+# Counties of the zone events with ZONE_GEOIDS, as a dataframe of the (EVENT_ID, GEOID) of every county listed in their
+# ZONE_GEOIDS, sorted by EVENT_ID then GEOID, with the CZ_NAME of the event in that county: the zone's own name in the zone's
+# county, otherwise the name of the county events there (if any), so that they are paired with them
+# None when no event has ZONE_GEOIDS, the events then keep their single county, see expand_zone_events
+def zone_event_counties(dfevents):
+    if ZONE_GEOIDS_COLUMN not in dfevents.columns:
+        return None
+    zone_events = dfevents[dfevents[ZONE_GEOIDS_COLUMN].notna().to_numpy()]
+    if len(zone_events) == 0:
+        return None
+
+    zone_geoids = pd.Series(zone_events[ZONE_GEOIDS_COLUMN].str.split(";").to_numpy(dtype=object)).explode()
+    rows = zone_geoids.index.to_numpy()
+    geoids = zone_geoids.to_numpy(dtype=object)
+    moved = geoids != zone_events["GEOID"].to_numpy(dtype=object)[rows]
+
+    county_events = dfevents[(dfevents["CZ_TYPE"] == "C").to_numpy()].drop_duplicates("GEOID")
+    county_names = pd.Series(county_events["CZ_NAME"].to_numpy(dtype=object), index=county_events["GEOID"].to_numpy(dtype=object))
+    names = zone_events["CZ_NAME"].to_numpy(dtype=object)[rows]
+    positions = county_names.index.get_indexer(geoids)
+    renamed = moved & (positions >= 0)
+    names[renamed] = county_names.to_numpy()[positions[renamed]]
+
+    zone_counties = pd.DataFrame({"EVENT_ID": zone_events["EVENT_ID"].to_numpy()[rows], "GEOID": geoids, "CZ_NAME": names})
+    zone_counties = zone_counties.drop_duplicates(["EVENT_ID", "GEOID"]).sort_values(["EVENT_ID", "GEOID"], kind="stable")
+    return zone_counties.reset_index(drop=True)
+
+
+# Expand a dataframe of events (e.g. dfevents) to one row per county of the zone events in zone_counties (see
+# zone_event_counties), with that county's GEOID, STATE_FIPS, CZ_FIPS and CZ_NAME, for pairing and the county hazard
+# dictionaries. Every other event keeps its single row, rows stay in their original order, the rows of one event being
+# next to each other. zone_counties=None returns the events as they are
+def expand_zone_events(df, zone_counties):
+    if zone_counties is None:
+        return df
+    event_ids = zone_counties["EVENT_ID"].to_numpy()
+    df_event_ids = df["EVENT_ID"].to_numpy()
+    first = np.searchsorted(event_ids, df_event_ids, side="left")
+    last = np.searchsorted(event_ids, df_event_ids, side="right")
+    counts = last - first
+
+    repeats = np.maximum(counts, 1)
+    rows = np.repeat(np.arange(len(df)), repeats)
+    offsets = np.arange(len(rows)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    zone_rows = counts[rows] > 0
+    table_rows = first[rows[zone_rows]] + offsets[zone_rows]
+
+    geoids = df["GEOID"].to_numpy(dtype=object)[rows]
+    geoids[zone_rows] = zone_counties["GEOID"].to_numpy(dtype=object)[table_rows]
+    names = df["CZ_NAME"].to_numpy(dtype=object)[rows]
+    names[zone_rows] = zone_counties["CZ_NAME"].to_numpy(dtype=object)[table_rows]
+
+    expanded_df = df.take(rows)
+    expanded_df["GEOID"] = geoids
+    expanded_df["CZ_NAME"] = names
+    expanded_df["STATE_FIPS"] = expanded_df["GEOID"].str[:2]
+    expanded_df["CZ_FIPS"] = expanded_df["GEOID"].str[2:]
+    return apply_details_schema(expanded_df)
+
+
+# Prepare the cleaned database for pairing: GEOIDs, qa/qc, hazard type, temporal and state filters
+# Every event keeps a single row, the counties of the zone events are kept in ZONE_GEOIDS, see zone_event_counties
+# The impact thresholds are not applied here, so the same prepared events can be reused for any thresholds
+def prepare_events(raw_df, hazard_event_inclusion_filter, exclusion_state_list, start_year, end_year):
+    dfevents = raw_df
+
+    dfevents["CZ_FIPS"] = dfevents["CZ_FIPS"].astype(str).str.zfill(3)
+    dfevents["STATE_FIPS"] = dfevents["STATE_FIPS"].astype(str).str.zfill(2)
+    dfevents["GEOID"] = dfevents["STATE_FIPS"].astype(str).str.zfill(2) + dfevents[
+        "CZ_FIPS"
+    ].astype(str).str.zfill(3)
+    dfevents = apply_details_schema(dfevents)
+
+    # General qa/qc. Problems should have been removed during database cleaning, however complete additional final check.
+    dfevents = dfevents[~dfevents["EPISODE_ID"].isnull().isna()]
+    dfevents = dfevents[~dfevents["EVENT_ID"].isnull().isna()]
+    dfevents = dfevents[~dfevents["STATE"].isnull().isna()]
+    dfevents = dfevents[~dfevents["STATE_FIPS"].isnull().isna()]
+    dfevents = dfevents[~dfevents["EVENT_TYPE"].isnull().isna()]
+    dfevents = dfevents[~dfevents["CZ_FIPS"].isnull().isna()]
+    dfevents = dfevents[~dfevents["BEGIN_DATETIME"].isnull().isna()]
+    dfevents = dfevents[~dfevents["END_DATETIME"].isnull().isna()]
+
+    # Subset database to only desired event types
+    dfevents = dfevents[dfevents['HAZARD'].isin(hazard_event_inclusion_filter)]
+
+    # General qa/qc and preprocessing
+    dfevents['DEATHS_DIRECT'] = dfevents['DEATHS_DIRECT'].fillna(0).astype(int)
+    dfevents['DEATHS_INDIRECT'] = dfevents['DEATHS_INDIRECT'].fillna(0).astype(int)
+    dfevents['INJURIES_DIRECT'] = dfevents['INJURIES_DIRECT'].fillna(0).astype(int)
+    dfevents['INJURIES_DIRECT'] = dfevents['INJURIES_DIRECT'].fillna(0).astype(int)
+    dfevents["DAMAGE_CROPS"] = dfevents["DAMAGE_CROPS"].fillna(0).astype(int)
+    dfevents["DAMAGE_PROPERTY"] = dfevents["DAMAGE_PROPERTY"].fillna(0).astype(int)
+    dfevents['ADJ_DAMAGE_CROPS'] = dfevents['ADJ_DAMAGE_CROPS'].fillna(0).astype(int)
+    dfevents['ADJ_DAMAGE_PROPERTY'] = dfevents['ADJ_DAMAGE_PROPERTY'].fillna(0).astype(int)
+    dfevents['TOTAL_INJURIES'] = dfevents['TOTAL_INJURIES'].fillna(0)
+    dfevents['TOTAL_DEATHS'] = dfevents['TOTAL_DEATHS'].fillna(0)
+    dfevents['TOTAL_ADJ_DAMAGE'] = dfevents['TOTAL_ADJ_DAMAGE'].fillna(0)
+
+    dfevents.loc[dfevents['DEATHS_DIRECT']<0, 'DEATHS_DIRECT'] = 0
+    dfevents.loc[dfevents['DEATHS_INDIRECT']<0, 'DEATHS_INDIRECT'] = 0
+    dfevents.loc[dfevents['INJURIES_DIRECT']<0, 'INJURIES_DIRECT'] = 0
+    dfevents.loc[dfevents['INJURIES_DIRECT']<0, 'INJURIES_DIRECT'] = 0
+    dfevents.loc[dfevents['DAMAGE_CROPS']<0, 'DAMAGE_CROPS'] = 0
+    dfevents.loc[dfevents['DAMAGE_PROPERTY']<0, 'DAMAGE_PROPERTY'] = 0
+    dfevents.loc[dfevents['ADJ_DAMAGE_CROPS']<0, 'ADJ_DAMAGE_CROPS'] = 0
+    dfevents.loc[dfevents['ADJ_DAMAGE_PROPERTY']<0, 'ADJ_DAMAGE_PROPERTY'] = 0
+    dfevents.loc[dfevents['TOTAL_INJURIES']<0, 'TOTAL_INJURIES'] = 0
+    dfevents.loc[dfevents['TOTAL_DEATHS']<0, 'TOTAL_DEATHS'] = 0
+    dfevents.loc[dfevents['TOTAL_ADJ_DAMAGE']<0, 'TOTAL_ADJ_DAMAGE'] = 0
+
+    # Without the narratives loaded, duplicate events are only dropped once the narratives are attached, see attach_narratives
+    if NARRATIVE_ROW_COLUMN in dfevents.columns:
+        dfevents = dfevents.reindex(columns=prepared_event_columns(dfevents.columns) + [NARRATIVE_ROW_COLUMN])
+    else:
+        dfevents = dfevents.drop_duplicates()
+        dfevents = dfevents.reindex(columns=prepared_event_columns(dfevents.columns))
+
+    # temporal filter
+    dfevents = dfevents[
+        (dfevents["BEGIN_DATETIME"].dt.year >= start_year)
+        & (dfevents["END_DATETIME"].dt.year <= end_year)
+    ]
+
+    # Remove unwanted state classes
+    dfevents = dfevents[~dfevents["STATE"].isin(exclusion_state_list)]
+
+    #remove marine zone only events, this should have been done as a byproduct of the above step, however this check is implemented as a backup
+    dfevents = dfevents[(dfevents['CZ_TYPE']!='M')]
+
+    return dfevents
+
+
+# The hazard type, temporal, state and marine filters of prepare_events as a pyarrow dataset expression,
+# to push them into the parquet reader. Rows with a missing STATE or CZ_TYPE are kept, as they are by prepare_events
+def cleaned_details_filter(hazard_event_inclusion_filter, exclusion_state_list, start_year, end_year):
+    return (
+        ds.field("HAZARD").isin(list(hazard_event_inclusion_filter))
+        & (ds.field("BEGIN_DATETIME") >= pd.Timestamp(year=int(start_year), month=1, day=1))
+        & (ds.field("END_DATETIME") < pd.Timestamp(year=int(end_year) + 1, month=1, day=1))
+        & (~ds.field("STATE").isin(list(exclusion_state_list)) | ds.field("STATE").is_null())
+        & ((ds.field("CZ_TYPE") != "M") | ds.field("CZ_TYPE").is_null())
+    )
+
+
+# Row groups of a cleaned database (file or dataset directory) whose statistics do not rule out filters, as
+# (row group fragment, row position of its first row among all rows of the database), in file and row group order
+def cleaned_row_groups(path, filters=None):
+    offset = 0
+    for fragment in ds.dataset(path).get_fragments():
+        fragment.ensure_complete_metadata()
+        row_group_offsets = offset + np.cumsum([0] + [row_group.num_rows for row_group in fragment.row_groups])
+        for row_group in fragment.split_by_row_group(filters):
+            yield row_group, int(row_group_offsets[row_group.row_groups[0].id])
+        offset = int(row_group_offsets[-1])
+
+
+# Load the rows of the cleaned database that pass the prepare_events filters, without the narratives
+# Only the columns of the prepared events are read, the row position of each event among all rows of the database is kept
+# (NARRATIVE_ROW) to attach the narratives later
+def read_cleaned_events(path, hazard_event_inclusion_filter, exclusion_state_list, start_year, end_year):
+    dataset = ds.dataset(path)
+    pandas_metadata = dataset.schema.pandas_metadata or {"index_columns": [{"kind": "range", "start": 0, "step": 1}]}
+    index_columns = [column for column in pandas_metadata.get("index_columns", []) if isinstance(column, str)]
+    columns = [
+        column for column in dataset.schema.names
+        if column in PREPARED_EVENT_COLUMNS + UTC_DATETIME_COLUMNS + [ZONE_GEOIDS_COLUMN] and column not in NARRATIVE_COLUMNS
+    ] + index_columns
+    filters = cleaned_details_filter(hazard_event_inclusion_filter, exclusion_state_list, start_year, end_year)
+
+    tables = []
+    for row_group, offset in cleaned_row_groups(path, filters):
+        table = row_group.to_table(columns=columns)
+        table = table.append_column(NARRATIVE_ROW_COLUMN, pa.array(offset + np.arange(table.num_rows, dtype=np.int64)))
+        tables.append(table.filter(filters))
+    if len(tables) == 0:
+        table = dataset.to_table(columns=columns, filter=filters)
+        tables.append(table.append_column(NARRATIVE_ROW_COLUMN, pa.array([], pa.int64())))
+    raw_df = apply_details_schema(pa.concat_tables(tables).replace_schema_metadata(dataset.schema.metadata).to_pandas())
+
+    # A database saved without its index (e.g. by the streaming cleaner) is loaded with a RangeIndex over all its rows,
+    # give the filtered rows the same labels they would have had without the pushdown
+    range_index = pandas_metadata.get("index_columns", [])
+    if len(range_index) == 1 and isinstance(range_index[0], dict) and range_index[0].get("kind") == "range":
+        raw_df.index = pd.Index(range_index[0]["start"] + range_index[0]["step"] * raw_df[NARRATIVE_ROW_COLUMN].to_numpy())
+    return raw_df
+
+
+# Attach the narratives to the events loaded by read_cleaned_events (or load_prepared_events), with the same parameters
+# The narratives are read by row position (NARRATIVE_ROW), one row group at a time, only for the row groups holding these events
+# Duplicate events are then dropped, comparing every column as prepare_events does for events with their narratives
+def attach_narratives(dfevents, path, hazard_event_inclusion_filter, exclusion_state_list, start_year, end_year):
+    if NARRATIVE_ROW_COLUMN not in dfevents.columns:
+        return dfevents
+    rows = np.unique(dfevents[NARRATIVE_ROW_COLUMN].to_numpy())
+
+    dataset = ds.dataset(path)
+    columns = [column for column in NARRATIVE_COLUMNS if column in dataset.schema.names]
+    tables = [pa.Table.from_batches([], schema=pa.schema([dataset.schema.field(column) for column in columns]))]
+    if len(columns) > 0:
+        filters = cleaned_details_filter(hazard_event_inclusion_filter, exclusion_state_list, start_year, end_year)
+        for row_group, offset in cleaned_row_groups(path, filters):
+            first, last = np.searchsorted(rows, [offset, offset + row_group.row_groups[0].num_rows])
+            if last > first:
+                tables.append(row_group.to_table(columns=columns).take(pa.array(rows[first:last] - offset)))
+    narratives = pa.concat_tables(tables)
+
+    positions = np.searchsorted(rows, dfevents[NARRATIVE_ROW_COLUMN].to_numpy())
+    dfevents = dfevents.drop(columns=[NARRATIVE_ROW_COLUMN])
+    for column in columns:
+        dfevents[column] = narratives.column(column).to_pandas().to_numpy(dtype=object)[positions]
+    dfevents = dfevents.drop_duplicates()
+    return dfevents.reindex(columns=prepared_event_columns(dfevents.columns))
+
+
+# Load the narratives side file (see narrative_side_file in Clean_NCEI_Storm_Database.py) for a set of EVENT_IDs,
+# as a dataframe of the narratives indexed by EVENT_ID
+def read_narratives(path, event_ids):
+    event_ids = np.unique(np.asarray(event_ids, dtype=np.int64))
+    table = ds.dataset(path).to_table(filter=ds.field("EVENT_ID").isin(pa.array(event_ids)))
+    return table.to_pandas().set_index("EVENT_ID")
+
+
+# Join the narratives from read_narratives to a dataframe of events by EVENT_ID, in place of the NARRATIVE_ROW column
+# Events without a row in the side file get missing narratives
+def join_narratives(df, narratives_df):
+    df = df.drop(columns=[NARRATIVE_ROW_COLUMN], errors="ignore")
+    positions = narratives_df.index.get_indexer(df["EVENT_ID"])
+    for column in NARRATIVE_COLUMNS:
+        # -1 (not found) picks the None appended at the end
+        df[column] = np.append(narratives_df[column].to_numpy(dtype=object), None)[positions]
+    return df
+
+
+# sha256 of a cleaned database, either a single parquet file or a parquet dataset directory
+def cleaned_database_checksum(path):
+    if os.path.isdir(path):
+        files = sorted(
+            os.path.relpath(os.path.join(root, name), path)
+            for root, _, names in os.walk(path)
+            for name in names
+        )
+    else:
+        files = [None]
+    digest = hashlib.sha256()
+    for relative_path in files:
+        file_path = path if relative_path is None else os.path.join(path, relative_path)
+        if relative_path is not None:
+            digest.update(relative_path.replace(os.sep, "/").encode())
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+# Cache key of the prepared events, from the cleaned database contents and every parameter prepare_events depends on
+# The hazard and state lists are sorted and de-duplicated, as only membership matters for the filters
+def prepared_events_cache_key(database_checksum, hazard_event_inclusion_filter, exclusion_state_list, start_year, end_year):
+    key = {
+        "version": PREPARED_EVENTS_CACHE_VERSION,
+        "database_sha256": database_checksum,
+        "hazard_event_inclusion_filter": sorted(set(hazard_event_inclusion_filter)),
+        "exclusion_state_list": sorted(set(exclusion_state_list)),
+        "start_year": int(start_year),
+        "end_year": int(end_year),
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+# Load the prepared events for the cleaned database at path, from the cache in cache_dir if the same database and
+# parameters have been prepared before, otherwise prepare them and save them to the cache
+# cache_dir=None always prepares the events from the cleaned database, without caching
+# The narratives are not loaded, see attach_narratives
+def load_prepared_events(path, hazard_event_inclusion_filter, exclusion_state_list, start_year, end_year, cache_dir=None):
+    if cache_dir is None:
+        return prepare_events(
+            read_cleaned_events(path, hazard_event_inclusion_filter, exclusion_state_list, start_year, end_year),
+            hazard_event_inclusion_filter, exclusion_state_list, start_year, end_year
+        )
+
+    key = prepared_events_cache_key(
+        cleaned_database_checksum(path), hazard_event_inclusion_filter, exclusion_state_list, start_year, end_year
+    )
+    cache_path = os.path.join(cache_dir, f"prepared_dfevents_{key[:16]}.parquet")
+    if os.path.exists(cache_path):
+        print(f"Loading prepared events from cache: {cache_path}")
+        return apply_details_schema(pd.read_parquet(cache_path))
+
+    dfevents = prepare_events(
+        read_cleaned_events(path, hazard_event_inclusion_filter, exclusion_state_list, start_year, end_year),
+        hazard_event_inclusion_filter, exclusion_state_list, start_year, end_year
+    )
+    os.makedirs(cache_dir, exist_ok=True)
+    # Write to a temporary file first, so an interrupted run never leaves a partial cache file behind
+    temporary_path = cache_path + ".tmp"
+    dfevents.to_parquet(temporary_path)
+    os.replace(temporary_path, cache_path)
+    print(f"Prepared events saved to cache: {cache_path}")
+    return dfevents
@@ -0,0 +1,194 @@
+#######################
+"""
+Updated Nov, 2025
+
+@author: Joshua Green - University of Southampton
+
+Please cite this script/dataset if used in any research or publications.
+
+Green, J. (2025) NCEI Storm Multihazard Eventset.
+
+Stage timing and memory instrumentation of the pipeline scripts, with a JSON run report and an optional profiler hook
+"""
+#######################
+
+import contextlib
+import cProfile
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+# Run report of the stages run so far in this process, see start_run_report
+_run_report = {"script": None, "parameters": {}, "stages": {}}
+_run_start = {"wall": time.perf_counter(), "cpu": 0.0, "created": datetime.now()}
+_active_stages = []
+_profile = {"stage": None, "mode": "cprofile", "profiler": None}
+
+
+# Peak resident memory of the process in bytes, since the last reset_peak_rss where the peak can be reset (Linux),
+# otherwise since the process started. None where it can't be measured (Windows without psutil)
+def peak_rss_bytes():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024  # bytes on macOS, kilobytes on Linux
+    if psutil is not None:
+        return getattr(psutil.Process().memory_info(), "peak_wset", None)
+    return None
+
+
+# Reset the peak resident memory of the process to its current value, so each stage gets its own peak (Linux only)
+def reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+# CPU time of the process and of its finished child processes (e.g. the pairing workers), in seconds
+def cpu_seconds():
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def _max_known(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return max(a, b)
+
+
+# Start a new run report, forgetting any stages recorded before
+# profile_stage names a single stage to profile: profile_mode "cprofile" runs it under cProfile (its stats are saved next to
+# the run report), "wait" pauses before and after it so that a sampling profiler can be attached, e.g. py-spy record --pid PID
+def start_run_report(script, parameters=None, profile_stage=None, profile_mode="cprofile"):
+    if profile_mode not in ("cprofile", "wait"):
+        raise ValueError(f'profile_mode must be "cprofile" or "wait", got {profile_mode!r}')
+    _run_report.update({"script": script, "parameters": dict(parameters or {}), "stages": {}})
+    _run_start.update({"wall": time.perf_counter(), "cpu": cpu_seconds(), "created": datetime.now()})
+    _profile.update({"stage": profile_stage, "mode": profile_mode, "profiler": None})
+    if profile_stage is not None and profile_mode == "cprofile":
+        _profile["profiler"] = cProfile.Profile()
+
+
+# Record one run of a named stage: wall time, cpu time, peak resident memory and the rows it was given (rows_in) and returned
+# Yields the record of this run, set record["rows_out"] inside the block. After the block the record also holds the timings
+# Stages can be nested, and a stage run several times (e.g. once per annual file) is summed in the run report
+@contextlib.contextmanager
+def stage(name, rows_in=None):
+    record = {"rows_in": rows_in, "rows_out": None, "peak_rss_bytes": None}
+    # The running stages keep the peak so far before it is reset for this stage
+    peak = peak_rss_bytes()
+    for active in _active_stages:
+        active["peak_rss_bytes"] = _max_known(active["peak_rss_bytes"], peak)
+    reset_peak_rss()
+    _active_stages.append(record)
+
+    profiled = name == _profile["stage"]
+    if profiled and _profile["mode"] == "wait":
+        input(f"Stage {name} starting, attach the profiler to PID {os.getpid()} then press Enter")
+    if profiled and _profile["profiler"] is not None:
+        _profile["profiler"].enable()
+
+    wall_start = time.perf_counter()
+    cpu_start = cpu_seconds()
+    try:
+        yield record
+    finally:
+        wall = time.perf_counter() - wall_start
+        cpu = cpu_seconds() - cpu_start
+        if profiled and _profile["profiler"] is not None:
+            _profile["profiler"].disable()
+        if profiled and _profile["mode"] == "wait":
+            input(f"Stage {name} finished, stop the profiler then press Enter")
+
+        peak = peak_rss_bytes()
+        for active in _active_stages:
+            active["peak_rss_bytes"] = _max_known(active["peak_rss_bytes"], peak)
+        _active_stages.pop()
+        record["wall_seconds"] = round(wall, 4)
+        record["cpu_seconds"] = round(cpu, 4)
+        record["peak_rss_mb"] = None if record["peak_rss_bytes"] is None else round(record["peak_rss_bytes"] / 2**20, 1)
+        _add_stage_run(name, record)
+
+
+# Sum a stage run into the run report, rows that were not recorded stay None
+def _add_stage_run(name, record):
+    stages = _run_report["stages"]
+    if name not in stages:
+        stages[name] = {"calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0, "peak_rss_mb": None, "rows_in": None, "rows_out": None}
+    summary = stages[name]
+    summary["calls"] += 1
+    summary["wall_seconds"] = round(summary["wall_seconds"] + record["wall_seconds"], 4)
+    summary["cpu_seconds"] = round(summary["cpu_seconds"] + record["cpu_seconds"], 4)
+    summary["peak_rss_mb"] = _max_known(summary["peak_rss_mb"], record["peak_rss_mb"])
+    for key in ("rows_in", "rows_out"):
+        if record[key] is not None:
+            summary[key] = (summary[key] or 0) + int(record[key])
+
+
+# The run report so far, as saved by save_run_report
+def run_report():
+    # With the peak reset for every stage, the peak of the run is the largest stage peak
+    peak = peak_rss_bytes()
+    for summary in _run_report["stages"].values():
+        if summary["peak_rss_mb"] is not None:
+            peak = _max_known(peak, summary["peak_rss_mb"] * 2**20)
+    return {
+        "script": _run_report["script"],
+        "created": _run_start["created"].isoformat(timespec="seconds"),
+        "finished": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pid": os.getpid(),
+        "parameters": _run_report["parameters"],
+        "total_wall_seconds": round(time.perf_counter() - _run_start["wall"], 4),
+        "total_cpu_seconds": round(cpu_seconds() - _run_start["cpu"], 4),
+        "peak_rss_mb": None if peak is None else round(peak / 2**20, 1),
+        "stages": _run_report["stages"],
+    }
+
+
+# Save the run report as JSON at path and print a summary of the stages
+# The cProfile stats of the profiled stage are saved alongside, as {run report name}_{stage}.prof
+def save_run_report(path):
+    report = run_report()
+    if _profile["profiler"] is not None:
+        profile_path = f"{os.path.splitext(path)[0]}_{_profile['stage']}.prof"
+        _profile["profiler"].dump_stats(profile_path)
+        report["profile"] = {"stage": _profile["stage"], "path": profile_path}
+        print(f"cProfile stats of stage {_profile['stage']} saved to {profile_path}")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+
+    print(f"{'Stage':<28}{'Calls':>6}{'Wall s':>10}{'CPU s':>10}{'Peak MB':>10}{'Rows in':>12}{'Rows out':>12}")
+    for name, summary in report["stages"].items():
+        print(
+            f"{name:<28}{summary['calls']:>6}{summary['wall_seconds']:>10.2f}{summary['cpu_seconds']:>10.2f}"
+            f"{str(summary['peak_rss_mb']):>10}{str(summary['rows_in']):>12}{str(summary['rows_out']):>12}"
+        )
+    print(f"Run report saved to {path}")
+    return report
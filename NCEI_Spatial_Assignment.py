@@ -0,0 +1,103 @@
+#######################
+"""
+Updated Nov, 2025
+
+@author: Joshua Green - University of Southampton
+
+Please cite this script/dataset if used in any research or publications.
+
+Green, J. (2025) NCEI Storm Multihazard Eventset.
+
+Spatial assignment of storm events to the county polygons they intersect, used by Generate_NCEI_Storm_Multihazard_Eventset.py
+"""
+#######################
+
+import numpy as np
+import pandas as pd
+import shapely
+
+
+# Event geometries: the begin and end points of every event, and the begin to end path of tornadoes
+# Returns the shapely geometries and the dfevents row position of each, events without coordinates have no geometry
+# The NCEI coordinates are in decimal degrees (WGS84), close enough to the NAD83 county polygons (EPSG:4269) at county scale
+def event_geometries(dfevents, include_tornado_paths=True):
+    begin_lat = dfevents["BEGIN_LAT"].to_numpy(dtype=np.float64)
+    begin_lon = dfevents["BEGIN_LON"].to_numpy(dtype=np.float64)
+    end_lat = dfevents["END_LAT"].to_numpy(dtype=np.float64)
+    end_lon = dfevents["END_LON"].to_numpy(dtype=np.float64)
+    has_begin = ~(np.isnan(begin_lat) | np.isnan(begin_lon))
+    has_end = ~(np.isnan(end_lat) | np.isnan(end_lon))
+    rows = np.arange(len(dfevents))
+
+    geometries = [
+        shapely.points(begin_lon[has_begin], begin_lat[has_begin]),
+        shapely.points(end_lon[has_end], end_lat[has_end]),
+    ]
+    geometry_rows = [rows[has_begin], rows[has_end]]
+
+    if include_tornado_paths:
+        is_path = has_begin & has_end & (dfevents["HAZARD"] == "tn").to_numpy()
+        coords = np.stack(
+            [
+                np.stack([begin_lon[is_path], begin_lat[is_path]], axis=1),
+                np.stack([end_lon[is_path], end_lat[is_path]], axis=1),
+            ],
+            axis=1,
+        )
+        geometries.append(shapely.linestrings(coords))
+        geometry_rows.append(rows[is_path])
+
+    return np.concatenate(geometries), np.concatenate(geometry_rows)
+
+
+# Assign every event to the counties its geometries intersect, with a single STRtree over the county polygons
+# and one bulk query for all the event geometries
+# Returns a dataframe of the unique (EVENT_ID, GEOID) pairs, sorted by EVENT_ID then GEOID. Events without coordinates,
+# or whose coordinates fall outside every county (e.g. offshore), have no rows
+# County polygons in a projected CRS are reprojected to NAD83 (EPSG:4269) to match the event coordinates, polygons
+# without a CRS are rejected, as there is no telling whether they are in degrees
+def assign_event_counties(dfevents, us_county_polygons, include_tornado_paths=True):
+    if us_county_polygons.crs is None:
+        raise ValueError("The county polygons have no CRS, set it (e.g. EPSG:4269 for the US Census Bureau shapefiles)")
+    if not us_county_polygons.crs.is_geographic:
+        us_county_polygons = us_county_polygons.to_crs(epsg=4269)
+
+    geometries, geometry_rows = event_geometries(dfevents, include_tornado_paths)
+    tree = shapely.STRtree(us_county_polygons.geometry.values)
+    geometry_index, county_index = tree.query(geometries, predicate="intersects")
+
+    event_counties = pd.DataFrame(
+        {
+            "EVENT_ID": dfevents["EVENT_ID"].to_numpy()[geometry_rows[geometry_index]],
+            "GEOID": us_county_polygons["GEOID"].to_numpy(dtype=object)[county_index],
+        }
+    )
+    event_counties = event_counties.drop_duplicates().sort_values(["EVENT_ID", "GEOID"], kind="stable")
+    return event_counties.reset_index(drop=True)
+
+
+# Expand a dataframe of events (e.g. dfevents or dfmulti) to one row per county an event was assigned to,
+# with that county's GEOID. Events without a spatial assignment keep their row and their county/zone GEOID
+# Rows stay in their original order, the rows of one event being next to each other. An event with several rows (a zone
+# event expanded to the counties of its zone, see expand_zone_events) keeps a single row per county it was assigned to
+def expand_to_event_counties(df, event_counties):
+    event_ids = event_counties["EVENT_ID"].to_numpy()
+    geoids = event_counties["GEOID"].to_numpy(dtype=object)
+    df_event_ids = df["EVENT_ID"].to_numpy()
+    first = np.searchsorted(event_ids, df_event_ids, side="left")
+    last = np.searchsorted(event_ids, df_event_ids, side="right")
+    counts = last - first
+
+    repeats = np.maximum(counts, 1)
+    rows = np.repeat(np.arange(len(df)), repeats)
+    offsets = np.arange(len(rows)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+
+    expanded_geoids = df["GEOID"].to_numpy(dtype=object)[rows]
+    assigned = counts[rows] > 0
+    expanded_geoids[assigned] = geoids[first[rows[assigned]] + offsets[assigned]]
+
+    expanded_df = df.take(rows)
+    expanded_df["GEOID"] = expanded_geoids
+    key_columns = ["EVENT_ID", "GEOID"] + (["PAIR_ID"] if "PAIR_ID" in df.columns else [])
+    duplicated = expanded_df.duplicated(key_columns).to_numpy() & assigned
+    return expanded_df[~duplicated]
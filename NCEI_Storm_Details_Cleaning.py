@@ -0,0 +1,927 @@
+#######################
+"""
+Updated Nov, 2025
+
+@author: Joshua Green - University of Southampton
+
+Please cite this script/dataset if used in any research or publications.
+
+Green, J. (2025) NCEI Storm Multihazard Eventset.
+
+Cleaning of the NCEI storm events details files, used by Clean_NCEI_Storm_Database.py and NCEI_Pipeline.py
+The cleaning settings and lookup tables are passed in as cleaning options (see cleaning_options), so nothing is read at import
+"""
+#######################
+
+import functools
+import glob
+import hashlib
+import json
+import os
+import re
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from tqdm import tqdm
+
+from NCEI_Run_Report import stage
+from NCEI_Storm_Details_Schema import (
+    DETAILS_CSV_DTYPES,
+    NARRATIVE_COLUMNS,
+    apply_details_schema,
+    concat_details,
+    details_arrow_schema,
+)
+
+
+# Repository copies of the NWS zone to county table and the US BLS CPI table
+Repository_Path = os.path.dirname(os.path.abspath(__file__))
+NWS_ZONE_TABLE_PATH = os.path.join(Repository_Path, "NWS_Zone_to_County_FIPS_bp18mr25.dbx.txt")
+CPI_TABLE_PATH = os.path.join(Repository_Path, "US_BLS_CPI_Inflation_1950-2024.xlsx")
+
+
+# Annual details files in base_dir, a directory of the NCEI bulk download
+def details_files(base_dir):
+    return sorted(
+        glob.glob(os.path.join(base_dir, "StormEvents_details-ftp_v1.0_*.csv.gz"))
+    )
+
+
+# Year of an annual details file, from the _dYYYY_ part of its name
+def details_file_year(path):
+    return int(re.search(r"_d(\d{4})_", os.path.basename(path)).group(1))
+
+
+# Read a details csv with the declared dtypes (see NCEI_Storm_Details_Schema.py), so every file/block has the same
+# dtypes even where a column is empty, and the low cardinality text columns are categoricals from the start
+def read_details_csv(path, chunksize=None, usecols=None):
+    dtype = DETAILS_CSV_DTYPES
+    if usecols is not None:
+        dtype = {column: dtype[column] for column in usecols if column in dtype}
+    return pd.read_csv(path, dtype=dtype, usecols=usecols, chunksize=chunksize, low_memory=False)
+
+
+def load_files(csv_files):
+    dataframes = [read_details_csv(x) for x in csv_files]
+    return concat_details(dataframes).reset_index(drop=True)
+
+
+# Remove events missing the ids and location fields needed for the eventset
+def filter_details(df_details):
+    df_details = df_details[~df_details["EPISODE_ID"].isnull()]
+    df_details["EPISODE_ID"] = df_details["EPISODE_ID"].astype(int)
+    df_details = df_details[~df_details["EVENT_ID"].isnull()]
+    df_details["EVENT_ID"] = df_details["EVENT_ID"].astype(int)
+    df_details = df_details[~df_details["STATE"].isnull()]
+    df_details = df_details[~df_details["STATE_FIPS"].isnull()]
+    df_details["STATE_FIPS"] = df_details["STATE_FIPS"].astype(int)
+    df_details = df_details[~df_details["EVENT_TYPE"].isnull()]
+    df_details = df_details[~df_details["CZ_FIPS"].isnull()]
+
+    return df_details.drop_duplicates()
+
+
+# convert the NWS zones in CZ_FIPS (for CZ_TYPE = Z) to CZ FIPS values
+
+# Create a mapping of (STATE_FIPS, STATE, CZ_NAME) to CZ_FIPS for rows with CZ_TYPE = 'C'
+def build_cz_fips_mapping(df_details):
+    # Filter the rows where CZ_TYPE equals 'C'
+    cz_type_c = df_details[df_details["CZ_TYPE"] == "C"]
+    return cz_type_c.set_index(["STATE_FIPS", "STATE", "CZ_NAME"])["CZ_FIPS"].to_dict()
+
+
+# Zone to county crosswalk from the NWS table, indexed by (STATE_FIPS, ZONE)
+# A zone can span several counties, its CZ_FIPS is the county named like the zone (e.g. zone "Harris" -> Harris County),
+# otherwise the first county listed, and ZONE_GEOIDS lists every county the zone covers
+def build_zone_county_crosswalk(nws_zone_df):
+    nws_zone_df = nws_zone_df.dropna(subset=["ZONE", "FIPS"]).drop_duplicates(["STATE", "ZONE", "FIPS"])
+    nws_zone_df = nws_zone_df.assign(
+        STATE_FIPS=nws_zone_df["FIPS"].astype(int) // 1000,
+        ZONE=nws_zone_df["ZONE"].astype(int),
+        COUNTY_FIPS=nws_zone_df["FIPS"].astype(int) % 1000,
+        GEOID=nws_zone_df["FIPS"].astype(int).astype(str).str.zfill(5),
+        NAME_MATCH=nws_zone_df["COUNTY"].str.upper() == nws_zone_df["NAME"].str.upper(),
+    )
+    zones = nws_zone_df.groupby(["STATE_FIPS", "ZONE"], sort=True)
+    primary = nws_zone_df.sort_values("NAME_MATCH", ascending=False, kind="stable").groupby(["STATE_FIPS", "ZONE"], sort=True)
+    return pd.DataFrame(
+        {
+            "CZ_FIPS": primary["COUNTY_FIPS"].first(),
+            "ZONE_GEOIDS": zones["GEOID"].agg(";".join),
+        }
+    )
+
+
+
+# Replace CZ_FIPS of the zone events based on the mapping (and the NWS zone to county crosswalk, if used)
+# One key lookup for all the rows, a zone keeps its original CZ_FIPS where no match is found
+def replace_cz_fips(df_details, mapping, zone_crosswalk=None):
+    cz_fips = df_details["CZ_FIPS"].to_numpy(dtype=object).copy()
+    zone_geoids = np.full(len(df_details), None, dtype=object)
+    is_zone = (df_details["CZ_TYPE"] == "Z").to_numpy()
+
+    if len(mapping) > 0:
+        mapping_index = pd.MultiIndex.from_tuples(list(mapping.keys()))
+        positions = mapping_index.get_indexer(
+            pd.MultiIndex.from_arrays([df_details["STATE_FIPS"], df_details["STATE"], df_details["CZ_NAME"]])
+        )
+        matched = is_zone & (positions >= 0)
+        cz_fips[matched] = np.asarray(list(mapping.values()), dtype=object)[positions[matched]]
+
+    if zone_crosswalk is not None:
+        positions = zone_crosswalk.index.get_indexer(
+            pd.MultiIndex.from_arrays([df_details["STATE_FIPS"], df_details["CZ_FIPS"].astype(int)])
+        )
+        matched = is_zone & (positions >= 0)
+        cz_fips[matched] = zone_crosswalk["CZ_FIPS"].to_numpy(dtype=object)[positions[matched]]
+        zone_geoids[matched] = zone_crosswalk["ZONE_GEOIDS"].to_numpy(dtype=object)[positions[matched]]
+
+    return pd.Series(cz_fips, index=df_details.index), pd.Series(zone_geoids, index=df_details.index)
+
+
+# Define and standardize the names of event reporting sources
+ACRONYMS = ["Asos", "Awos", "Awss", "Nws", "C-Man", "Raws", "Shave", "Snotel", "Wlon"]
+
+source_substitutions = {
+    "Arpt Equip(AWOS,ASOS)": "AWOS,ASOS,Mesonet,Etc",
+    "Coastal Observing Station": "Coast Guard",
+    "Cocorahs": "CoCoRaHS",
+    "Coop Observer": "Cooperative Network Observer",
+    "Coop Station": "Cooperative Network Observer",
+    "Dept Of Highways": "Department Of Highways",
+    "Fire Dept/Rescue Squad": "Fire Department/Rescue",
+    "General Public": "Public",
+    "Govt Official": "State Official",
+    "Manual Input": "Unknown",
+    "Meteorologist(Non NWS)": "Public",
+    "NWS Employee(Off Duty)": "NWS Employee",
+    "Npop": "Unknown",
+    "Official NWS Obs.": "Official NWS Observations",
+}
+
+
+# Standardize hazard event names
+event_substitution = {
+    r"^HAIL.*": "Hail",
+    r"^High Snow$": "Heavy Snow",
+    r"^Hurricane$": "Hurricane",
+    r"^OTHER$": "Dust Devil", #There is one instance of a dust devil event being defined as "OTHER"
+    r"^THUNDERSTORM WIND.*": "Thunderstorm Wind",
+    r"^TORNADO.*": "Tornado",
+    r"^Volcanic Ashfall.*$": "Volcanic Ash",
+}
+
+# Map for renaming hazards using an acronym dict
+acronym_map = {
+    "Heavy Snow": "sn",
+    "High Wind": "ew",
+    "Winter Storm": "ws",
+    "Tornado": "tn",
+    "Lightning": "ltn",
+    "Hail": "hl",
+    "Flood": "fl",
+    "Thunderstorm Wind": "tw",
+    "Ice Storm": "is",
+    "Waterspout": "wp",
+    "Winter Weather": "ww",
+    "Coastal Flood": "cfl",
+    "Cold/Wind Chill": "cw",
+    "Dense Fog": "fg",
+    "Avalanche": "av",
+    "Blizzard": "bz",
+    "Frost/Freeze": "ff",
+    "Flash Flood": "pfl",
+    "High Surf": "hs",
+    "Heavy Rain": "p",
+    "Dust Storm": "ds",
+    "Heat": "hw",
+    "Funnel Cloud": "fc",
+    "Drought": "dr",
+    "Debris Flow": "df",
+    "Wildfire": "wf",
+    "Strong Wind": "ew",
+    "Dust Devil": "dd",
+    "Rip Current": "rc",
+    "Tropical Storm": "tc",
+    "Hurricane/Typhoon": "ht",
+    "Storm Surge/Tide": "sst",
+    "Freezing Fog": "ffg",
+    "Marine High Wind": "mew",
+    "Sleet": "sl",
+    "Lake-Effect Snow": "les",
+    "Astronomical Low Tide": "lt",
+    "Volcanic Ash": "vo",
+    "Seiche": "se",
+    "Extreme Cold/Wind Chill": "cw",
+    "Excessive Heat": "hw",
+    "Heavy Wind": "ew",
+    "Marine Thunderstorm Wind": "mtw",
+    "Northern Lights": "nl",
+    "Marine Hail": "mhl",
+    "Dense Smoke": "sm",
+    "Tsunami": "ts",
+    "Landslide": "ls",
+    "Marine Strong Wind": "mew",
+    "Lakeshore Flood": "cfl",
+    "Tropical Depression": "tc",
+    "Marine Hurricane/Typhoon": "mht",
+    "Marine Dense Fog": "mfg",
+    "Marine Tropical Storm": "mtps",
+    "Sneakerwave": "swv",
+    "Marine Lightning": "mltn",
+    "Marine Tropical Depression": "mtc",
+}
+
+# NOTE: There are several similar hazards that I have chosen to group together, see below:
+# ew - 'High Wind' & 'Strong Wind'
+# cw - 'Cold/Wind Chill' & 'Extreme Cold/Wind Chill'
+# hw - 'Heat' & 'Excessive Heat'
+# mew - 'Marine High Wind' & 'Marine Strong Wind'
+# tc - 'Tropical Storm' & 'TropicalDepression'
+# mtc - 'Marine Tropical Storm' & 'Marine Tropical Depression'
+# cfl - 'Coastal Flood' & 'Lakeshore Flood'
+
+
+# Standardize timezones
+# There are several one off events with inconsistent time zones
+timezone_substitutions = {
+    "CDT": "CST",
+    "CSC": "CST",
+    "EDT": "EST",
+    "GMT": "CST",
+    "GST": "ChST",
+    "MDT": "MST",
+    "PDT": "PST",
+    "SCT": "CST",
+}
+unknown_timezones = {
+    "HAWAII": "HST",
+    "OKLAHOMA": "CST",
+    "MASSACHUSETTS": "EST",
+    "GEORGIA": "EST",
+    "ILLINOIS": "CST",
+}
+
+
+# UTC offset (hours) of the standardized timezones, NCEI event times are local standard time throughout the year
+TIMEZONE_UTC_OFFSETS = {
+    "AST": -4,
+    "EST": -5,
+    "CST": -6,
+    "MST": -7,
+    "PST": -8,
+    "AKST": -9,
+    "HST": -10,
+    "SST": -11,
+    "ChST": 10,
+    "CHST": 10,
+}
+
+
+# Substitution patterns, compiled once
+acronym_patterns = [(re.compile(f"\\b{acronym}\\b"), acronym.upper()) for acronym in ACRONYMS]
+event_substitution_patterns = [(re.compile(original), replacement) for original, replacement in event_substitution.items()]
+timezone_suffix_pattern = re.compile(r"-*\d*$")
+
+
+def normalize_source(source):
+    source = source.str.title()
+    for pattern, replacement in acronym_patterns:
+        source = source.str.replace(pattern, replacement, regex=True)
+    for original, replacement in source_substitutions.items():
+        source = source.str.replace(original, replacement, regex=False)
+    return source
+
+
+def normalize_event_type(event_type):
+    for pattern, replacement in event_substitution_patterns:
+        event_type = event_type.str.replace(pattern, replacement, regex=True)
+    event_type = event_type.str.replace("TropicalDepression", "Tropical Depression", regex=False)
+    event_type = event_type.str.replace("Hurricane (Typhoon)", "Hurricane/Typhoon", regex=False)
+    return event_type
+
+
+def normalize_timezone(timezone):
+    timezone = timezone.str.replace(timezone_suffix_pattern, "", regex=True).str.upper()
+    for original, replacement in timezone_substitutions.items():
+        timezone = timezone.str.replace(original, replacement, regex=False)
+    return timezone
+
+
+# Standardize the timezones, events with an unknown timezone take the timezone of their state where it has only one
+def standardize_timezones(df_details):
+    timezone = normalize_unique_values(df_details["CZ_TIMEZONE"], normalize_timezone)
+    is_unknown = (timezone == "UNK").to_numpy()
+    timezone[is_unknown] = df_details["STATE"][is_unknown].astype(object).map(unknown_timezones).fillna("UNK").to_numpy()
+    return timezone
+
+
+# Convert local standard time datetimes to timezone aware UTC datetimes, for all the rows at once
+def utc_datetime(datetimes, timezones):
+    offset_hours = timezones.astype(object).map(TIMEZONE_UTC_OFFSETS).astype(float)
+    return (datetimes - pd.to_timedelta(offset_hours, unit="h")).dt.tz_localize("UTC")
+
+
+# Apply a string normalization to the few hundred unique values of a column only, and map the result back through the codes
+def normalize_unique_values(column, normalize):
+    codes, uniques = pd.factorize(column)
+    normalized = normalize(pd.Series(np.asarray(uniques, dtype=object), dtype=object)).to_numpy(dtype=object)
+    values = np.full(len(codes), np.nan, dtype=object)
+    values[codes >= 0] = normalized[codes[codes >= 0]]
+    return pd.Series(values, index=column.index)
+
+
+def create_datetime(df, prefix):
+    df_components = pd.to_datetime(
+        {
+            "year": df[f"{prefix}YEARMONTH"] // 100,
+            "month": df[f"{prefix}YEARMONTH"] % 100,
+            "day": df[f"{prefix}DAY"],
+            "hour": df[f"{prefix}TIME"] // 100,
+            "minute": df[f"{prefix}TIME"] % 100,
+        }
+    )
+    return pd.to_datetime(df_components)
+
+
+legacy = ["BEGIN_YEARMONTH", "BEGIN_DAY", "BEGIN_TIME", "BEGIN_DATE_TIME"]
+legacy = legacy + ["END_YEARMONTH", "END_DAY", "END_TIME", "END_DATE_TIME"]
+legacy = legacy + ["MONTH_NAME", "YEAR"]
+
+
+# Standardize damage values, e.g. "10K", "1.5M", "2B" or "250"
+valid_price_pattern = re.compile(r"^([\d.]+)([KMB]?)$")
+price_scales = {"": 1, "K": 1000, "M": 1_000_000, "B": 1_000_000_000}
+
+
+# Parse a single (upper case) damage string, returns nan where it is not a valid price
+def parse_price(price):
+    match = valid_price_pattern.match(price)
+    if match is None:
+        return np.nan
+    try:
+        return price_scales[match.group(2)] * float(match.group(1))
+    except ValueError:
+        return np.nan
+
+
+# Parse the damage strings of a column, each of the few thousand distinct strings is only parsed once
+# Returns the cost (nan for a missing or invalid value) and a mask of the non missing values that could not be parsed
+def to_cost(column):
+    codes, uniques = pd.factorize(column)
+    unique_costs = np.array([parse_price(str(price).upper()) for price in uniques], dtype=float)
+    costs = np.full(len(codes), np.nan)
+    costs[codes >= 0] = unique_costs[codes[codes >= 0]]
+    failed = (codes >= 0) & np.isnan(costs)
+    return pd.Series(costs, index=column.index), failed
+
+
+# Diagnostics column listing the damage values that could not be parsed (and so count as 0), e.g. "DAMAGE_CROPS=1.2.3K"
+def damage_parse_failures(df_details, failed_masks):
+    failures = np.full(len(df_details), None, dtype=object)
+    for column, failed in failed_masks.items():
+        raw_values = df_details[column].to_numpy(dtype=object)
+        for position in np.flatnonzero(failed):
+            failure = f"{column}={raw_values[position]}"
+            failures[position] = failure if failures[position] is None else f"{failures[position]};{failure}"
+    return pd.Series(failures, index=df_details.index)
+
+
+# Monthly CPI columns of the CPI table, the monthly CPI table has one row per year with a column per month
+CPI_MONTH_COLUMNS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
+# Inflation factor (target year CPI / event CPI) for every event, looked up for all the rows at once
+# annual uses the CPI of INFLATION_YEAR, monthly uses the CPI of the INFLATION_YEAR and BEGIN_DATETIME month,
+# falling back to the annual CPI where a month is missing from the table (e.g. the latest, partial year)
+def inflation_factors(df_details, options):
+    years = df_details['INFLATION_YEAR'].to_numpy()
+    annual_cpi = pd.Series(options["cpi_annual"])
+    year_positions = annual_cpi.index.get_indexer(years)
+    if (year_positions < 0).any():
+        raise KeyError(f"No CPI data for years {sorted(set(years[year_positions < 0].tolist()))}")
+    event_cpi = annual_cpi.to_numpy(dtype=float)[year_positions]
+
+    if options["inflation_cpi_mode"] == "monthly":
+        months = df_details['BEGIN_DATETIME'].dt.month.to_numpy()
+        monthly_positions = options["cpi_monthly"].index.get_indexer(years)
+        monthly_cpi = options["cpi_monthly"].to_numpy(dtype=float)[monthly_positions, months - 1]
+        has_monthly_cpi = (monthly_positions >= 0) & ~np.isnan(monthly_cpi)
+        event_cpi = np.where(has_monthly_cpi, monthly_cpi, event_cpi)
+
+    return options["cpi_target"] / event_cpi
+
+
+CLEANED_DETAILS_COLUMNS = [
+    "EPISODE_ID",
+    "EVENT_ID",
+    "GEOID",
+    "STATE",
+    "STATE_FIPS",
+    "EVENT_TYPE",
+    "HAZARD",
+    "CZ_TYPE",
+    "CZ_FIPS",
+    "CZ_NAME",
+    "ZONE_GEOIDS",
+    "BEGIN_DATETIME",
+    "END_DATETIME",
+    "start_year",
+    "end_year",
+    "WFO",
+    "CZ_TIMEZONE",
+    "INJURIES_DIRECT",
+    "INJURIES_INDIRECT",
+    "DEATHS_DIRECT",
+    "DEATHS_INDIRECT",
+    "DAMAGE_PROPERTY",
+    "DAMAGE_CROPS",
+    "ADJ_DAMAGE_PROPERTY",
+    "ADJ_DAMAGE_CROPS",
+    "TOTAL_INJURIES",
+    "TOTAL_DEATHS",
+    "TOTAL_ADJ_DAMAGE",
+    "DAMAGE_PARSE_FAILURES",
+    "SOURCE",
+    "MAGNITUDE",
+    "MAGNITUDE_TYPE",
+    "FLOOD_CAUSE",
+    "CATEGORY",
+    "TOR_F_SCALE",
+    "TOR_LENGTH",
+    "TOR_WIDTH",
+    "TOR_OTHER_WFO",
+    "TOR_OTHER_CZ_STATE",
+    "TOR_OTHER_CZ_FIPS",
+    "TOR_OTHER_CZ_NAME",
+    "BEGIN_RANGE",
+    "BEGIN_AZIMUTH",
+    "BEGIN_LOCATION",
+    "END_RANGE",
+    "END_AZIMUTH",
+    "END_LOCATION",
+    "BEGIN_LAT",
+    "BEGIN_LON",
+    "END_LAT",
+    "END_LON",
+    "DATA_SOURCE",
+    "EPISODE_NARRATIVE",
+    "EVENT_NARRATIVE",
+]
+# Added after the cleaned details columns with utc_datetimes
+UTC_DATETIME_COLUMNS = ["BEGIN_DATETIME_UTC", "END_DATETIME_UTC"]
+
+
+# Read the NWS zone to county table and the US BLS CPI table, by default the repository copies (paths or URLs)
+def read_nws_zone_table(path=NWS_ZONE_TABLE_PATH):
+    return pd.read_csv(path, delimiter='|')
+
+
+def read_cpi_table(path=CPI_TABLE_PATH):
+    return pd.read_excel(path, skiprows=11)
+
+
+# sha256 of a lookup table (the NWS zone or CPI table), of its column names and values
+def table_checksum(df):
+    sha256 = hashlib.sha256()
+    sha256.update(json.dumps([str(column) for column in df.columns]).encode())
+    sha256.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return sha256.hexdigest()
+
+
+# Cleaning options, the settings and lookup tables shared by the cleaning functions below
+# nws_zone_df is the NWS zone to county table (only used with use_nws_zone_crosswalk), cpi_df the US BLS CPI table
+# inflation_cpi_mode is "annual" or "monthly", see inflation_factors. utc_datetimes adds the UTC_DATETIME_COLUMNS and
+# narrative_side_file leaves the narratives out of the cleaned parquet outputs, see write_details_parquet
+def cleaning_options(
+    nws_zone_df,
+    cpi_df,
+    inflation_target_year=2024,
+    inflation_cpi_mode="annual",
+    utc_datetimes=False,
+    use_nws_zone_crosswalk=False,
+    narrative_side_file=False,
+):
+    cpi_annual = cpi_df.set_index('Year')['Annual'].to_dict()
+    columns = CLEANED_DETAILS_COLUMNS + (UTC_DATETIME_COLUMNS if utc_datetimes else [])
+    return {
+        "inflation_target_year": inflation_target_year,
+        "inflation_cpi_mode": inflation_cpi_mode,
+        "utc_datetimes": utc_datetimes,
+        "use_nws_zone_crosswalk": use_nws_zone_crosswalk,
+        "narrative_side_file": narrative_side_file,
+        "zone_crosswalk": build_zone_county_crosswalk(nws_zone_df) if use_nws_zone_crosswalk else None,
+        "nws_zone_sha256": table_checksum(nws_zone_df) if use_nws_zone_crosswalk else None,
+        "cpi_sha256": table_checksum(cpi_df),
+        "cpi_annual": cpi_annual,
+        "cpi_target": cpi_annual[inflation_target_year],
+        "cpi_monthly": cpi_df.set_index('Year')[CPI_MONTH_COLUMNS],
+        "columns": columns,
+        # Arrow schemas of the cleaned details, so every streamed block is written to the dataset with the same dtypes,
+        # and of the cleaned parquet outputs without the narratives
+        "schema": details_arrow_schema(columns),
+        "no_narratives_schema": details_arrow_schema([column for column in columns if column not in NARRATIVE_COLUMNS]),
+    }
+
+
+# Clean and standardize filtered details events, returns the cleaned details columns
+def clean_filtered_details(df_details, mapping, options):
+    rows = len(df_details)
+
+    # Update the CZ_FIPS column
+    with stage("cz_fips_remap", rows_in=rows) as record:
+        df_details["CZ_FIPS"], df_details["ZONE_GEOIDS"] = replace_cz_fips(df_details, mapping, options["zone_crosswalk"])
+
+        df_details["CZ_FIPS"] = df_details["CZ_FIPS"].astype(str).str.zfill(3)
+        df_details["STATE_FIPS"] = df_details["STATE_FIPS"].astype(str).str.zfill(2)
+        df_details["GEOID"] = df_details["STATE_FIPS"].astype(str).str.zfill(2) + df_details["CZ_FIPS"].astype(str).str.zfill(3)
+        record["rows_out"] = len(df_details)
+
+    # Standardize the report sources, hazard event names and timezones
+    with stage("text_normalization", rows_in=rows) as record:
+        df_details["SOURCE"] = normalize_unique_values(df_details["SOURCE"], normalize_source)
+        df_details["EVENT_TYPE"] = normalize_unique_values(df_details["EVENT_TYPE"], normalize_event_type)
+        df_details["CZ_TIMEZONE"] = standardize_timezones(df_details)
+
+        # Standardize and abbreviate the hazard event types
+        df_details["HAZARD"] = df_details["EVENT_TYPE"].map(acronym_map)
+        record["rows_out"] = len(df_details)
+
+    with stage("datetime_build", rows_in=rows) as record:
+        df_details["BEGIN_DATETIME"] = create_datetime(df_details, "BEGIN_")
+        df_details["END_DATETIME"] = create_datetime(df_details, "END_")
+        df_details = df_details.drop(columns=legacy)
+
+        if options["utc_datetimes"]:
+            df_details["BEGIN_DATETIME_UTC"] = utc_datetime(df_details["BEGIN_DATETIME"], df_details["CZ_TIMEZONE"])
+            df_details["END_DATETIME_UTC"] = utc_datetime(df_details["END_DATETIME"], df_details["CZ_TIMEZONE"])
+
+        df_details["start_year"] = df_details["BEGIN_DATETIME"].dt.year
+        df_details["end_year"] = df_details["END_DATETIME"].dt.year
+        record["rows_out"] = len(df_details)
+
+    with stage("damage_parse", rows_in=rows) as record:
+        damage_property, damage_property_failed = to_cost(df_details.DAMAGE_PROPERTY)
+        damage_crops, damage_crops_failed = to_cost(df_details.DAMAGE_CROPS)
+        df_details["DAMAGE_PARSE_FAILURES"] = damage_parse_failures(
+            df_details, {"DAMAGE_PROPERTY": damage_property_failed, "DAMAGE_CROPS": damage_crops_failed}
+        )
+        df_details.DAMAGE_PROPERTY = damage_property
+        df_details.DAMAGE_CROPS = damage_crops
+
+        # Fix invalid values (negative/nan) by reassigning to zero
+        df_details['DEATHS_DIRECT'] = df_details['DEATHS_DIRECT'].fillna(0).astype(int)
+        df_details['DEATHS_INDIRECT'] = df_details['DEATHS_INDIRECT'].fillna(0).astype(int)
+        df_details['INJURIES_DIRECT'] = df_details['INJURIES_DIRECT'].fillna(0).astype(int)
+        df_details['INJURIES_DIRECT'] = df_details['INJURIES_DIRECT'].fillna(0).astype(int)
+        df_details['DAMAGE_CROPS'] = df_details['DAMAGE_CROPS'].fillna(0).astype(int)
+        df_details['DAMAGE_PROPERTY'] = df_details['DAMAGE_PROPERTY'].fillna(0).astype(int)
+        df_details.loc[df_details['DEATHS_DIRECT']<0, 'DEATHS_DIRECT'] = 0
+        df_details.loc[df_details['DEATHS_INDIRECT']<0, 'DEATHS_INDIRECT'] = 0
+        df_details.loc[df_details['INJURIES_DIRECT']<0, 'INJURIES_DIRECT'] = 0
+        df_details.loc[df_details['INJURIES_DIRECT']<0, 'INJURIES_DIRECT'] = 0
+        df_details.loc[df_details['DAMAGE_PROPERTY']<0, 'DAMAGE_PROPERTY'] = 0
+        df_details.loc[df_details['DAMAGE_CROPS']<0, 'DAMAGE_CROPS'] = 0
+        record["rows_out"] = len(df_details)
+
+    with stage("cpi_adjust", rows_in=rows) as record:
+        # Adjust damage cost amounts for inflation, based on US BLS CPI
+        # Assumes events occur over the same start year, disregarding events that span over two years,
+        # calculated annually, or monthly from the begin month with the "monthly" inflation_cpi_mode
+        df_details['INFLATION_YEAR'] = df_details['start_year']
+
+        # Complete inflation transformation to correct damage metrics, rounded half to even as round() did
+        inflation_factor = inflation_factors(df_details, options)
+        df_details['ADJ_DAMAGE_PROPERTY'] = np.round(df_details['DAMAGE_PROPERTY'].to_numpy() * inflation_factor).astype(np.int64)
+        df_details['ADJ_DAMAGE_CROPS'] = np.round(df_details['DAMAGE_CROPS'].to_numpy() * inflation_factor).astype(np.int64)
+        record["rows_out"] = len(df_details)
+
+    # Add new combined impact fields
+    df_details['TOTAL_ADJ_DAMAGE'] = (df_details['ADJ_DAMAGE_PROPERTY'] + df_details['ADJ_DAMAGE_CROPS']).fillna(0)
+    df_details['TOTAL_DEATHS'] = (df_details['DEATHS_DIRECT'] + df_details['DEATHS_INDIRECT']).fillna(0)
+    df_details['TOTAL_INJURIES'] = (df_details['INJURIES_DIRECT'] + df_details['INJURIES_INDIRECT']).fillna(0)
+
+    return df_details.reindex(columns=options["columns"])
+
+
+# Identify events with known location data
+def location_info_counts(df_details):
+    with_coordinates = df_details.BEGIN_LAT.notnull() & df_details.BEGIN_LON.notnull()
+    with_cz_name = df_details.CZ_NAME.notnull()
+    with_cz_fips = df_details.CZ_FIPS.notnull()
+    with_state_fips = df_details.STATE_FIPS.notnull()
+    with_state_name = df_details.STATE.notnull()
+    with_all_location_info = (
+        df_details.CZ_NAME.notnull()
+        & df_details.CZ_FIPS.notnull()
+        & df_details.STATE_FIPS.notnull()
+        & df_details.STATE.notnull()
+        & df_details.BEGIN_LAT.notnull()
+        & df_details.BEGIN_LON.notnull()
+    )
+
+    return {
+        "total_events": len(df_details),
+        "events_with_coordinates": int(with_coordinates.sum()),
+        "events_with_cz_name": int(with_cz_name.sum()),
+        "events_with_cz_fips": int(with_cz_fips.sum()),
+        "events_with_state_fips": int(with_state_fips.sum()),
+        "events_with_state_name": int(with_state_name.sum()),
+        "events_with_all_location_info": int(with_all_location_info.sum()),
+    }
+
+
+def print_location_info(counts):
+    total_events = counts["total_events"]
+
+    perc_event_cz_name = counts["events_with_cz_name"] / total_events * 100
+    perc_event_with_cz_fips = counts["events_with_cz_fips"] / total_events * 100
+    perc_event_with_state_fips = counts["events_with_state_fips"] / total_events * 100
+    perc_event_with_state_name = counts["events_with_state_name"] / total_events * 100
+    perc_event_with_all_location_info = counts["events_with_all_location_info"] / total_events * 100
+    perc_event_with_coordinates = counts["events_with_coordinates"] / total_events * 100
+
+    print(f"total_events: {total_events}")
+    print(f"perc_event_cz_name: {perc_event_cz_name}")
+    print(f"perc_event_with_cz_fips: {perc_event_with_cz_fips}")
+    print(f"perc_event_with_state_fips: {perc_event_with_state_fips}")
+    print(f"perc_event_with_state_name: {perc_event_with_state_name}")
+    print(f"perc_event_with_all_location_info: {perc_event_with_all_location_info}")
+    print(f"perc_event_with_coordinates: {perc_event_with_coordinates}")
+
+
+# Arrow schema of the narratives side file
+NARRATIVES_SCHEMA = details_arrow_schema(["EVENT_ID"] + NARRATIVE_COLUMNS)
+
+
+def year_partition_path(dataset_path, year):
+    return os.path.join(dataset_path, f"year={year}")
+
+
+CZ_FIPS_MAPPING_COLUMNS = ["EPISODE_ID", "EVENT_ID", "STATE", "STATE_FIPS", "EVENT_TYPE", "CZ_TYPE", "CZ_FIPS", "CZ_NAME"]
+
+
+# The Z to C CZ_FIPS mapping needs every C event, so it is built in a first pass over just the columns it uses
+def stream_cz_fips_mapping(csv_files):
+    mapping = {}
+    for path in tqdm(csv_files, desc="Building CZ_FIPS mapping"):
+        with stage("cz_fips_mapping") as record:
+            df_mapping = read_details_csv(path, usecols=CZ_FIPS_MAPPING_COLUMNS)
+            record["rows_in"] = len(df_mapping)
+            mapping.update(build_cz_fips_mapping(filter_details(df_mapping)))
+    return mapping
+
+
+# Clean one annual details file (or in blocks of chunksize rows) into its year partition, replacing what was there
+def clean_details_file(path, dataset_path, mapping, options, chunksize=None):
+    partition_path = year_partition_path(dataset_path, details_file_year(path))
+    shutil.rmtree(partition_path, ignore_errors=True)
+    os.makedirs(partition_path)
+
+    counts = {}
+    blocks = read_details_csv(path, chunksize=chunksize)
+    if chunksize is None:
+        blocks = [blocks]
+    for block_number, df_block in enumerate(blocks):
+        with stage("filter_details", rows_in=len(df_block)) as record:
+            df_block = filter_details(df_block)
+            record["rows_out"] = len(df_block)
+        if len(df_block) == 0:
+            continue
+        with stage("clean_details", rows_in=len(df_block)) as record:
+            df_block = apply_details_schema(clean_filtered_details(df_block, mapping, options))
+            record["rows_out"] = len(df_block)
+
+        for key, value in location_info_counts(df_block).items():
+            counts[key] = counts.get(key, 0) + value
+
+        with stage("write_partition", rows_in=len(df_block)) as record:
+            df_block = df_block.sort_values(["BEGIN_DATETIME", "CZ_FIPS"], ascending=[True, True])
+            pq.write_table(
+                pa.Table.from_pandas(df_block, schema=options["schema"], preserve_index=False),
+                os.path.join(partition_path, f"part-{block_number:04d}.parquet"),
+            )
+            record["rows_out"] = len(df_block)
+    return counts
+
+
+# Clean the annual details files one at a time (or in blocks of chunksize rows) into a year partitioned parquet dataset
+def stream_clean_details(csv_files, dataset_path, options, chunksize=None, mapping=None):
+    if mapping is None:
+        mapping = stream_cz_fips_mapping(csv_files)
+
+    counts = {}
+    for path in tqdm(csv_files, desc="Cleaning details files"):
+        for key, value in clean_details_file(path, dataset_path, mapping, options, chunksize).items():
+            counts[key] = counts.get(key, 0) + value
+    return counts
+
+
+# Revision date of an annual details file, from the _cYYYYMMDD part of its name
+def details_file_revision(path):
+    return re.search(r"_c(\d{8})", os.path.basename(path)).group(1)
+
+
+# NCEI republishes a year as a new file with a later _cYYYYMMDD revision, only the latest revision of each year is used
+def latest_details_files(csv_files):
+    latest = {}
+    for path in csv_files:
+        year = details_file_year(path)
+        if year not in latest or details_file_revision(path) > details_file_revision(latest[year]):
+            latest[year] = path
+    return [latest[year] for year in sorted(latest)]
+
+
+def file_checksum(path):
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(functools.partial(file.read, 1 << 20), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+# The manifest records the input file behind each year partition, and the Z to C CZ_FIPS mapping the dataset was cleaned with
+def manifest_path(dataset_path):
+    return os.path.join(dataset_path, "_manifest.json")
+
+
+# Cleaning settings that change the cleaned values, a change re-cleans every year
+# The CPI table (ADJ_DAMAGE_*) and, with use_nws_zone_crosswalk, the NWS zone table (CZ_FIPS, ZONE_GEOIDS) are recorded
+# by checksum, so that a revised table also re-cleans every year
+def cleaning_settings(options):
+    return {
+        "inflation_target_year": options["inflation_target_year"],
+        "inflation_cpi_mode": options["inflation_cpi_mode"],
+        "utc_datetimes": options["utc_datetimes"],
+        "use_nws_zone_crosswalk": options["use_nws_zone_crosswalk"],
+        "nws_zone_sha256": options["nws_zone_sha256"],
+        "cpi_sha256": options["cpi_sha256"],
+    }
+
+
+def load_manifest(dataset_path):
+    if not os.path.exists(manifest_path(dataset_path)):
+        return {"files": {}, "cz_fips_mapping": [], "settings": {}}
+    with open(manifest_path(dataset_path)) as file:
+        return json.load(file)
+
+
+def save_manifest(dataset_path, csv_files, mapping, options):
+    manifest = {
+        "settings": cleaning_settings(options),
+        "files": {
+            os.path.basename(path): {
+                "year": details_file_year(path),
+                "revision": details_file_revision(path),
+                "size": os.path.getsize(path),
+                "sha256": file_checksum(path),
+            }
+            for path in csv_files
+        },
+        "cz_fips_mapping": [
+            [int(state_fips), state, cz_name, int(cz_fips)]
+            for (state_fips, state, cz_name), cz_fips in mapping.items()
+            if not pd.isnull(cz_name)
+        ],
+    }
+    with open(manifest_path(dataset_path), "w") as file:
+        json.dump(manifest, file, indent=1)
+
+
+# Years of the dataset cleaned with a Z to C CZ_FIPS mapping value that has since changed
+def years_with_changed_mapping(dataset_path, years, old_mapping, mapping):
+    changed_keys = {
+        key for key in set(old_mapping) | set(mapping) if old_mapping.get(key) != mapping.get(key)
+    }
+    if len(changed_keys) == 0:
+        return set()
+
+    changed_years = set()
+    for year in years:
+        df_zones = pq.read_table(
+            year_partition_path(dataset_path, year), columns=["CZ_TYPE", "STATE_FIPS", "STATE", "CZ_NAME"]
+        ).to_pandas()
+        df_zones = df_zones[df_zones["CZ_TYPE"] == "Z"]
+        zone_keys = zip(df_zones["STATE_FIPS"].astype(int), df_zones["STATE"], df_zones["CZ_NAME"])
+        if any(key in changed_keys for key in zone_keys):
+            changed_years.add(year)
+    return changed_years
+
+
+# Re-clean only the annual files that are new or changed since the manifest was written (name, size or checksum),
+# plus any year whose zone events depend on a changed Z to C CZ_FIPS mapping value, partitions of removed years are deleted
+def incremental_clean_details(csv_files, dataset_path, options, chunksize=None):
+    csv_files = latest_details_files(csv_files)
+    manifest = load_manifest(dataset_path)
+    mapping = stream_cz_fips_mapping(csv_files)
+
+    changed_files = []
+    for path in csv_files:
+        entry = manifest["files"].get(os.path.basename(path))
+        if (
+            entry is None
+            or manifest.get("settings") != cleaning_settings(options)
+            or entry["size"] != os.path.getsize(path)
+            or entry["sha256"] != file_checksum(path)
+            or not os.path.exists(year_partition_path(dataset_path, details_file_year(path)))
+        ):
+            changed_files.append(path)
+
+    current_years = {details_file_year(path) for path in csv_files}
+    for entry in manifest["files"].values():
+        if entry["year"] not in current_years:
+            shutil.rmtree(year_partition_path(dataset_path, entry["year"]), ignore_errors=True)
+
+    old_mapping = {
+        (state_fips, state, cz_name): cz_fips for state_fips, state, cz_name, cz_fips in manifest["cz_fips_mapping"]
+    }
+    unchanged_years = current_years - {details_file_year(path) for path in changed_files}
+    changed_years = years_with_changed_mapping(dataset_path, sorted(unchanged_years), old_mapping, mapping)
+    changed_files = changed_files + [path for path in csv_files if details_file_year(path) in changed_years]
+
+    print(f"Re-cleaning {len(changed_files)} of {len(csv_files)} annual details files")
+    counts = stream_clean_details(sorted(changed_files), dataset_path, options, chunksize=chunksize, mapping=mapping)
+    save_manifest(dataset_path, csv_files, mapping, options)
+    return counts
+
+
+# Rebuild a single csv and parquet output from the year partitions, holding only one year in memory at a time
+# Each year is written as its own parquet row group, as write_details_parquet does
+# With the narrative_side_file option the narratives are left out of the parquet output, and saved to narratives_path if given
+def write_details_from_dataset(dataset_path, csv_path, parquet_path, options, start_datetime=None, narratives_path=None):
+    years = sorted(
+        int(name.split("=")[1]) for name in os.listdir(dataset_path) if name.startswith("year=")
+    )
+    parquet_schema = options["no_narratives_schema"] if options["narrative_side_file"] else options["schema"]
+    parquet_writer = pq.ParquetWriter(parquet_path, parquet_schema, compression="gzip")
+    if narratives_path is not None:
+        narratives_writer = pq.ParquetWriter(narratives_path, NARRATIVES_SCHEMA, compression="gzip")
+        written_event_ids = set()
+    write_header = True
+    for year in years:
+        if start_datetime is not None and year < start_datetime.year:
+            continue
+        with stage("read_partition") as record:
+            df_year = pq.read_table(year_partition_path(dataset_path, year), schema=options["schema"]).to_pandas()
+            df_year = apply_details_schema(df_year)
+            record["rows_in"] = len(df_year)
+            if start_datetime is not None:
+                df_year = df_year[df_year["BEGIN_DATETIME"] >= start_datetime]
+            df_year = df_year.sort_values(["BEGIN_DATETIME", "CZ_FIPS"], ascending=[True, True])
+            df_year = df_year.drop_duplicates()
+            record["rows_out"] = len(df_year)
+
+        with stage("write_csv", rows_in=len(df_year)) as record:
+            df_year.to_csv(
+                csv_path,
+                mode="w" if write_header else "a",
+                header=write_header,
+                encoding="utf-8",
+            )
+            record["rows_out"] = len(df_year)
+        with stage("write_parquet", rows_in=len(df_year)) as record:
+            parquet_writer.write_table(
+                pa.Table.from_pandas(df_year, schema=parquet_schema, preserve_index=False)
+            )
+            record["rows_out"] = len(df_year)
+        if narratives_path is not None:
+            with stage("write_narratives", rows_in=len(df_year)) as record:
+                narratives_df = df_year[["EVENT_ID"] + NARRATIVE_COLUMNS].drop_duplicates("EVENT_ID")
+                narratives_df = narratives_df[~narratives_df["EVENT_ID"].isin(written_event_ids)]
+                written_event_ids.update(narratives_df["EVENT_ID"].tolist())
+                narratives_writer.write_table(
+                    pa.Table.from_pandas(narratives_df, schema=NARRATIVES_SCHEMA, preserve_index=False)
+                )
+                record["rows_out"] = len(narratives_df)
+        write_header = False
+    parquet_writer.close()
+    if narratives_path is not None:
+        narratives_writer.close()
+
+
+# Save the cleaned details as parquet with one row group per begin year, the rows are already sorted by BEGIN_DATETIME
+# The row group statistics then let readers skip whole years, see read_cleaned_details
+# With narrative_side_file the narratives are left out, they are saved by write_narratives_parquet instead
+def write_details_parquet(df, parquet_path, narrative_side_file=False):
+    if narrative_side_file:
+        df = df.drop(columns=NARRATIVE_COLUMNS)
+    table = pa.Table.from_pandas(df)
+    years = df["BEGIN_DATETIME"].dt.year.fillna(-1).to_numpy()
+    boundaries = np.concatenate([[0], np.flatnonzero(years[1:] != years[:-1]) + 1, [len(df)]])
+    with pq.ParquetWriter(parquet_path, table.schema, compression="gzip") as parquet_writer:
+        for start, stop in zip(boundaries[:-1], boundaries[1:]):
+            parquet_writer.write_table(table.slice(start, stop - start))
+
+
+# Save the narratives side file, EVENT_ID, EPISODE_NARRATIVE and EVENT_NARRATIVE with one row per EVENT_ID
+# (an EVENT_ID found more than once, e.g. in several revisions, keeps the narratives of its first row)
+def write_narratives_parquet(df, parquet_path):
+    narratives_df = df[["EVENT_ID"] + NARRATIVE_COLUMNS].drop_duplicates("EVENT_ID")
+    pq.write_table(
+        pa.Table.from_pandas(narratives_df, schema=NARRATIVES_SCHEMA, preserve_index=False),
+        parquet_path,
+        compression="gzip",
+    )
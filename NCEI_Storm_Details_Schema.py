@@ -0,0 +1,177 @@
+#######################
+"""
+Updated Nov, 2025
+
+@author: Joshua Green - University of Southampton
+
+Please cite this script/dataset if used in any research or publications.
+
+Green, J. (2025) NCEI Storm Multihazard Eventset.
+
+Column dtypes of the NCEI storm details table, used by Clean_NCEI_Storm_Database.py and Generate_NCEI_Storm_Multihazard_Eventset.py
+"""
+#######################
+
+import pandas as pd
+import pyarrow as pa
+
+
+# Low cardinality text columns (states, event types, timezones, offices, report sources etc.), held as pandas categoricals
+CATEGORICAL_COLUMNS = [
+    "STATE",
+    "STATE_FIPS",
+    "GEOID",
+    "EVENT_TYPE",
+    "HAZARD",
+    "CZ_TYPE",
+    "CZ_FIPS",
+    "CZ_NAME",
+    "WFO",
+    "CZ_TIMEZONE",
+    "MONTH_NAME",
+    "SOURCE",
+    "MAGNITUDE_TYPE",
+    "FLOOD_CAUSE",
+    "TOR_F_SCALE",
+    "TOR_OTHER_WFO",
+    "TOR_OTHER_CZ_STATE",
+    "BEGIN_AZIMUTH",
+    "END_AZIMUTH",
+    "DATA_SOURCE",
+]
+
+# Free text columns, kept as strings
+STRING_COLUMNS = [
+    "BEGIN_DATE_TIME",
+    "END_DATE_TIME",
+    "DAMAGE_PROPERTY",
+    "DAMAGE_CROPS",
+    "ZONE_GEOIDS",
+    "DAMAGE_PARSE_FAILURES",
+    "TOR_OTHER_CZ_NAME",
+    "BEGIN_LOCATION",
+    "END_LOCATION",
+    "EPISODE_NARRATIVE",
+    "EVENT_NARRATIVE",
+]
+
+# Long free text columns, the bulk of the cleaned database, that can be loaded separately (see NCEI_Prepared_Events.py)
+NARRATIVE_COLUMNS = ["EPISODE_NARRATIVE", "EVENT_NARRATIVE"]
+
+# dtypes of the cleaned details table, columns not listed here keep whatever dtype they have
+# INJURIES_INDIRECT is a nullable integer as, unlike the other counts, its missing values are not filled in during cleaning
+CLEANED_DETAILS_DTYPES = {
+    "EPISODE_ID": "int32",
+    "EVENT_ID": "int64",
+    "BEGIN_DATETIME": "datetime64[ns]",
+    "END_DATETIME": "datetime64[ns]",
+    "BEGIN_DATETIME_UTC": "datetime64[ns, UTC]",
+    "END_DATETIME_UTC": "datetime64[ns, UTC]",
+    "start_year": "int32",
+    "end_year": "int32",
+    "INJURIES_DIRECT": "int64",
+    "INJURIES_INDIRECT": "Int64",
+    "DEATHS_DIRECT": "int64",
+    "DEATHS_INDIRECT": "int64",
+    "DAMAGE_PROPERTY": "int64",
+    "DAMAGE_CROPS": "int64",
+    "ADJ_DAMAGE_PROPERTY": "int64",
+    "ADJ_DAMAGE_CROPS": "int64",
+    "TOTAL_INJURIES": "int64",
+    "TOTAL_DEATHS": "int64",
+    "TOTAL_ADJ_DAMAGE": "int64",
+    "MAGNITUDE": "float32",
+    "CATEGORY": "float64",
+    "TOR_LENGTH": "float64",
+    "TOR_WIDTH": "float64",
+    "TOR_OTHER_CZ_FIPS": "float64",
+    "BEGIN_RANGE": "float64",
+    "END_RANGE": "float64",
+    "BEGIN_LAT": "float64",
+    "BEGIN_LON": "float64",
+    "END_LAT": "float64",
+    "END_LON": "float64",
+}
+CLEANED_DETAILS_DTYPES.update({column: "category" for column in CATEGORICAL_COLUMNS})
+CLEANED_DETAILS_DTYPES.update({column: "object" for column in STRING_COLUMNS if column not in CLEANED_DETAILS_DTYPES})
+
+# dtypes used when reading the raw StormEvents_details csv files
+# IDs are nullable integers, as events with a missing ID are only removed during cleaning
+DETAILS_CSV_DTYPES = {
+    "EPISODE_ID": "Int64",
+    "EVENT_ID": "Int64",
+    "STATE_FIPS": "Int64",
+    "CZ_FIPS": "Int64",
+    "MAGNITUDE": "float32",
+    "BEGIN_LAT": "float64",
+    "BEGIN_LON": "float64",
+    "END_LAT": "float64",
+    "END_LON": "float64",
+}
+DETAILS_CSV_DTYPES.update(
+    {column: "category" for column in CATEGORICAL_COLUMNS if column not in ["STATE_FIPS", "GEOID", "HAZARD", "CZ_FIPS"]}
+)
+DETAILS_CSV_DTYPES.update({column: str for column in STRING_COLUMNS})
+
+
+# Cast the columns of a details dataframe to the declared dtypes, categories are kept in sorted order
+# so that sorting on a categorical column gives the same order as sorting the strings
+def apply_details_schema(df, dtypes=CLEANED_DETAILS_DTYPES):
+    for column, dtype in dtypes.items():
+        if column not in df.columns:
+            continue
+        if dtype == "category":
+            values = df[column]
+            if not isinstance(values.dtype, pd.CategoricalDtype):
+                values = values.astype("category")
+            categories = values.cat.categories
+            if not categories.is_monotonic_increasing:
+                values = values.cat.reorder_categories(categories.sort_values())
+            df[column] = values
+        elif dtype == "object":
+            if isinstance(df[column].dtype, pd.CategoricalDtype):
+                df[column] = df[column].astype(object)
+        elif df[column].dtype != dtype:
+            df[column] = df[column].astype(dtype)
+    return df
+
+
+# Concatenate details dataframes (e.g. one per annual file), keeping the categorical columns categorical
+def concat_details(dataframes):
+    dataframes = list(dataframes)
+    if len(dataframes) == 0:
+        return pd.DataFrame()
+    for column in dataframes[0].columns:
+        if not all(isinstance(df[column].dtype, pd.CategoricalDtype) for df in dataframes):
+            continue
+        categories = pd.api.types.union_categoricals(
+            [df[column].array for df in dataframes], sort_categories=True
+        ).categories
+        for df in dataframes:
+            df[column] = df[column].cat.set_categories(categories)
+    return pd.concat(dataframes)
+
+
+_ARROW_TYPES = {
+    "int32": pa.int32(),
+    "int64": pa.int64(),
+    "Int64": pa.int64(),
+    "float32": pa.float32(),
+    "float64": pa.float64(),
+    "datetime64[ns]": pa.timestamp("ns"),
+    "datetime64[ns, UTC]": pa.timestamp("ns", tz="UTC"),
+    "category": pa.dictionary(pa.int32(), pa.string()),
+    "object": pa.string(),
+}
+
+
+# Arrow schema of the cleaned details table, for the given column order
+def details_arrow_schema(columns, dtypes=CLEANED_DETAILS_DTYPES):
+    return pa.schema([(column, _ARROW_TYPES[dtypes.get(column, "float64")]) for column in columns])
+
+
+# Load a cleaned details parquet file with the declared dtypes
+# filters (a pyarrow dataset expression) are pushed down into the parquet reader, so row groups whose statistics
+# rule out every row (e.g. other years, as the cleaner writes one row group per year) are never read
+def read_cleaned_details(path, columns=None, filters=None):
+    return apply_details_schema(pd.read_parquet(path, columns=columns, filters=filters))
@@ -0,0 +1,298 @@
+#######################
+"""
+Updated Nov, 2025
+
+@author: Joshua Green - University of Southampton
+
+Please cite this script/dataset if used in any research or publications.
+
+Green, J. (2025) NCEI Storm Multihazard Eventset.
+
+Synthetic NCEI StormEvents_details files, with the raw csv schema and a realistic skew, used by Benchmark_NCEI_Storm_Pipeline.py
+"""
+#######################
+
+import os
+
+import numpy as np
+import pandas as pd
+
+
+# Columns of the raw StormEvents_details csv files, in file order
+RAW_DETAILS_COLUMNS = [
+    "BEGIN_YEARMONTH", "BEGIN_DAY", "BEGIN_TIME", "END_YEARMONTH", "END_DAY", "END_TIME", "EPISODE_ID", "EVENT_ID",
+    "STATE", "STATE_FIPS", "YEAR", "MONTH_NAME", "EVENT_TYPE", "CZ_TYPE", "CZ_FIPS", "CZ_NAME", "WFO", "BEGIN_DATE_TIME",
+    "CZ_TIMEZONE", "END_DATE_TIME", "INJURIES_DIRECT", "INJURIES_INDIRECT", "DEATHS_DIRECT", "DEATHS_INDIRECT",
+    "DAMAGE_PROPERTY", "DAMAGE_CROPS", "SOURCE", "MAGNITUDE", "MAGNITUDE_TYPE", "FLOOD_CAUSE", "CATEGORY", "TOR_F_SCALE",
+    "TOR_LENGTH", "TOR_WIDTH", "TOR_OTHER_WFO", "TOR_OTHER_CZ_STATE", "TOR_OTHER_CZ_FIPS", "TOR_OTHER_CZ_NAME",
+    "BEGIN_RANGE", "BEGIN_AZIMUTH", "BEGIN_LOCATION", "END_RANGE", "END_AZIMUTH", "END_LOCATION", "BEGIN_LAT", "BEGIN_LON",
+    "END_LAT", "END_LON", "EPISODE_NARRATIVE", "EVENT_NARRATIVE", "DATA_SOURCE",
+]
+
+# States of the synthetic database: (STATE, STATE_FIPS, CZ_TIMEZONE, WFO, share of the events, (lat min, lat max, lon min, lon max))
+SYNTHETIC_STATES = [
+    ("TEXAS", 48, "CST-6", "HGX", 0.22, (26.0, 36.5, -106.5, -93.5)),
+    ("KANSAS", 20, "CST-6", "ICT", 0.10, (37.0, 40.0, -102.0, -94.6)),
+    ("OKLAHOMA", 40, "CST-6", "OUN", 0.09, (33.6, 37.0, -103.0, -94.4)),
+    ("IOWA", 19, "CST-6", "DMX", 0.08, (40.4, 43.5, -96.6, -90.1)),
+    ("ILLINOIS", 17, "CST-6", "LOT", 0.08, (37.0, 42.5, -91.5, -87.5)),
+    ("GEORGIA", 13, "EST-5", "FFC", 0.08, (30.4, 35.0, -85.6, -80.8)),
+    ("FLORIDA", 12, "EST-5", "MFL", 0.08, (24.5, 31.0, -87.6, -80.0)),
+    ("NEW YORK", 36, "EST-5", "OKX", 0.09, (40.5, 45.0, -79.8, -71.8)),
+    ("COLORADO", 8, "MST-7", "BOU", 0.09, (37.0, 41.0, -109.0, -102.0)),
+    ("CALIFORNIA", 6, "PST-8", "LOX", 0.09, (32.5, 42.0, -124.4, -114.1)),
+]
+
+# Counties per synthetic state, the county events are spread over them with a Zipf like skew so that a few
+# counties (the equivalents of Harris TX or Cook IL) hold a large share of the events
+SYNTHETIC_COUNTIES_PER_STATE = 60
+SYNTHETIC_COUNTY_SKEW = 1.1
+
+# Event types: (EVENT_TYPE as written in the raw files, share of the events, median duration in minutes, duration spread)
+# The durations are lognormal, from minutes for convective events to months for droughts, so long events span
+# month and year boundaries. A few legacy spellings are included, as the cleaning has to normalize them
+SYNTHETIC_EVENT_TYPES = [
+    ("Thunderstorm Wind", 0.28, 10, 1.0),
+    ("THUNDERSTORM WINDS", 0.02, 10, 1.0),
+    ("Hail", 0.24, 5, 1.0),
+    ("HAIL FLOODING", 0.002, 60, 1.0),
+    ("Flash Flood", 0.07, 240, 1.0),
+    ("Flood", 0.05, 1440, 1.2),
+    ("Tornado", 0.03, 8, 1.0),
+    ("TORNADO F0", 0.003, 5, 1.0),
+    ("High Wind", 0.04, 600, 1.0),
+    ("Strong Wind", 0.02, 300, 1.0),
+    ("Winter Storm", 0.04, 1440, 0.6),
+    ("Winter Weather", 0.03, 720, 0.6),
+    ("Heavy Snow", 0.025, 1080, 0.6),
+    ("High Snow", 0.002, 1080, 0.6),
+    ("Heavy Rain", 0.025, 360, 1.0),
+    ("Lightning", 0.02, 1, 0.5),
+    ("Drought", 0.04, 43200, 0.8),
+    ("Excessive Heat", 0.015, 4320, 0.7),
+    ("Heat", 0.01, 2880, 0.7),
+    ("Wildfire", 0.008, 10080, 1.0),
+    ("Ice Storm", 0.006, 1440, 0.6),
+    ("Cold/Wind Chill", 0.008, 720, 0.6),
+    ("Tropical Storm", 0.004, 2880, 0.5),
+    ("Funnel Cloud", 0.01, 5, 0.8),
+    ("Dense Fog", 0.01, 360, 0.8),
+]
+
+# Report sources, as written in the raw files (some are renamed by the cleaning)
+SYNTHETIC_SOURCES = [
+    "Trained Spotter", "Public", "General Public", "Law Enforcement", "Emergency Manager", "Asos", "Coop Observer",
+    "NWS Employee(Off Duty)", "Broadcast Media", "Mesonet", "Cocorahs", "911 Call Center",
+]
+
+MONTH_NAMES = [
+    "January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December",
+]
+
+# Words the synthetic narratives are made of, the narratives are by far the largest columns of the real database
+NARRATIVE_WORDS = (
+    "a line of severe thunderstorms moved across the county producing large hail damaging winds and heavy rain "
+    "trees and power lines were reported down several homes sustained roof damage flooding closed roads near the "
+    "river gauge rose above flood stage emergency managers reported water over the highway an outflow boundary "
+    "triggered additional storms during the evening snow totals ranged from four to eight inches across the area"
+).split()
+
+
+# Synthetic counties: STATE, STATE_FIPS, COUNTY_FIPS (odd numbers, as most real county fips are), ZONE (the NWS zone
+# with the county's name), CZ_NAME and the share of each state's events that fall in the county
+def synthetic_counties(counties_per_state=SYNTHETIC_COUNTIES_PER_STATE, seed=0):
+    rng = np.random.default_rng(seed)
+    counties = []
+    for state, state_fips, _, _, _, _ in SYNTHETIC_STATES:
+        weights = 1 / np.arange(1, counties_per_state + 1) ** SYNTHETIC_COUNTY_SKEW
+        counties.append(
+            pd.DataFrame(
+                {
+                    "STATE": state,
+                    "STATE_FIPS": state_fips,
+                    "COUNTY_FIPS": np.arange(1, 2 * counties_per_state, 2),
+                    "ZONE": np.arange(1, counties_per_state + 1),
+                    "CZ_NAME": [f"{state[:4]} COUNTY {i}" for i in range(1, counties_per_state + 1)],
+                    "WEIGHT": rng.permutation(weights / weights.sum()),
+                }
+            )
+        )
+    return pd.concat(counties, ignore_index=True)
+
+
+# County IDs of the synthetic counties (GEOID, STATEFP, COUNTYFP), as load_county_ids returns for the county shapefile
+def synthetic_county_ids(counties_per_state=SYNTHETIC_COUNTIES_PER_STATE):
+    counties = synthetic_counties(counties_per_state)
+    county_ids = pd.DataFrame(
+        {
+            "STATEFP": counties["STATE_FIPS"].astype(str).str.zfill(2),
+            "COUNTYFP": counties["COUNTY_FIPS"].astype(str).str.zfill(3),
+        }
+    )
+    county_ids.insert(0, "GEOID", county_ids["STATEFP"] + county_ids["COUNTYFP"])
+    return county_ids.sort_values("GEOID").reset_index(drop=True)
+
+
+# Format a damage amount the way the raw files do, e.g. "10.00K", "1.50M", with empty strings for missing values
+def _damage_strings(rng, n_events):
+    kind = rng.choice(5, n_events, p=[0.55, 0.3, 0.12, 0.027, 0.003])
+    amounts = np.exp(rng.normal(2.5, 1.2, n_events))
+    damage = np.full(n_events, "", dtype=object)
+    damage[kind == 0] = "0.00K"
+    damage[kind == 2] = [f"{amount:.2f}K" for amount in amounts[kind == 2]]
+    damage[kind == 3] = [f"{amount / 100:.2f}M" for amount in amounts[kind == 3]]
+    damage[kind == 4] = "0.01B"
+    return damage
+
+
+# Synthetic narratives, picked from a pool of random word sequences of 10 to 120 words
+def _narratives(rng, n_events, pool_size=2000):
+    words = np.array(NARRATIVE_WORDS, dtype=object)
+    pool = np.array(
+        [" ".join(rng.choice(words, rng.integers(10, 120))).capitalize() + "." for _ in range(pool_size)], dtype=object
+    )
+    return pool[rng.integers(0, pool_size, n_events)]
+
+
+# One year of synthetic StormEvents_details rows, in the raw csv schema
+# Events are placed in states by SYNTHETIC_STATES, in counties by their Zipf like weights (about a third are reported
+# for the NWS zone of the county instead), start mostly in spring and summer, and last for the lognormal duration of
+# their event type. EVENT_IDs start at first_event_id, about 0.5% of the rows are exact duplicates as in the raw files
+def synthetic_details(year, n_events, seed=0, first_event_id=1, first_episode_id=1):
+    rng = np.random.default_rng([seed, year])
+    counties = synthetic_counties(seed=seed)
+    states = pd.DataFrame(
+        SYNTHETIC_STATES, columns=["STATE", "STATE_FIPS", "CZ_TIMEZONE", "WFO", "SHARE", "BOUNDS"]
+    )
+
+    # Location, state by its share of the events, then county by its weight within the state
+    state_rows = rng.choice(len(states), n_events, p=states["SHARE"] / states["SHARE"].sum())
+    county_rows = np.empty(n_events, dtype=np.int64)
+    for state_row in range(len(states)):
+        in_state = np.flatnonzero(state_rows == state_row)
+        state_counties = np.flatnonzero(counties["STATE"].to_numpy() == states["STATE"][state_row])
+        weights = counties["WEIGHT"].to_numpy()[state_counties]
+        county_rows[in_state] = rng.choice(state_counties, len(in_state), p=weights / weights.sum())
+    event_states = states.iloc[state_rows].reset_index(drop=True)
+    event_counties = counties.iloc[county_rows].reset_index(drop=True)
+    cz_type = rng.choice(np.array(["C", "Z", "M"]), n_events, p=[0.6, 0.38, 0.02])
+    cz_fips = np.where(cz_type == "C", event_counties["COUNTY_FIPS"], event_counties["ZONE"])
+    cz_fips = np.where(cz_type == "M", rng.integers(230, 250, n_events), cz_fips)
+
+    # Event type and timing, most events start in spring and summer
+    event_types = pd.DataFrame(SYNTHETIC_EVENT_TYPES, columns=["EVENT_TYPE", "SHARE", "MEDIAN", "SIGMA"])
+    type_rows = rng.choice(len(event_types), n_events, p=event_types["SHARE"] / event_types["SHARE"].sum())
+    year_start = pd.Timestamp(f"{year}-01-01")
+    days_in_year = (pd.Timestamp(f"{year + 1}-01-01") - year_start).days
+    day_of_year = np.where(
+        rng.random(n_events) < 0.7, rng.normal(160, 50, n_events), rng.uniform(0, days_in_year, n_events)
+    )
+    day_of_year = np.clip(day_of_year, 0, days_in_year - 1e-3)
+    begin = (year_start + pd.to_timedelta(day_of_year * 1440, unit="min")).floor("min")
+    duration = np.exp(
+        np.log(event_types["MEDIAN"].to_numpy()[type_rows]) + rng.normal(0, 1, n_events) * event_types["SIGMA"].to_numpy()[type_rows]
+    )
+    end = (begin + pd.to_timedelta(np.round(duration), unit="min")).floor("min")
+
+    # Impacts, tornadoes and heat are the most deadly
+    event_type = event_types["EVENT_TYPE"].to_numpy()[type_rows]
+    is_tornado = np.char.startswith(event_type.astype(str), "Tor") | np.char.startswith(event_type.astype(str), "TOR")
+    is_heat = np.isin(event_type, ["Excessive Heat", "Heat"])
+    injury_rate = np.where(is_tornado, 0.6, np.where(is_heat, 0.4, 0.03))
+    death_rate = np.where(is_tornado, 0.05, np.where(is_heat, 0.15, 0.004))
+
+    # Coordinates, for about 60% of the events, within the state and close to the begin point for the end point
+    bounds = np.array(event_states["BOUNDS"].tolist())
+    has_coordinates = rng.random(n_events) < 0.6
+    begin_lat = np.where(has_coordinates, rng.uniform(bounds[:, 0], bounds[:, 1]), np.nan)
+    begin_lon = np.where(has_coordinates, rng.uniform(bounds[:, 2], bounds[:, 3]), np.nan)
+    end_lat = begin_lat + np.where(is_tornado, rng.normal(0, 0.05, n_events), 0)
+    end_lon = begin_lon + np.where(is_tornado, rng.normal(0, 0.05, n_events), 0)
+
+    # A handful of one off timezone spellings, as in the raw files
+    timezone = event_states["CZ_TIMEZONE"].to_numpy(dtype=object)
+    odd_timezone = rng.random(n_events) < 0.01
+    timezone[odd_timezone] = rng.choice(np.array(["CSC", "EDT", "CDT", "GMT"], dtype=object), odd_timezone.sum())
+
+    hail = np.isin(event_type, ["Hail"])
+    wind = np.isin(event_type, ["Thunderstorm Wind", "THUNDERSTORM WINDS", "High Wind", "Strong Wind"])
+    magnitude = np.where(hail, rng.choice([0.75, 1.0, 1.75, 2.75], n_events), np.nan)
+    magnitude = np.where(wind, rng.integers(40, 90, n_events), magnitude)
+
+    details = pd.DataFrame(
+        {
+            "BEGIN_YEARMONTH": begin.year * 100 + begin.month,
+            "BEGIN_DAY": begin.day,
+            "BEGIN_TIME": begin.hour * 100 + begin.minute,
+            "END_YEARMONTH": end.year * 100 + end.month,
+            "END_DAY": end.day,
+            "END_TIME": end.hour * 100 + end.minute,
+            "EPISODE_ID": first_episode_id + np.sort(rng.integers(0, max(n_events // 4, 1), n_events)),
+            "EVENT_ID": first_event_id + np.arange(n_events),
+            "STATE": event_states["STATE"],
+            "STATE_FIPS": event_states["STATE_FIPS"],
+            "YEAR": year,
+            "MONTH_NAME": np.array(MONTH_NAMES, dtype=object)[begin.month - 1],
+            "EVENT_TYPE": event_type,
+            "CZ_TYPE": cz_type,
+            "CZ_FIPS": cz_fips,
+            "CZ_NAME": event_counties["CZ_NAME"],
+            "WFO": event_states["WFO"],
+            "BEGIN_DATE_TIME": begin.strftime("%d-%b-%y %H:%M:%S").str.upper(),
+            "CZ_TIMEZONE": timezone,
+            "END_DATE_TIME": end.strftime("%d-%b-%y %H:%M:%S").str.upper(),
+            "INJURIES_DIRECT": rng.poisson(injury_rate),
+            "INJURIES_INDIRECT": rng.poisson(injury_rate / 10),
+            "DEATHS_DIRECT": rng.poisson(death_rate),
+            "DEATHS_INDIRECT": rng.poisson(death_rate / 10),
+            "DAMAGE_PROPERTY": _damage_strings(rng, n_events),
+            "DAMAGE_CROPS": np.where(rng.random(n_events) < 0.9, "0.00K", _damage_strings(rng, n_events)),
+            "SOURCE": rng.choice(np.array(SYNTHETIC_SOURCES, dtype=object), n_events),
+            "MAGNITUDE": magnitude,
+            "MAGNITUDE_TYPE": np.where(wind, rng.choice(np.array(["EG", "MG", "ES"], dtype=object), n_events), None),
+            "FLOOD_CAUSE": np.where(np.isin(event_type, ["Flash Flood", "Flood"]), "Heavy Rain", None),
+            "CATEGORY": np.nan,
+            "TOR_F_SCALE": np.where(is_tornado, rng.choice(np.array(["EF0", "EF1", "EF2", "EF3"], dtype=object), n_events), None),
+            "TOR_LENGTH": np.where(is_tornado, np.round(rng.exponential(3, n_events), 2), np.nan),
+            "TOR_WIDTH": np.where(is_tornado, rng.integers(25, 800, n_events), np.nan),
+            "TOR_OTHER_WFO": None,
+            "TOR_OTHER_CZ_STATE": None,
+            "TOR_OTHER_CZ_FIPS": np.nan,
+            "TOR_OTHER_CZ_NAME": None,
+            "BEGIN_RANGE": np.where(has_coordinates, rng.integers(0, 10, n_events), np.nan),
+            "BEGIN_AZIMUTH": np.where(has_coordinates, rng.choice(np.array(["N", "NE", "E", "SE", "S", "SW", "W", "NW"], dtype=object), n_events), None),
+            "BEGIN_LOCATION": np.where(has_coordinates, event_counties["CZ_NAME"].str.replace(" COUNTY", ""), None),
+            "END_RANGE": np.where(has_coordinates, rng.integers(0, 10, n_events), np.nan),
+            "END_AZIMUTH": np.where(has_coordinates, rng.choice(np.array(["N", "NE", "E", "SE", "S", "SW", "W", "NW"], dtype=object), n_events), None),
+            "END_LOCATION": np.where(has_coordinates, event_counties["CZ_NAME"].str.replace(" COUNTY", ""), None),
+            "BEGIN_LAT": np.round(begin_lat, 4),
+            "BEGIN_LON": np.round(begin_lon, 4),
+            "END_LAT": np.round(end_lat, 4),
+            "END_LON": np.round(end_lon, 4),
+            "EPISODE_NARRATIVE": _narratives(rng, n_events),
+            "EVENT_NARRATIVE": np.where(rng.random(n_events) < 0.85, _narratives(rng, n_events), None),
+            "DATA_SOURCE": "CSV",
+        }
+    )
+
+    # Exact duplicate rows, as found in the raw files
+    duplicates = details.iloc[np.flatnonzero(rng.random(n_events) < 0.005)]
+    details = pd.concat([details, duplicates]).sort_values(["BEGIN_YEARMONTH", "BEGIN_DAY", "BEGIN_TIME"], kind="stable")
+    return details.reindex(columns=RAW_DETAILS_COLUMNS).reset_index(drop=True)
+
+
+# Write synthetic annual StormEvents_details files to directory, named as the NCEI files are so that the cleaning
+# picks them up, with events_per_year events each. Returns the file paths
+def write_synthetic_details(directory, years, events_per_year, seed=0):
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    first_event_id = 1
+    first_episode_id = 1
+    for year in years:
+        details = synthetic_details(year, events_per_year, seed, first_event_id, first_episode_id)
+        path = os.path.join(directory, f"StormEvents_details-ftp_v1.0_d{year}_c20250317.csv.gz")
+        details.to_csv(path, index=False, compression="gzip")
+        paths.append(path)
+        first_event_id += events_per_year
+        first_episode_id += events_per_year
+    return paths
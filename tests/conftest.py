@@ -0,0 +1,19 @@
+import os
+import sys
+
+# The pipeline modules are flat scripts in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+from NCEI_Pipeline import clean_details, prepare_events, split_zone_counties  # noqa: E402
+from NCEI_Synthetic_Storm_Events import write_synthetic_details  # noqa: E402
+
+
+# Cleaned and prepared synthetic events for 2001-2002, as the pipeline pairs them (without the NWS zone crosswalk)
+@pytest.fixture(scope="session")
+def synthetic_events(tmp_path_factory):
+    details_path = str(tmp_path_factory.mktemp("details"))
+    write_synthetic_details(details_path, [2001, 2002], 2000)
+    dfevents, zone_counties = split_zone_counties(prepare_events(clean_details(details_path), start_year=2001, end_year=2002))
+    return dfevents
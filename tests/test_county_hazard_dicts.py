@@ -0,0 +1,147 @@
+#######################
+"""
+Updated Nov, 2025
+
+@author: Joshua Green - University of Southampton
+
+Please cite this script/dataset if used in any research or publications.
+
+Green, J. (2025) NCEI Storm Multihazard Eventset.
+
+County hazard dictionaries of an eventset (NCEI_County_Hazard_Dicts.py)
+"""
+#######################
+
+import pandas as pd
+
+from NCEI_County_Hazard_Dicts import (
+    build_county_hazard_dicts,
+    load_county_hazard_dicts,
+    read_county_hazard_table,
+    write_county_hazard_table,
+)
+from NCEI_Multihazard_Pairing import pair_events
+from NCEI_Synthetic_Storm_Events import synthetic_county_ids
+
+
+# Pair 0 is within county 48201, its second event running into the next year, pair 1 spans 48201 and 48157
+def county_pairs():
+    dfmulti = pd.DataFrame(
+        {
+            "PAIR_ID": [0, 0, 1, 1],
+            "EVENT_ID": [1, 2, 3, 4],
+            "GEOID": ["48201", "48201", "48201", "48157"],
+            "start_year": [2005, 2005, 2005, 2005],
+            "end_year": [2005, 2006, 2005, 2005],
+        }
+    )
+    return dfmulti.drop(columns=["PAIR_ID"]), dfmulti
+
+
+def test_split_pairs_only_splits_pairs_across_counties():
+    dfevents, dfmulti = county_pairs()
+    us_county_ids = pd.DataFrame({"GEOID": ["48201", "48157"], "STATEFP": ["48", "48"]})
+
+    county_hazard_dicts = build_county_hazard_dicts(dfevents, dfmulti, [2005, 2006], us_county_ids)
+    assert county_hazard_dicts["multihazard_event_dict"][2005]["48"] == {"48201": [0], "48157": []}
+    assert county_hazard_dicts["multihazard_event_dict"][2006]["48"] == {"48201": [], "48157": []}
+
+    county_hazard_dicts = build_county_hazard_dicts(dfevents, dfmulti, [2005, 2006], us_county_ids, split_pairs=True)
+    assert county_hazard_dicts["multihazard_event_dict"][2005]["48"] == {"48201": [0, 1], "48157": [1]}
+    assert county_hazard_dicts["multihazard_event_dict"][2006]["48"] == {"48201": [], "48157": []}
+
+
+# Reference implementation of the original per year/state/county filtering loop of Generate_NCEI_Storm_Multihazard_Eventset.py
+def build_county_hazard_dicts_loop(dfevents, dfmulti, year_range, us_county_ids):
+    county_hazard_dicts = {
+        name: {}
+        for name in [
+            "single_hazard_event_dict",
+            "multihazard_event_dict",
+            "multihazard_count_dict",
+            "single_hazard_count_dict",
+            "no_hazard_boolean_dict",
+            "single_hazard_boolean_dict",
+            "multihazard_boolean_dict",
+            "no_hazard_or_single_hazard_boolean_dict",
+            "single_hazard_or_multihazard_boolean_dict",
+        ]
+    }
+    state_list = us_county_ids["STATEFP"].unique().tolist()
+
+    for year in year_range:
+        for hazard_dict in county_hazard_dicts.values():
+            hazard_dict[year] = {}
+        dfsingle_sub = dfevents[(dfevents["start_year"] == year) | (dfevents["end_year"] == year)].reset_index(drop=True)
+        dfmulti_sub = dfmulti[(dfmulti["start_year"] == year) | (dfmulti["end_year"] == year)].reset_index(drop=True)
+
+        for state in state_list:
+            for hazard_dict in county_hazard_dicts.values():
+                hazard_dict[year][state] = {}
+
+            for county in us_county_ids.loc[us_county_ids["STATEFP"] == state, "GEOID"]:
+                dfsingle_sub_county = dfsingle_sub[dfsingle_sub["GEOID"] == county].reset_index(drop=True)
+                dfmulti_sub_county = dfmulti_sub[dfmulti_sub["GEOID"] == county].reset_index(drop=True)
+
+                multi_events = set(dfmulti_sub_county["EVENT_ID"].unique())
+                single_events = set(dfsingle_sub_county["EVENT_ID"].unique())
+                single_only_events = single_events.symmetric_difference(multi_events)
+                dfsingle_only_sub_county = dfsingle_sub_county[dfsingle_sub_county["EVENT_ID"].isin(single_only_events)]
+
+                multi_duplicated_events = dfmulti_sub_county["PAIR_ID"][dfmulti_sub_county["PAIR_ID"].duplicated(keep=False)]
+                multi_filtered_df = dfmulti_sub_county[dfmulti_sub_county["PAIR_ID"].isin(multi_duplicated_events)]
+
+                has_single = len(dfsingle_only_sub_county) > 0
+                has_multi = len(multi_filtered_df) > 0
+                single_only_ids = dfsingle_only_sub_county["EVENT_ID"].unique().tolist()
+                pair_ids = multi_filtered_df["PAIR_ID"].unique().tolist()
+                county_hazard_dicts["single_hazard_event_dict"][year][state][county] = single_only_ids
+                county_hazard_dicts["single_hazard_count_dict"][year][state][county] = len(single_only_ids)
+                county_hazard_dicts["single_hazard_boolean_dict"][year][state][county] = has_single
+                county_hazard_dicts["multihazard_event_dict"][year][state][county] = pair_ids
+                county_hazard_dicts["multihazard_count_dict"][year][state][county] = len(pair_ids)
+                county_hazard_dicts["multihazard_boolean_dict"][year][state][county] = has_multi
+                county_hazard_dicts["no_hazard_boolean_dict"][year][state][county] = not has_single and not has_multi
+                county_hazard_dicts["no_hazard_or_single_hazard_boolean_dict"][year][state][county] = not has_multi
+                county_hazard_dicts["single_hazard_or_multihazard_boolean_dict"][year][state][county] = has_single or has_multi
+
+    return county_hazard_dicts
+
+
+def test_county_hazard_dicts_match_reference_loop(synthetic_events):
+    dfmulti = pair_events(synthetic_events, pd.Timedelta(days=7))
+    us_county_ids = synthetic_county_ids()
+    year_range = [2000, 2001, 2002]
+
+    county_hazard_dicts = build_county_hazard_dicts(synthetic_events, dfmulti, year_range, us_county_ids)
+    loop_dicts = build_county_hazard_dicts_loop(synthetic_events, dfmulti, year_range, us_county_ids)
+
+    assert any(any(counties.values()) for counties in loop_dicts["multihazard_boolean_dict"][2001].values())
+    assert county_hazard_dicts == loop_dicts
+
+
+def test_county_hazard_table_round_trip(synthetic_events, tmp_path):
+    dfmulti = pair_events(synthetic_events, pd.Timedelta(days=7))
+    us_county_ids = synthetic_county_ids()
+    county_hazard_dicts = build_county_hazard_dicts(synthetic_events, dfmulti, [2000, 2001, 2002], us_county_ids)
+    table_path = str(tmp_path / "county_hazard_table")
+    write_county_hazard_table(county_hazard_dicts, table_path)
+
+    assert load_county_hazard_dicts(table_path) == county_hazard_dicts
+
+    # Only some years and counties, the first county of the first state and the last county of the last state
+    geoids = [us_county_ids["GEOID"].iloc[0], us_county_ids["GEOID"].iloc[-1]]
+    states = us_county_ids.set_index("GEOID").loc[geoids, "STATEFP"].tolist()
+    county_hazard_df = read_county_hazard_table(table_path, years=[2001, 2002], geoids=geoids)
+    assert sorted(zip(county_hazard_df["year"], county_hazard_df["GEOID"])) == [
+        (year, geoid) for year in [2001, 2002] for geoid in sorted(geoids)
+    ]
+
+    names = ["multihazard_event_dict", "single_hazard_count_dict"]
+    filtered_dicts = load_county_hazard_dicts(table_path, names=names, years=[2001], geoids=geoids)
+    expected_dicts = {name: {2001: {}} for name in names}
+    for state, geoid in zip(states, geoids):
+        for name in names:
+            expected_dicts[name][2001].setdefault(state, {})[geoid] = county_hazard_dicts[name][2001][state][geoid]
+    assert filtered_dicts == expected_dicts
+    assert sum(filtered_dicts["single_hazard_count_dict"][2001][state][geoid] for state, geoid in zip(states, geoids)) > 0
@@ -0,0 +1,73 @@
+#######################
+"""
+Updated Nov, 2025
+
+@author: Joshua Green - University of Southampton
+
+Please cite this script/dataset if used in any research or publications.
+
+Green, J. (2025) NCEI Storm Multihazard Eventset.
+
+Incremental cleaning of the annual details files into a year partitioned dataset (NCEI_Storm_Details_Cleaning.py)
+"""
+#######################
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from NCEI_Storm_Details_Cleaning import (
+    cleaning_options,
+    incremental_clean_details,
+    read_cpi_table,
+    read_nws_zone_table,
+    year_partition_path,
+)
+from NCEI_Synthetic_Storm_Events import write_synthetic_details
+
+
+# Number of annual files an incremental run re-cleaned, from its "Re-cleaning N of M" line
+def recleaned_files(capsys):
+    lines = [line for line in capsys.readouterr().out.splitlines() if line.startswith("Re-cleaning")]
+    return int(lines[-1].split()[1])
+
+
+def test_changed_files_and_lookup_tables_are_recleaned(tmp_path, capsys):
+    details_path = tmp_path / "details"
+    details_path.mkdir()
+    csv_files = write_synthetic_details(str(details_path), [2001, 2002, 2003], 200)
+    dataset_path = str(tmp_path / "dataset")
+    nws_zone_df = read_nws_zone_table()
+    cpi_df = read_cpi_table()
+
+    incremental_clean_details(csv_files, dataset_path, cleaning_options(nws_zone_df, cpi_df))
+    assert recleaned_files(capsys) == 3
+
+    incremental_clean_details(csv_files, dataset_path, cleaning_options(nws_zone_df, cpi_df))
+    assert recleaned_files(capsys) == 0
+
+    # A revised 2002 file, with a corrected injury count
+    revised_details = pd.read_csv(csv_files[1])
+    revised_details.loc[0, "INJURIES_DIRECT"] += 1
+    revised_details.to_csv(csv_files[1], index=False, compression="gzip")
+    incremental_clean_details(csv_files, dataset_path, cleaning_options(nws_zone_df, cpi_df))
+    assert recleaned_files(capsys) == 1
+
+    # A revised CPI index for 2001, every year is re-cleaned and the 2001 inflation adjusted damages change
+    adjusted_damage = pq.read_table(year_partition_path(dataset_path, 2001), columns=["ADJ_DAMAGE_PROPERTY"])
+    revised_cpi_df = cpi_df.copy()
+    revised_cpi_df.loc[revised_cpi_df["Year"] == 2001, "Annual"] *= 0.5
+    incremental_clean_details(csv_files, dataset_path, cleaning_options(nws_zone_df, revised_cpi_df))
+    assert recleaned_files(capsys) == 3
+    assert not pq.read_table(year_partition_path(dataset_path, 2001), columns=["ADJ_DAMAGE_PROPERTY"]).equals(adjusted_damage)
+
+    # The NWS zone table is only recorded with the crosswalk, where a revised table re-cleans every year
+    incremental_clean_details(csv_files, dataset_path, cleaning_options(nws_zone_df, revised_cpi_df, use_nws_zone_crosswalk=True))
+    assert recleaned_files(capsys) == 3
+    incremental_clean_details(
+        csv_files, dataset_path, cleaning_options(nws_zone_df.iloc[1:], revised_cpi_df, use_nws_zone_crosswalk=True)
+    )
+    assert recleaned_files(capsys) == 3
+    incremental_clean_details(
+        csv_files, dataset_path, cleaning_options(nws_zone_df.iloc[1:], revised_cpi_df, use_nws_zone_crosswalk=True)
+    )
+    assert recleaned_files(capsys) == 0
@@ -0,0 +1,186 @@
+#######################
+"""
+Updated Nov, 2025
+
+@author: Joshua Green - University of Southampton
+
+Please cite this script/dataset if used in any research or publications.
+
+Green, J. (2025) NCEI Storm Multihazard Eventset.
+
+Pair member lookup of the multihazard pairing engine (NCEI_Multihazard_Pairing.py)
+"""
+#######################
+
+import pandas as pd
+import pytest
+
+from NCEI_Multihazard_Pairing import build_multihazard_clusters, pair_events, pair_neighborhood_events, union_find_roots
+from NCEI_Pipeline import sweep_pairs
+from NCEI_Prepared_Events import impact_filter_mask
+from NCEI_Synthetic_Storm_Events import synthetic_county_ids
+
+
+# Event 1 has a row in each of two counties, and only overlaps event 2 in the second county
+def two_county_events():
+    return pd.DataFrame(
+        {
+            "EVENT_ID": [1, 1, 2],
+            "GEOID": ["48201", "48157", "48157"],
+            "STATE_FIPS": ["48", "48", "48"],
+            "CZ_FIPS": ["201", "157", "157"],
+            "CZ_NAME": ["HARRIS", "FORT BEND", "FORT BEND"],
+            "EVENT_TYPE": ["Flood", "Flood", "Tornado"],
+            "BEGIN_DATETIME": pd.to_datetime(["2005-05-01", "2005-05-01", "2005-05-02"]),
+            "END_DATETIME": pd.to_datetime(["2005-05-01", "2005-05-01", "2005-05-02"]),
+            "INJURIES_DIRECT": [0, 0, 1],
+            "INJURIES_INDIRECT": [0, 0, 0],
+            "DEATHS_DIRECT": [0, 0, 0],
+            "DEATHS_INDIRECT": [0, 0, 0],
+            "ADJ_DAMAGE_PROPERTY": [100, 200, 300],
+            "ADJ_DAMAGE_CROPS": [0, 0, 0],
+            "BEGIN_LAT": [29.8, 29.5, 29.5],
+            "BEGIN_LON": [-95.4, -95.7, -95.7],
+            "END_LAT": [29.8, 29.5, 29.5],
+            "END_LON": [-95.4, -95.7, -95.7],
+        }
+    )
+
+
+def test_pair_members_come_from_the_county_they_were_paired_in():
+    dfmulti = pair_events(two_county_events(), pd.Timedelta(days=1))
+
+    assert len(dfmulti) == 2
+    flood = dfmulti[dfmulti["EVENT_ID"] == 1].iloc[0]
+    assert flood["GEOID"] == "48157"
+    assert flood["CZ_NAME"] == "FORT BEND"
+    assert flood["ADJ_DAMAGE_PROPERTY"] == 200
+    assert (dfmulti["MULTI_ADJ_DAMAGE_PROPERTY"] == 500).all()
+
+
+# A flood and a tornado that are an hour apart in their local times, but overlap in UTC (their timezones differ)
+def two_timezone_events():
+    return pd.DataFrame(
+        {
+            "EVENT_ID": [1, 2],
+            "GEOID": ["48141", "48141"],
+            "STATE_FIPS": ["48", "48"],
+            "CZ_FIPS": ["141", "141"],
+            "CZ_NAME": ["EL PASO", "EL PASO"],
+            "EVENT_TYPE": ["Flood", "Tornado"],
+            "BEGIN_DATETIME": pd.to_datetime(["2005-05-01 10:00", "2005-05-01 12:00"]),
+            "END_DATETIME": pd.to_datetime(["2005-05-01 11:00", "2005-05-01 13:00"]),
+            "BEGIN_DATETIME_UTC": pd.to_datetime(["2005-05-01 17:00", "2005-05-01 18:00"], utc=True),
+            "END_DATETIME_UTC": pd.to_datetime(["2005-05-01 18:00", "2005-05-01 19:00"], utc=True),
+            "INJURIES_DIRECT": [1, 1],
+            "INJURIES_INDIRECT": [0, 0],
+            "DEATHS_DIRECT": [0, 0],
+            "DEATHS_INDIRECT": [0, 0],
+            "ADJ_DAMAGE_PROPERTY": [0, 0],
+            "ADJ_DAMAGE_CROPS": [0, 0],
+            "BEGIN_LAT": [31.8, 31.8],
+            "BEGIN_LON": [-106.4, -106.4],
+            "END_LAT": [31.8, 31.8],
+            "END_LON": [-106.4, -106.4],
+        }
+    )
+
+
+def test_events_are_paired_on_utc_when_available():
+    dfevents = two_timezone_events()
+    assert pair_events(dfevents, pd.Timedelta(0))["EVENT_ID"].tolist() == [1, 2]
+
+    local_only = dfevents.drop(columns=["BEGIN_DATETIME_UTC", "END_DATETIME_UTC"])
+    assert len(pair_events(local_only, pd.Timedelta(0))) == 0
+
+
+def test_neighbouring_counties_are_paired_on_utc_when_available():
+    dfevents = two_timezone_events()
+    dfevents["GEOID"] = ["48141", "48229"]
+    dfevents["CZ_FIPS"] = ["141", "229"]
+    dfevents["CZ_NAME"] = ["EL PASO", "HUDSPETH"]
+    dfevents["CZ_TYPE"] = ["C", "C"]
+    county_neighbors = pd.DataFrame({"GEOID": ["48141", "48229"], "NEIGHBOR_GEOID": ["48229", "48141"]})
+
+    assert pair_neighborhood_events(dfevents, pd.Timedelta(0), county_neighbors)["EVENT_ID"].tolist() == [1, 2]
+    local_only = dfevents.drop(columns=["BEGIN_DATETIME_UTC", "END_DATETIME_UTC"])
+    assert len(pair_neighborhood_events(local_only, pd.Timedelta(0), county_neighbors)) == 0
+
+
+@pytest.mark.parametrize("lag_days", [0, 7])
+def test_parallel_pairing_matches_a_serial_run(synthetic_events, lag_days):
+    lag = pd.Timedelta(days=lag_days)
+    serial = pair_events(synthetic_events, lag, n_workers=1)
+    parallel = pair_events(synthetic_events, lag, n_workers=2)
+
+    assert len(serial) > 0
+    pd.testing.assert_frame_equal(parallel, serial)
+
+
+# Neighbouring synthetic counties, each county next to the counties before and after it in its state
+def synthetic_county_neighbors():
+    us_county_ids = synthetic_county_ids()
+    next_county = us_county_ids.groupby("STATEFP")["GEOID"].shift(-1)
+    edges = pd.DataFrame({"GEOID": us_county_ids["GEOID"], "NEIGHBOR_GEOID": next_county}).dropna()
+    reverse_edges = edges.rename(columns={"GEOID": "NEIGHBOR_GEOID", "NEIGHBOR_GEOID": "GEOID"})
+    return pd.concat([edges, reverse_edges], ignore_index=True)
+
+
+@pytest.mark.parametrize("neighbors", [False, True])
+def test_sweep_pairs_match_direct_pairing(synthetic_events, neighbors):
+    county_neighbors = synthetic_county_neighbors() if neighbors else None
+    sweep_time_lag_days = [0, 1, 7]
+    sweep_impact_thresholds = [(0, 0, 0, 0), (1, 1, 10, 10), (0, 0, 0, 50)]
+
+    eventsets = list(sweep_pairs(synthetic_events, sweep_time_lag_days, sweep_impact_thresholds, county_neighbors))
+    assert len(eventsets) == 9
+    for inj, dth, c, p, time_lag_days, dfevents, dfmulti in eventsets:
+        expected_events = synthetic_events[impact_filter_mask(synthetic_events, inj, dth, c, p)]
+        lag = pd.Timedelta(days=time_lag_days)
+        if neighbors:
+            expected_pairs = pair_neighborhood_events(expected_events, lag, county_neighbors)
+        else:
+            expected_pairs = pair_events(expected_events, lag)
+
+        assert len(expected_pairs) > 0
+        pd.testing.assert_frame_equal(dfevents, expected_events)
+        pd.testing.assert_frame_equal(dfmulti, expected_pairs)
+
+
+def test_union_find_roots_joins_chained_and_disjoint_components():
+    roots = union_find_roots(7, [0, 1, 4], [1, 2, 5])
+    assert roots.tolist() == [0, 0, 0, 3, 4, 4, 6]
+
+    # A chain given from its far end, merged over several rounds
+    roots = union_find_roots(6, [5, 4, 3, 2, 1], [4, 3, 2, 1, 0])
+    assert roots.tolist() == [0] * 6
+
+
+# Pairs (1, 2) and (2, 3) chain three events into one cluster, pair (4, 5) is a cluster of its own
+def chained_pairs():
+    return pd.DataFrame(
+        {
+            "PAIR_ID": [0, 0, 1, 1, 2, 2],
+            "EVENT_ID": [1, 2, 2, 3, 4, 5],
+            "HAZARD": ["tn", "hl", "hl", "ff", "ws", "hl"],
+            "INJURIES_DIRECT": [1, 2, 2, 4, 0, 0],
+            "INJURIES_INDIRECT": [0, 0, 0, 0, 0, 0],
+            "DEATHS_DIRECT": [0, 0, 0, 1, 0, 0],
+            "DEATHS_INDIRECT": [0, 0, 0, 0, 0, 0],
+            "ADJ_DAMAGE_PROPERTY": [100, 200, 200, 400, 10, 20],
+            "ADJ_DAMAGE_CROPS": [0, 0, 0, 0, 0, 0],
+        }
+    )
+
+
+def test_chained_pairs_form_a_single_cluster():
+    dfclusters = build_multihazard_clusters(chained_pairs())
+
+    assert dfclusters["EVENT_ID"].tolist() == [1, 2, 3, 4, 5]
+    assert dfclusters["MULTIHAZARD_ID"].tolist() == [0, 0, 0, 1, 1]
+    assert dfclusters["N_EVENTS"].tolist() == [3, 3, 3, 2, 2]
+    assert dfclusters["HAZARD_SIGNATURE"].tolist() == ["ff+hl+tn"] * 3 + ["hl+ws"] * 2
+    # Each event is counted once in the cluster totals, although event 2 is in two pairs
+    assert dfclusters["MULTI_INJURIES_DIRECT"].tolist() == [7, 7, 7, 0, 0]
+    assert dfclusters["MULTI_ADJ_DAMAGE_PROPERTY"].tolist() == [700, 700, 700, 30, 30]
+    assert dfclusters["MULTI_DEATHS_DIRECT"].tolist() == [1, 1, 1, 0, 0]
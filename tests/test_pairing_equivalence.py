@@ -0,0 +1,97 @@
+#######################
+"""
+Updated Nov, 2025
+
+@author: Joshua Green - University of Southampton
+
+Please cite this script/dataset if used in any research or publications.
+
+Green, J. (2025) NCEI Storm Multihazard Eventset.
+
+Equivalence of the sort-and-sweep pairing engine (NCEI_Multihazard_Pairing.py) with the original nested iterrows loop
+"""
+#######################
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from NCEI_Multihazard_Pairing import datetime_ranges_overlap_with_lag, find_overlapping_events
+
+
+# Original nested iterrows pairing loop, the reference implementation
+# Returns the same (overlapping_events, event_pairs) as find_overlapping_events
+def find_overlapping_events_loop(df, lag):
+    overlapping_events = [[] for _ in range(len(df))]
+    overlapping_event_pairs = []
+
+    for row_number, (idx, row) in enumerate(df.iterrows()):
+        # Subset of rows with the same county location name and id
+        subset = df[
+            (df["CZ_FIPS"] == row["CZ_FIPS"]) &
+            (df["CZ_NAME"] == row["CZ_NAME"]) &
+            (df["STATE_FIPS"] == row["STATE_FIPS"])
+        ]
+        for _, other in subset.iterrows():
+            if row["EVENT_ID"] == other["EVENT_ID"]:
+                continue
+
+            if not datetime_ranges_overlap_with_lag(
+                    row["BEGIN_DATETIME"], row["END_DATETIME"],
+                    other["BEGIN_DATETIME"], other["END_DATETIME"],
+                    lag):
+                continue
+
+            overlapping_events[row_number].append(other["EVENT_ID"])
+
+            if row["EVENT_TYPE"] != other["EVENT_TYPE"]:
+                overlapping_event_pairs.append(((row["EVENT_ID"]), (other["EVENT_ID"])))
+
+    unique_set = set()
+    event_pairs = []
+    for pair in overlapping_event_pairs:
+        sorted_pair = tuple(sorted(pair))
+        if sorted_pair not in unique_set:
+            unique_set.add(sorted_pair)
+            event_pairs.append(pair)
+
+    return overlapping_events, np.array(event_pairs, dtype=np.int64).reshape(-1, 2)
+
+
+# A synthetic county of storm events, with a few reversed begin/end records, duplicated EVENT_IDs and missing CZ_NAMEs
+@pytest.fixture(scope="module")
+def county_events():
+    n_events = 400
+    rng = np.random.default_rng(0)
+    start = pd.Timestamp("2000-01-01").value
+    stop = pd.Timestamp("2003-12-31").value
+    begin = pd.to_datetime(rng.integers(start, stop, n_events)).floor("min")
+    duration = pd.to_timedelta(rng.exponential(2, n_events) * 24 * 60, unit="min").floor("min")
+    # A few records have an end before their begin, as happens in the raw database
+    duration = duration.where(rng.random(n_events) > 0.02, -duration)
+    event_ids = rng.choice(np.arange(100000, 100000 + n_events * 2), n_events, replace=False)
+    # Duplicate a few EVENT_IDs, events can be recorded in several parts
+    event_ids[rng.random(n_events) < 0.02] = event_ids[0]
+    cz_names = rng.choice(np.array(["HARRIS", "HARRIS", "HARRIS", "COASTAL HARRIS", None], dtype=object), n_events)
+    return pd.DataFrame(
+        {
+            "EVENT_ID": event_ids,
+            "STATE_FIPS": "48",
+            "CZ_FIPS": "201",
+            "CZ_NAME": cz_names,
+            "EVENT_TYPE": rng.choice(["Hail", "Tornado", "Flash Flood", "Thunderstorm Wind"], n_events),
+            "BEGIN_DATETIME": begin,
+            "END_DATETIME": begin + duration,
+        }
+    )
+
+
+@pytest.mark.parametrize("lag_days", [0, 7, 30, 90])
+def test_sweep_matches_reference_loop(county_events, lag_days):
+    lag = pd.Timedelta(days=lag_days)
+    fast_events, fast_pairs = find_overlapping_events(county_events, lag)
+    loop_events, loop_pairs = find_overlapping_events_loop(county_events, lag)
+
+    assert len(loop_pairs) > 0
+    assert [list(x) for x in fast_events] == loop_events
+    assert np.array_equal(fast_pairs, loop_pairs)
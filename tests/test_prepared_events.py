@@ -0,0 +1,65 @@
+#######################
+"""
+Updated Nov, 2025
+
+@author: Joshua Green - University of Southampton
+
+Please cite this script/dataset if used in any research or publications.
+
+Green, J. (2025) NCEI Storm Multihazard Eventset.
+
+Prepared events read from a cleaned database file without their narratives (NCEI_Prepared_Events.py)
+"""
+#######################
+
+import pandas as pd
+
+from NCEI_Prepared_Events import attach_narratives, load_prepared_events, prepare_events
+
+
+# Event 1 is recorded twice with different narratives, event 2 twice with identical rows, event 3 is outside the states kept
+def duplicated_events():
+    return pd.DataFrame(
+        {
+            "EPISODE_ID": [10, 10, 20, 20, 30],
+            "EVENT_ID": [1, 1, 2, 2, 3],
+            "STATE": ["TEXAS", "TEXAS", "TEXAS", "TEXAS", "GUAM"],
+            "STATE_FIPS": [48, 48, 48, 48, 66],
+            "EVENT_TYPE": ["Flood", "Flood", "Tornado", "Tornado", "Flood"],
+            "HAZARD": ["fl", "fl", "tn", "tn", "fl"],
+            "CZ_TYPE": ["C", "C", "C", "C", "C"],
+            "CZ_FIPS": [201, 201, 201, 201, 10],
+            "CZ_NAME": ["HARRIS", "HARRIS", "HARRIS", "HARRIS", "GUAM"],
+            "BEGIN_DATETIME": pd.to_datetime(["2005-05-01", "2005-05-01", "2005-05-02", "2005-05-02", "2005-05-03"]),
+            "END_DATETIME": pd.to_datetime(["2005-05-01", "2005-05-01", "2005-05-02", "2005-05-02", "2005-05-03"]),
+            "start_year": [2005] * 5,
+            "end_year": [2005] * 5,
+            "INJURIES_DIRECT": [1] * 5,
+            "INJURIES_INDIRECT": [0] * 5,
+            "DEATHS_DIRECT": [0] * 5,
+            "DEATHS_INDIRECT": [0] * 5,
+            "DAMAGE_PROPERTY": [0] * 5,
+            "DAMAGE_CROPS": [0] * 5,
+            "ADJ_DAMAGE_PROPERTY": [0] * 5,
+            "ADJ_DAMAGE_CROPS": [0] * 5,
+            "TOTAL_INJURIES": [1] * 5,
+            "TOTAL_DEATHS": [0] * 5,
+            "TOTAL_ADJ_DAMAGE": [0] * 5,
+            "EPISODE_NARRATIVE": ["Heavy rain", "Heavy rain", "Storms", "Storms", "Rain"],
+            "EVENT_NARRATIVE": ["Creek flooded", "Roads flooded", "Tornado touched down", "Tornado touched down", "Flooding"],
+        }
+    )
+
+
+def test_narratives_are_attached_by_row_and_duplicates_dropped_after(tmp_path):
+    path = str(tmp_path / "cleaned.parquet")
+    # Several row groups, so that the events and their narratives are read from different row groups
+    duplicated_events().to_parquet(path, row_group_size=2)
+    filter_args = (["fl", "tn"], ["GUAM"], 1996, 2024)
+
+    dfevents = attach_narratives(load_prepared_events(path, *filter_args), path, *filter_args)
+    expected = prepare_events(pd.read_parquet(path), *filter_args)
+
+    assert dfevents["EVENT_NARRATIVE"].tolist() == ["Creek flooded", "Roads flooded", "Tornado touched down"]
+    # The categories differ, as the filters are applied before the columns are read as categoricals
+    pd.testing.assert_frame_equal(dfevents, expected, check_dtype=False, check_categorical=False)
@@ -0,0 +1,57 @@
+#######################
+"""
+Updated Nov, 2025
+
+@author: Joshua Green - University of Southampton
+
+Please cite this script/dataset if used in any research or publications.
+
+Green, J. (2025) NCEI Storm Multihazard Eventset.
+
+Spatial assignment of storm events to county polygons (NCEI_Spatial_Assignment.py)
+"""
+#######################
+
+import geopandas as gpd
+import pandas as pd
+import pytest
+import shapely
+
+from NCEI_Spatial_Assignment import assign_event_counties
+
+
+# Two neighbouring one degree square counties, in NAD83
+def two_counties():
+    return gpd.GeoDataFrame(
+        {"GEOID": ["48001", "48003"]},
+        geometry=[shapely.box(-96, 30, -95, 31), shapely.box(-95, 30, -94, 31)],
+        crs="EPSG:4269",
+    )
+
+
+# A hail event in the first county, and a tornado whose path crosses into the second
+def two_events():
+    return pd.DataFrame(
+        {
+            "EVENT_ID": [1, 2],
+            "HAZARD": ["ha", "tn"],
+            "BEGIN_LAT": [30.5, 30.5],
+            "BEGIN_LON": [-95.5, -95.2],
+            "END_LAT": [30.5, 30.6],
+            "END_LON": [-95.5, -94.8],
+        }
+    )
+
+
+def test_projected_county_polygons_are_reprojected():
+    expected = pd.DataFrame({"EVENT_ID": [1, 2, 2], "GEOID": ["48001", "48001", "48003"]})
+
+    pd.testing.assert_frame_equal(assign_event_counties(two_events(), two_counties()), expected, check_dtype=False)
+    pd.testing.assert_frame_equal(
+        assign_event_counties(two_events(), two_counties().to_crs(epsg=5070)), expected, check_dtype=False
+    )
+
+
+def test_county_polygons_without_a_crs_are_rejected():
+    with pytest.raises(ValueError):
+        assign_event_counties(two_events(), two_counties().set_crs(None, allow_override=True))
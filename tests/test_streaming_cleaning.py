@@ -0,0 +1,39 @@
+#######################
+"""
+Updated Nov, 2025
+
+@author: Joshua Green - University of Southampton
+
+Please cite this script/dataset if used in any research or publications.
+
+Green, J. (2025) NCEI Storm Multihazard Eventset.
+
+Streaming, bounded-memory cleaning against the in-memory cleaning of the annual details files (NCEI_Pipeline.py)
+"""
+#######################
+
+import os
+
+import pandas as pd
+
+from NCEI_Pipeline import cleaned_details_path, clean_details, stream_cleaned_details
+from NCEI_Storm_Details_Schema import apply_details_schema
+from NCEI_Synthetic_Storm_Events import synthetic_details, write_synthetic_details
+
+
+def test_streaming_and_in_memory_cleaning_give_the_same_database(tmp_path):
+    details_path = str(tmp_path / "details")
+    write_synthetic_details(details_path, [2001, 2002], 300)
+    # An earlier revision of the 2002 file, replaced by the one above
+    synthetic_details(2002, 300, seed=1, first_event_id=301, first_episode_id=301).to_csv(
+        os.path.join(details_path, "StormEvents_details-ftp_v1.0_d2002_c20240101.csv.gz"), index=False, compression="gzip"
+    )
+    output_path = str(tmp_path / "cleaned")
+    os.makedirs(output_path)
+
+    df_details = clean_details(details_path)
+    stream_cleaned_details(details_path, output_path)
+    df_streamed = apply_details_schema(pd.read_parquet(cleaned_details_path(output_path, "1950-2024", "parquet")))
+
+    assert df_details["EVENT_ID"].nunique() == 600
+    pd.testing.assert_frame_equal(df_details.reset_index(drop=True), df_streamed.reset_index(drop=True))
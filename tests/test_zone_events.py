@@ -0,0 +1,106 @@
+#######################
+"""
+Updated Nov, 2025
+
+@author: Joshua Green - University of Southampton
+
+Please cite this script/dataset if used in any research or publications.
+
+Green, J. (2025) NCEI Storm Multihazard Eventset.
+
+Zone events placed with the NWS zone to county table (NCEI_Prepared_Events.py), through pairing and the county hazard dictionaries
+"""
+#######################
+
+import geopandas as gpd
+import pandas as pd
+import shapely
+
+from NCEI_County_Hazard_Dicts import build_county_hazard_dicts
+from NCEI_Multihazard_Pairing import pair_events
+from NCEI_Pipeline import eventset_file_path, generate_eventset, split_zone_counties
+from NCEI_Prepared_Events import expand_zone_events, prepare_events
+
+
+# Event 1 is a flood in a zone covering two counties, event 2 a tornado in the second county the next day
+def zone_and_county_events():
+    return pd.DataFrame(
+        {
+            "EPISODE_ID": [10, 20],
+            "EVENT_ID": [1, 2],
+            "STATE": ["TEXAS", "TEXAS"],
+            "STATE_FIPS": [48, 48],
+            "EVENT_TYPE": ["Flood", "Tornado"],
+            "HAZARD": ["fl", "tn"],
+            "CZ_TYPE": ["Z", "C"],
+            "CZ_FIPS": [201, 157],
+            "CZ_NAME": ["HARRIS", "FORT BEND"],
+            "ZONE_GEOIDS": ["48201;48157", None],
+            "BEGIN_DATETIME": pd.to_datetime(["2005-05-01", "2005-05-02"]),
+            "END_DATETIME": pd.to_datetime(["2005-05-01", "2005-05-02"]),
+            "start_year": [2005, 2005],
+            "end_year": [2005, 2005],
+            "INJURIES_DIRECT": [1, 1],
+            "INJURIES_INDIRECT": [0, 0],
+            "DEATHS_DIRECT": [0, 0],
+            "DEATHS_INDIRECT": [0, 0],
+            "DAMAGE_PROPERTY": [0, 0],
+            "DAMAGE_CROPS": [0, 0],
+            "ADJ_DAMAGE_PROPERTY": [0, 0],
+            "ADJ_DAMAGE_CROPS": [0, 0],
+            "TOTAL_INJURIES": [1, 1],
+            "TOTAL_DEATHS": [0, 0],
+            "TOTAL_ADJ_DAMAGE": [0, 0],
+        }
+    )
+
+
+def test_zone_events_are_counted_in_every_county_of_their_zone():
+    dfevents, zone_counties = split_zone_counties(prepare_events(zone_and_county_events(), ["fl", "tn"], [], 1996, 2024))
+
+    assert dfevents["EVENT_ID"].tolist() == [1, 2]
+    assert "ZONE_GEOIDS" not in dfevents.columns
+    assert zone_counties["EVENT_ID"].tolist() == [1, 1]
+    assert zone_counties["GEOID"].tolist() == ["48157", "48201"]
+    assert zone_counties["CZ_NAME"].tolist() == ["FORT BEND", "HARRIS"]
+
+    dfcounties = expand_zone_events(dfevents, zone_counties)
+    assert dfcounties["EVENT_ID"].tolist() == [1, 1, 2]
+    assert dfcounties["GEOID"].astype(str).tolist() == ["48157", "48201", "48157"]
+    assert dfcounties["CZ_FIPS"].astype(str).tolist() == ["157", "201", "157"]
+
+    dfmulti = pair_events(dfcounties, pd.Timedelta(days=1))
+    assert dfmulti["EVENT_ID"].tolist() == [1, 2]
+    assert dfmulti["GEOID"].astype(str).tolist() == ["48157", "48157"]
+
+    us_county_ids = pd.DataFrame({"GEOID": ["48201", "48157"], "STATEFP": ["48", "48"]})
+    county_hazard_dicts = build_county_hazard_dicts(dfcounties, dfmulti, [2005], us_county_ids)
+    assert county_hazard_dicts["single_hazard_event_dict"][2005]["48"] == {"48201": [1], "48157": []}
+    assert county_hazard_dicts["multihazard_count_dict"][2005]["48"] == {"48201": 0, "48157": 1}
+
+
+def test_saved_eventset_has_a_single_row_per_event(tmp_path):
+    shapefile_path = str(tmp_path / "counties.shp")
+    gpd.GeoDataFrame(
+        {"GEOID": ["48201", "48157"], "STATEFP": ["48", "48"], "COUNTYFP": ["201", "157"]},
+        geometry=[shapely.box(-96, 29, -95, 30), shapely.box(-97, 29, -96, 30)],
+        crs="EPSG:4269",
+    ).to_file(shapefile_path)
+    output_path = str(tmp_path / "eventset")
+
+    generate_eventset(
+        zone_and_county_events(),
+        output_path,
+        shapefile_path=shapefile_path,
+        time_lag_days=1,
+        hazard_event_inclusion_filter=["fl", "tn"],
+        exclusion_state_list=[],
+    )
+
+    eventset_name = (1, 1, 10, 10, 1, 1996, 2024)
+    dfevents = pd.read_parquet(eventset_file_path(output_path, "dfevents", *eventset_name))
+    dfsingle = pd.read_parquet(eventset_file_path(output_path, "dfsingle", *eventset_name))
+    dfmulti = pd.read_parquet(eventset_file_path(output_path, "dfmulti", *eventset_name))
+    assert dfevents["EVENT_ID"].tolist() == [1, 2]
+    assert dfsingle["EVENT_ID"].tolist() == [1]
+    assert dfmulti["EVENT_ID"].tolist() == [1, 2]